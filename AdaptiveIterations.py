@@ -0,0 +1,112 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import math
+from FrameStatistics import iteration_histogram
+
+class AdaptiveIterations(object):
+	"""Chooses max_iterations automatically. The starting point is derived
+	from the zoom depth: base_iterations at reference_size, plus
+	per_decade iterations for every decade the logical size is smaller than
+	that. This is scaled by a factor that is adapted incrementally from the
+	iteration data of the previous frame:
+
+	- Many pixels escaping late (in the top late_range of the iteration
+	  range) means that the boundary of the set is cut off by the limit, so
+	  it is raised.
+	- If hardly any pixel escapes late and the escaped ones are all far
+	  below the limit, the remaining iterations are only spent on pixels
+	  that never escape anyway, so it is lowered.
+
+	The resulting limit never exceeds max_cap; the scale is not raised
+	further while the cap is hit (nor lowered at the minimum)."""
+
+	def __init__(self, max_cap = 5000, min_iterations = 20, base_iterations = 40, per_decade = 100, reference_size = 3, late_range = 0.1, raise_threshold = 0.002, lower_threshold = 0.0002, step_up = 1.25, step_down = 0.9):
+		assert(min_iterations <= max_cap)
+		self._max_cap = max_cap
+		self._min_iterations = min_iterations
+		self._base_iterations = base_iterations
+		self._per_decade = per_decade
+		self._reference_size = reference_size
+		self._late_range = late_range
+		self._raise_threshold = raise_threshold
+		self._lower_threshold = lower_threshold
+		self._step_up = step_up
+		self._step_down = step_down
+		self._scale = 1
+
+	@property
+	def max_cap(self):
+		return self._max_cap
+
+	@max_cap.setter
+	def max_cap(self, value):
+		assert(value >= self._min_iterations)
+		self._max_cap = value
+
+	@property
+	def min_iterations(self):
+		return self._min_iterations
+
+	@property
+	def late_range(self):
+		"""Top fraction of the iteration range in which pixels count as late;
+		histograms passed to feedback_histogram() have to use the same."""
+		return self._late_range
+
+	@property
+	def scale(self):
+		return self._scale
+
+	def zoom_iterations(self, viewport):
+		"""Iteration limit derived from the zoom depth alone."""
+		size = min(viewport.logical_size.x, viewport.logical_size.y)
+		decades = max(0, math.log10(self._reference_size / size))
+		return self._base_iterations + (self._per_decade * decades)
+
+	def limit(self, viewport):
+		"""Returns the max_iterations to render the viewport with."""
+		iterations = round(self.zoom_iterations(viewport) * self._scale)
+		return min(max(iterations, self._min_iterations), self._max_cap)
+
+	def feedback(self, late, escaped_max, max_iterations):
+		"""Adapts the scale from the fraction of all pixels that escaped late
+		and the highest iteration count among escaped pixels (None if no pixel
+		escaped) of a frame rendered with the given limit. Returns True if the
+		scale changed."""
+		previous = self._scale
+		if (late > self._raise_threshold) and (max_iterations < self._max_cap):
+			self._scale *= self._step_up
+		elif (late < self._lower_threshold) and (escaped_max is not None) and (escaped_max < (1 - (2 * self._late_range)) * max_iterations) and (max_iterations > self._min_iterations):
+			self._scale *= self._step_down
+		self._scale = min(max(self._scale, 1 / 16), 16)
+		return self._scale != previous
+
+	def feedback_iterations(self, iterations, max_iterations):
+		"""Adapts the scale from the per-pixel iteration data of a frame."""
+		return self.feedback_histogram(iteration_histogram(iterations, max_iterations, late_range = self._late_range), max_iterations)
+
+	def feedback_histogram(self, histogram, max_iterations):
+		"""Adapts the scale from an iteration_histogram() of a frame."""
+		return self.feedback(histogram["late"], histogram["escaped_max"], max_iterations)
+
+	def reset(self):
+		self._scale = 1
@@ -0,0 +1,137 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import math
+import numpy
+
+class AdaptiveSupersampler(object):
+	"""Anti-aliases images rendered by CPUEngines by supersampling only
+	the pixels at edges. A pixel is an edge if its color or its iteration
+	value differs strongly from one of its four neighbors; such pixels are
+	computed again at "samples" jittered sub-pixel positions (one per cell of
+	a stratified grid) and their color becomes the average of all samples,
+	including the original one at the pixel center.
+
+	The sample budget limits the extra samples to budget times the pixel
+	count; if there are more edge pixels than that allows, the ones with the
+	strongest differences are supersampled. Since edges are usually a small
+	part of the image, this approaches the quality of full supersampling at
+	a fraction of its cost."""
+
+	def __init__(self, samples = 8, budget = 1.0, color_threshold = 24, iteration_threshold = 2, seed = 0):
+		assert(samples >= 1)
+		assert(budget >= 0)
+		self._samples = samples
+		self._budget = budget
+		self._color_threshold = color_threshold
+		self._iteration_threshold = iteration_threshold
+		self._seed = seed
+		self._statistics = { }
+
+	@property
+	def samples(self):
+		return self._samples
+
+	@property
+	def budget(self):
+		return self._budget
+
+	@property
+	def statistics(self):
+		"""Statistics of the last refine() call: the number of edge pixels,
+		the number of them which were supersampled and the number of extra
+		samples computed."""
+		return self._statistics
+
+	@staticmethod
+	def _neighbor_difference(values):
+		"""Maximum absolute difference of every pixel to its four neighbors."""
+		values = values.astype(float)
+		if values.ndim == 3:
+			# Colors: the largest difference of any channel
+			return numpy.max([ AdaptiveSupersampler._neighbor_difference(values[..., channel]) for channel in range(values.shape[2]) ], axis = 0)
+		difference = numpy.zeros(values.shape)
+		horizontal = numpy.abs(numpy.diff(values, axis = 1))
+		vertical = numpy.abs(numpy.diff(values, axis = 0))
+		difference[:, 1:] = numpy.maximum(difference[:, 1:], horizontal)
+		difference[:, :-1] = numpy.maximum(difference[:, :-1], horizontal)
+		difference[1:, :] = numpy.maximum(difference[1:, :], vertical)
+		difference[:-1, :] = numpy.maximum(difference[:-1, :], vertical)
+		return difference
+
+	def edge_scores(self, engine, data, image):
+		"""Returns a float array of shape (height, width) which is at least one
+		for edge pixels; the larger, the stronger the edge. Without data, only
+		colors are compared."""
+		score = self._neighbor_difference(image) / self._color_threshold
+		if data is None:
+			return score
+		# Beyond the iteration count, a change in any other data (e.g., the
+		# root a Newton fractal converged to) is always an edge
+		for plane in engine.split_data(data)[1:]:
+			score = numpy.where(self._neighbor_difference(plane) > 0, numpy.inf, score)
+		return numpy.maximum(score, self._neighbor_difference(engine.iterations(data)) / self._iteration_threshold)
+
+	def jitter(self, count):
+		"""Returns arrays (dx, dy) of shape (count, samples) of sub-pixel
+		offsets in [-0.5, 0.5). Samples are stratified: the pixel is divided
+		into a grid of at least "samples" cells, each sample lies at a random
+		position within a different cell."""
+		rng = numpy.random.RandomState(self._seed)
+		grid = math.ceil(math.sqrt(self._samples))
+		# Sorting random keys gives one random permutation of the cells per row
+		cells = numpy.argsort(rng.uniform(size = (count, grid * grid)), axis = 1)[:, :self._samples]
+		dx = ((cells % grid) + rng.uniform(size = (count, self._samples))) / grid - 0.5
+		dy = ((cells // grid) + rng.uniform(size = (count, self._samples))) / grid - 0.5
+		return (dx, dy)
+
+	def refine(self, engine, viewport, data, image, lut, region = None):
+		"""Supersamples the edge pixels of an image that the engine rendered
+		from the given data (which may be None) of the viewport, or of the
+		given region of it; returns the anti-aliased image."""
+		(x0, y0) = region[:2] if (region is not None) else (0, 0)
+		score = self.edge_scores(engine, data, image)
+		(ys, xs) = numpy.nonzero(score >= 1)
+		edge_pixels = len(xs)
+
+		max_pixels = math.floor(self._budget * image.shape[0] * image.shape[1] / self._samples)
+		if edge_pixels > max_pixels:
+			strongest = numpy.argsort(-score[ys, xs], kind = "stable")[:max_pixels]
+			(ys, xs) = (ys[strongest], xs[strongest])
+		self._statistics = { "edge_pixels": edge_pixels, "supersampled": len(xs), "samples": len(xs) * self._samples }
+		if len(xs) == 0:
+			return image
+
+		(dx, dy) = self.jitter(len(xs))
+		sample_x = (xs + x0)[:, numpy.newaxis] + dx
+		sample_y = (ys + y0)[:, numpy.newaxis] + dy
+		colors = engine.colorize(engine.compute_at(viewport, sample_x, sample_y), lut).astype(float)
+		total = numpy.sum(colors, axis = 1) + image[ys, xs]
+		result = image.copy()
+		result[ys, xs] = numpy.rint(total / (self._samples + 1)).astype(numpy.uint8)
+		return result
+
+	def render(self, engine, viewport, palette):
+		"""Renders the viewport with the engine and anti-aliases it; returns an
+		uint8 array of shape (height, width, 3)."""
+		lut = engine.create_lut(palette)
+		data = engine.compute(viewport)
+		return self.refine(engine, viewport, data, engine.colorize(data, lut), lut)
@@ -26,6 +26,7 @@
 import json
 import bisect
 import collections
+import numpy
 
 class AdvancedColorPalette(object):
 	_ColorElement = collections.namedtuple("ColorElement", [ "pos", "name", "r", "g", "b" ])
@@ -36,6 +37,11 @@ class AdvancedColorPalette(object):
 		# Extracte positions for efficient bisect lookup later
 		self._pos = tuple(entry.pos for entry in self._palette)
 
+		# Same data as arrays for vectorized lookups
+		self._pos_array = numpy.array(self._pos, dtype = float)
+		self._rgb_array = numpy.array([ (entry.r, entry.g, entry.b) for entry in self._palette ], dtype = float)
+		self._luts = { }
+
 	def _parse_palette(self, palette_data):
 		palette = [ ]
 		for (eid, element) in enumerate(palette_data):
@@ -117,6 +123,40 @@ class AdvancedColorPalette(object):
 		result = self._mix(pos, col_prev, col_next)
 		return result
 
+	def mix_float_colors(self, positions):
+		"""Vectorized mix_float_color(): returns a float array of shape
+		positions.shape + (3, ) with components from 0 to 1."""
+		positions = numpy.clip(numpy.asarray(positions, dtype = float), 0, 1)
+		index = numpy.searchsorted(self._pos_array, positions, side = "right") - 1
+		index = numpy.clip(index, 0, len(self._pos) - 2)
+		pos_prev = self._pos_array[index]
+		p = ((positions - pos_prev) / (self._pos_array[index + 1] - pos_prev))[..., numpy.newaxis]
+		return (self._rgb_array[index] * (1 - p)) + (self._rgb_array[index + 1] * p)
+
+	def sample(self, positions):
+		"""Vectorized __getitem__(): returns an uint8 RGB array of shape
+		positions.shape + (3, )."""
+		return numpy.rint(self.mix_float_colors(positions) * 255).astype(numpy.uint8)
+
+	def lut(self, size = 4096):
+		"""Returns a cached lookup table of the given number of equidistant
+		samples from position 0 to 1, as read-only uint8 array of shape
+		(size, 3)."""
+		if size not in self._luts:
+			lut = self.sample(numpy.arange(size) / (size - 1))
+			# Shared by all callers, which must not corrupt it for the others
+			lut.flags.writeable = False
+			self._luts[size] = lut
+		return self._luts[size]
+
+	def lookup(self, positions, lut_size = 4096):
+		"""Colors an array of positions by picking the nearest entry of the
+		lookup table of the given size. Much cheaper than sample() for full
+		frames, but quantizes positions to lut_size steps."""
+		lut = self.lut(lut_size)
+		index = numpy.rint(numpy.clip(positions, 0, 1) * (lut_size - 1)).astype(numpy.intp)
+		return lut[index]
+
 	def mix_int_color(self, pos):
 		(r, g, b) = self[pos]
 		return (r << 16) | (g << 8) | b
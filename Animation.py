@@ -0,0 +1,211 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import math
+import copy
+import bisect
+from geo import Viewport2d
+from ImageWriter import ImageWriter
+
+class Animation(object):
+	"""Sequence of keyframes, each of which holds the viewport state and scene
+	parameters at a point in time. In between, the logical size is
+	interpolated logarithmically so that zooms proceed at a constant rate,
+	and the center moves along with it so that the point zoomed into stays
+	put on screen. Numeric properties are interpolated linearly, all other
+	parameters are taken from the preceding keyframe."""
+
+	def __init__(self):
+		self._times = [ ]
+		self._keyframes = [ ]
+
+	@property
+	def duration(self):
+		return self._times[-1] if (len(self._times) > 0) else 0
+
+	def add_keyframe(self, time, viewport, scene_params):
+		"""Adds a keyframe at the given time in seconds. The viewport state and
+		scene parameters are copied, so the objects may be changed afterwards."""
+		assert(time >= 0)
+		if time in self._times:
+			raise Exception("There already is a keyframe at t = %f." % (time))
+		keyframe = {
+			"device_size":		(viewport.device_size.x, viewport.device_size.y),
+			"center":			(viewport.logical_center.x, viewport.logical_center.y),
+			"size":				(viewport.logical_size.x, viewport.logical_size.y),
+			"scene_params":		copy.deepcopy(scene_params),
+		}
+		index = bisect.bisect(self._times, time)
+		self._times.insert(index, time)
+		self._keyframes.insert(index, keyframe)
+
+	@staticmethod
+	def _interpolate_value(value1, value2, t):
+		if isinstance(value1, bool) or (type(value1) != type(value2)):
+			return value1
+		if isinstance(value1, int):
+			return round(value1 + (value2 - value1) * t)
+		if isinstance(value1, (float, complex)):
+			return value1 + (value2 - value1) * t
+		if isinstance(value1, (tuple, list)) and (len(value1) == len(value2)):
+			return type(value1)(Animation._interpolate_value(element1, element2, t) for (element1, element2) in zip(value1, value2))
+		return value1
+
+	@staticmethod
+	def _interpolate_view(keyframe1, keyframe2, t):
+		"""Interpolates center and size between two keyframes. The size
+		follows s(t) = s1 * (s2 / s1)^t; the center is moved proportionally
+		to the change in size, which keeps the fixed point of the zoom at
+		the same device position. Without a zoom, the center moves
+		linearly."""
+		(center1, center2) = (keyframe1["center"], keyframe2["center"])
+		(size1, size2) = (keyframe1["size"], keyframe2["size"])
+		size = tuple(s1 * ((s2 / s1) ** t) for (s1, s2) in zip(size1, size2))
+		if abs(math.log(size2[1] / size1[1])) > 1e-9:
+			weight = (size1[1] - size[1]) / (size1[1] - size2[1])
+		else:
+			weight = t
+		center = tuple(c1 + (c2 - c1) * weight for (c1, c2) in zip(center1, center2))
+		return (center, size)
+
+	def at(self, time):
+		"""Returns a tuple of the interpolated viewport and scene parameters at
+		the given time; outside of the keyframes, the first or last one is
+		held."""
+		assert(len(self._keyframes) > 0)
+		index = bisect.bisect_right(self._times, time)
+		if index == 0:
+			(keyframe1, keyframe2, t) = (self._keyframes[0], self._keyframes[0], 0)
+		elif index == len(self._times):
+			(keyframe1, keyframe2, t) = (self._keyframes[-1], self._keyframes[-1], 0)
+		else:
+			(keyframe1, keyframe2) = (self._keyframes[index - 1], self._keyframes[index])
+			t = (time - self._times[index - 1]) / (self._times[index] - self._times[index - 1])
+
+		(center, size) = self._interpolate_view(keyframe1, keyframe2, t)
+		(device_width, device_height) = keyframe1["device_size"]
+		viewport = Viewport2d(device_width = device_width, device_height = device_height, logical_center_x = center[0], logical_center_y = center[1], logical_width = size[0], logical_height = size[1])
+
+		scene_params = copy.deepcopy(keyframe1["scene_params"])
+		properties2 = keyframe2["scene_params"]["properties"]
+		for (key, value) in scene_params["properties"].items():
+			if key in properties2:
+				scene_params["properties"][key] = self._interpolate_value(value, properties2[key], t)
+		return (viewport, scene_params)
+
+	def frame_times(self, fps):
+		"""Yields the time of every frame at the given frame rate, from the
+		first to the last keyframe."""
+		assert(fps > 0)
+		frame_count = math.floor(round(self.duration * fps, 6)) + 1
+		for frame in range(frame_count):
+			yield frame / fps
+
+	def frames(self, fps):
+		"""Generator of the (viewport, scene_params) tuples of every frame."""
+		for time in self.frame_times(fps):
+			yield self.at(time)
+
+class AnimationRenderer(object):
+	"""Renders the frames of an Animation one after the other with a single
+	handler (any object with a render(viewport, scene_params) method that
+	returns an uint8 RGB image, such as CPUHandler). Since the handler is
+	kept, engines, palettes, lookup tables and worker processes are only set
+	up once, and as frames are generated lazily, memory use does not depend
+	on the length of the animation."""
+
+	def __init__(self, handler, animation, fps = 25):
+		self._handler = handler
+		self._animation = animation
+		self._fps = fps
+
+	@property
+	def fps(self):
+		return self._fps
+
+	@property
+	def frame_count(self):
+		return sum(1 for time in self._animation.frame_times(self._fps))
+
+	def frames(self):
+		"""Generator of the rendered images. Once all frames are rendered, the
+		handler is closed if it has a close() method (like CPUHandler, which
+		then terminates its worker processes)."""
+		try:
+			for (viewport, scene_params) in self._animation.frames(self._fps):
+				yield self._handler.render(viewport, scene_params)
+		finally:
+			if hasattr(self._handler, "close"):
+				self._handler.close()
+
+	def write(self, f, video_format = "y4m"):
+		"""Streams all frames to the binary file-like object f; returns the
+		number of frames written."""
+		writer = None
+		for image in self.frames():
+			if writer is None:
+				(height, width) = image.shape[:2]
+				writer = FrameStreamWriter(f, width, height, fps = self._fps, video_format = video_format)
+			writer.write_frame(image)
+		return 0 if (writer is None) else writer.frame_count
+
+class FrameStreamWriter(object):
+	"""Writes uint8 RGB frames as video stream to a binary file-like object,
+	e.g., a file or a pipe into an encoder. Supported formats are YUV4MPEG2
+	("y4m", full resolution 4:4:4 chroma, BT.601 coefficients) and a plain
+	sequence of binary PPM images ("ppm")."""
+
+	def __init__(self, f, width, height, fps = 25, video_format = "y4m"):
+		if video_format not in [ "y4m", "ppm" ]:
+			raise Exception("Unsupported video format: %s" % (video_format))
+		self._f = f
+		self._width = width
+		self._height = height
+		self._video_format = video_format
+		self._frame_count = 0
+		if self._video_format == "y4m":
+			(numerator, denominator) = (round(fps * 1000), 1000)
+			divisor = math.gcd(numerator, denominator)
+			self._f.write(("YUV4MPEG2 W%d H%d F%d:%d Ip A1:1 C444\n" % (width, height, numerator // divisor, denominator // divisor)).encode("ascii"))
+
+	@property
+	def frame_count(self):
+		return self._frame_count
+
+	@staticmethod
+	def rgb_to_yuv444(image):
+		"""Converts an uint8 RGB image to studio swing Y, U and V planes."""
+		rgb = image.astype(float)
+		(r, g, b) = (rgb[..., 0], rgb[..., 1], rgb[..., 2])
+		y = 16 + ((65.481 * r) + (128.553 * g) + (24.966 * b)) / 255
+		u = 128 + ((-37.797 * r) - (74.203 * g) + (112.0 * b)) / 255
+		v = 128 + ((112.0 * r) - (93.786 * g) - (18.214 * b)) / 255
+		return tuple(plane.round().clip(0, 255).astype("uint8") for plane in (y, u, v))
+
+	def write_frame(self, image):
+		assert(image.shape == (self._height, self._width, 3))
+		if self._video_format == "y4m":
+			self._f.write(b"FRAME\n")
+			for plane in self.rgb_to_yuv444(image):
+				self._f.write(plane.tobytes())
+		else:
+			self._f.write(ImageWriter.encode_ppm(image))
+		self._frame_count += 1
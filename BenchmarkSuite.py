@@ -0,0 +1,190 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import json
+import time
+import platform
+import numpy
+from geo import Viewport2d
+from NewtonSolver import Polynomial
+from NewtonCPUEngine import NewtonCPUEngine
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from PerturbationCPUEngine import PerturbationCPUEngine
+from MarianiSilverRenderer import MarianiSilverRenderer
+
+class BenchmarkSuite(object):
+	"""Renders a fixed set of scenes with every applicable CPU engine and
+	measures the throughput. Each combination of scene, engine, resolution
+	and iteration limit is run several times and the fastest run counts.
+
+	Iterations are counted from the result, i.e., they are the iterations a
+	brute force computation of the same image performs. Engines which skip
+	work (interior checks, periodicity detection, subdivision) therefore
+	show up with higher iteration rates, which makes rates comparable
+	across engines."""
+
+	_MANDELBROT_ENGINES = {
+		"numpy":			lambda: MandelbrotJuliaCPUEngine(),
+		"mariani-silver":	lambda: MarianiSilverRenderer(MandelbrotJuliaCPUEngine()),
+		"perturbation":		lambda: PerturbationCPUEngine(),
+	}
+	_NEWTON_ENGINES = {
+		"numpy":			lambda: NewtonCPUEngine(),
+	}
+
+	# Newton polynomials are z^n - 1, whose roots are the n-th roots of unity
+	SCENES = {
+		"mandelbrot-overview":	{ "type": "mandelbrot", "center": (-0.5, 0), "size": 3, "properties": { "is_mandelbrot": 1, "julia_coeff": complex(0) } },
+		"seahorse-valley":		{ "type": "mandelbrot", "center": (-0.7436, 0.1318), "size": 0.01, "properties": { "is_mandelbrot": 1, "julia_coeff": complex(0) } },
+		"julia":				{ "type": "julia", "center": (0, 0), "size": 3, "properties": { "is_mandelbrot": 0, "julia_coeff": complex(-0.8, 0.156) } },
+		"newton-3":				{ "type": "newton", "center": (0, 0), "size": 3, "properties": { "poly": Polynomial(*([ -1 ] + ([ 0 ] * 2) + [ 1 ])) } },
+		"newton-8":				{ "type": "newton", "center": (0, 0), "size": 3, "properties": { "poly": Polynomial(*([ -1 ] + ([ 0 ] * 7) + [ 1 ])) } },
+		"newton-16":			{ "type": "newton", "center": (0, 0), "size": 3, "properties": { "poly": Polynomial(*([ -1 ] + ([ 0 ] * 15) + [ 1 ])) } },
+	}
+
+	DEFAULT_RESOLUTIONS = [ (320, 240), (640, 480) ]
+	DEFAULT_ITERATIONS = {
+		"mandelbrot":	[ 100, 1000 ],
+		"julia":		[ 100, 1000 ],
+		"newton":		[ 25, 50 ],
+	}
+
+	def __init__(self, resolutions = None, max_iterations = None, scenes = None, engines = None, repeats = 3):
+		self._resolutions = resolutions or self.DEFAULT_RESOLUTIONS
+		self._max_iterations = max_iterations
+		self._scenes = scenes or sorted(self.SCENES)
+		self._engines = engines
+		self._repeats = repeats
+		for scene in self._scenes:
+			if scene not in self.SCENES:
+				raise Exception("Unknown benchmark scene: %s" % (scene))
+
+	@classmethod
+	def _available_engines(cls, scene):
+		return cls._NEWTON_ENGINES if (scene["type"] == "newton") else cls._MANDELBROT_ENGINES
+
+	def cases(self):
+		"""Yields (scene_name, engine_name, resolution, max_iterations) of all
+		benchmark runs."""
+		for scene_name in self._scenes:
+			scene = self.SCENES[scene_name]
+			for engine_name in sorted(self._available_engines(scene)):
+				if (self._engines is not None) and (engine_name not in self._engines):
+					continue
+				for resolution in self._resolutions:
+					for max_iterations in (self._max_iterations or self.DEFAULT_ITERATIONS[scene["type"]]):
+						yield (scene_name, engine_name, tuple(resolution), max_iterations)
+
+	@staticmethod
+	def case_key(scene_name, engine_name, resolution, max_iterations):
+		return "%s/%s/%dx%d/%d" % (scene_name, engine_name, resolution[0], resolution[1], max_iterations)
+
+	@staticmethod
+	def _performed_iterations(engine, data, max_iterations):
+		# Values record the iteration in which the pixel finished, i.e., one
+		# less than the number of iterations performed
+		iterations = engine.iterations(data)
+		return int(numpy.sum(numpy.minimum(numpy.asarray(iterations, dtype = numpy.int64) + 1, max_iterations)))
+
+	def run_case(self, scene_name, engine_name, resolution, max_iterations):
+		scene = self.SCENES[scene_name]
+		engine = self._available_engines(scene)[engine_name]()
+		target = engine.engine if isinstance(engine, MarianiSilverRenderer) else engine
+		for (key, value) in scene["properties"].items():
+			target.set_property(key, value)
+		target.set_property("max_iterations", max_iterations)
+		(width, height) = resolution
+		viewport = Viewport2d(device_width = width, device_height = height, logical_center_x = scene["center"][0], logical_center_y = scene["center"][1], logical_width = scene["size"], logical_height = scene["size"], keep_aspect_ratio = True)
+
+		best = None
+		for repeat in range(self._repeats):
+			t0 = time.perf_counter()
+			data = engine.compute(viewport)
+			duration = time.perf_counter() - t0
+			if (best is None) or (duration < best):
+				best = duration
+		best = max(best, 1e-9)
+		pixels = width * height
+		iterations = self._performed_iterations(engine, data, max_iterations)
+		return {
+			"scene":					scene_name,
+			"engine":					engine_name,
+			"resolution":				[ width, height ],
+			"max_iterations":			max_iterations,
+			"seconds":					best,
+			"iterations":				iterations,
+			"pixels_per_second":		pixels / best,
+			"iterations_per_second":	iterations / best,
+		}
+
+	@staticmethod
+	def environment():
+		return {
+			"python":		platform.python_version(),
+			"numpy":		numpy.__version__,
+			"machine":		platform.machine(),
+			"processor":	platform.processor(),
+			"system":		platform.system(),
+		}
+
+	def run(self, progress = None):
+		"""Runs all cases and returns a JSON serializable result dictionary.
+		The optional progress callback is called with every result."""
+		results = { }
+		for case in self.cases():
+			result = self.run_case(*case)
+			results[self.case_key(*case)] = result
+			if progress is not None:
+				progress(result)
+		return {
+			"environment":	self.environment(),
+			"results":		results,
+		}
+
+	@staticmethod
+	def compare(results, baseline, tolerance = 0.1):
+		"""Compares results against a baseline result dictionary. Returns a
+		list of (key, reason) tuples for every case that got slower by more
+		than the tolerance (relative pixel rate) or whose iteration count
+		changed, which means that the engine computes something else than
+		before. Cases missing in either are ignored."""
+		regressions = [ ]
+		for (key, baseline_result) in sorted(baseline["results"].items()):
+			result = results["results"].get(key)
+			if result is None:
+				continue
+			ratio = result["pixels_per_second"] / baseline_result["pixels_per_second"]
+			if ratio < 1 - tolerance:
+				regressions.append((key, "%.1f%% slower (%.0f vs. %.0f pixels/s)" % ((1 - ratio) * 100, result["pixels_per_second"], baseline_result["pixels_per_second"])))
+			if result["iterations"] != baseline_result["iterations"]:
+				regressions.append((key, "iteration count changed from %d to %d" % (baseline_result["iterations"], result["iterations"])))
+		return regressions
+
+	@staticmethod
+	def load(filename):
+		with open(filename) as f:
+			return json.load(f)
+
+	@staticmethod
+	def save(filename, results):
+		with open(filename, "w") as f:
+			json.dump(results, f, indent = 4, sort_keys = True)
+			f.write("\n")
@@ -0,0 +1,158 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import numpy
+
+class CPUEngine(object):
+	"""Base class for NumPy fractal engines. They take the same properties as
+	their GLSL fragment shader counterparts and compute the whole pixel grid
+	at once. Rendering is split into compute(), which returns the raw
+	per-pixel data, and colorize(), which turns that into an RGB image
+	exactly like the shader's texture lookup does."""
+
+	# Properties which only affect colorize(), not compute()
+	colorize_properties = frozenset()
+
+	# Number of arrays the per-pixel data of compute() consists of
+	data_plane_count = 1
+
+	def __init__(self):
+		self._properties = { }
+
+	def set_property(self, key, value):
+		self._properties[key] = value
+
+	def get_property(self, key):
+		return self._properties[key]
+
+	def compute_properties(self):
+		"""Returns a dictionary of all properties that the result of compute()
+		depends on. As long as it and the viewport are unchanged, the computed
+		data can be colorized again instead of being recomputed."""
+		return { key: value for (key, value) in self._properties.items() if key not in self.colorize_properties }
+
+	@staticmethod
+	def device_dimensions(viewport):
+		return (round(viewport.device_size.x), round(viewport.device_size.y))
+
+	@classmethod
+	def pixel_offsets_at(cls, viewport, x, y):
+		"""Returns a complex array holding the logical offset of the pixel
+		centers at the image coordinates x and y (which are broadcast against
+		each other) relative to the logical center. Row 0 is the top
+		of the image, i.e., the largest logical y value, which is how image
+		files are laid out (OpenGL has its origin in the lower left corner
+		instead)."""
+		(width, height) = cls.device_dimensions(viewport)
+		(x, y) = viewport.pixel_center_offsets(x, y, width, height)
+		return x + 1j * y
+
+	@classmethod
+	def region_coordinates(cls, viewport, region = None):
+		"""Returns the image coordinates (x, y) of a region (x, y, width,
+		height) of the viewport, or of all of it, shaped so that they
+		broadcast to an array of shape (height, width)."""
+		(x0, y0, w, h) = region or ((0, 0) + cls.device_dimensions(viewport))
+		return (numpy.arange(x0, x0 + w)[numpy.newaxis, :], numpy.arange(y0, y0 + h)[:, numpy.newaxis])
+
+	@classmethod
+	def pixel_offsets(cls, viewport, region = None):
+		"""Returns a complex array of shape (height, width) holding the logical
+		offset of every pixel center relative to the logical center. If a
+		region (x, y, width, height) is given, only that part of the image is
+		returned."""
+		return cls.pixel_offsets_at(viewport, *cls.region_coordinates(viewport, region))
+
+	@classmethod
+	def pixel_grid_at(cls, viewport, x, y):
+		"""Returns a complex array holding the logical coordinate of the pixel
+		centers at the image coordinates x and y."""
+		center = viewport.logical_center
+		return cls.pixel_offsets_at(viewport, x, y) + complex(center.x, center.y)
+
+	@classmethod
+	def pixel_grid(cls, viewport, region = None):
+		"""Returns a complex array holding the logical coordinate of every
+		pixel center, laid out like pixel_offsets()."""
+		return cls.pixel_grid_at(viewport, *cls.region_coordinates(viewport, region))
+
+	@staticmethod
+	def create_lut(palette, data_points = 256):
+		"""Creates the same lookup table GLHandler uploads as 1D texture, as a
+		float array of shape (data_points, 3) with values from 0 to 1."""
+		return palette.lut(data_points) / 255
+
+	@staticmethod
+	def texture1d(lut, coord):
+		"""Emulates texture1D() on a GL_CLAMP/GL_LINEAR 1D texture: texels are
+		centered at (i + 0.5) / n, and lookups that reach outside of the
+		texture blend with the (black) border color."""
+		texels = len(lut)
+		padded = numpy.concatenate((numpy.zeros((1, lut.shape[1])), lut, numpy.zeros((1, lut.shape[1]))))
+		position = (numpy.clip(coord, 0, 1) * texels) - 0.5
+		lower = numpy.floor(position)
+		frac = (position - lower)[..., numpy.newaxis]
+		index = lower.astype(int) + 1
+		return (padded[index] * (1 - frac)) + (padded[index + 1] * frac)
+
+	@staticmethod
+	def to_rgb8(color):
+		"""Converts a float color array to uint8, clamping like the
+		framebuffer does."""
+		return numpy.rint(numpy.clip(color, 0, 1) * 255).astype(numpy.uint8)
+
+	def pan_reusable(self):
+		"""Tells if the data of a viewport which differs only by a whole
+		number of pixels in its logical center may be reused by shifting it,
+		i.e., if pixel values do not depend on the center itself."""
+		return True
+
+	def compute_at(self, viewport, x, y):
+		"""Computes the per-pixel data of the pixels at the image coordinates x
+		and y, which need not form a rectangle. Fractional coordinates address
+		positions within a pixel, offset from its center."""
+		raise NotImplementedError()
+
+	def compute(self, viewport, region = None):
+		"""Computes the per-pixel data of the viewport, or of the given region
+		(x, y, width, height) of it."""
+		return self.compute_at(viewport, *self.region_coordinates(viewport, region))
+
+	def colorize(self, data, lut):
+		raise NotImplementedError()
+
+	def iterations(self, data):
+		"""Returns the iteration count array of the per-pixel data."""
+		return data
+
+	def split_data(self, data):
+		"""Returns the per-pixel data as a tuple of data_plane_count arrays of
+		identical shape, the first of which holds the iteration counts."""
+		return (data, )
+
+	def join_data(self, planes):
+		"""Inverse of split_data()."""
+		return planes[0]
+
+	def render(self, viewport, palette):
+		"""Computes and colorizes the viewport; returns an uint8 array of shape
+		(height, width, 3)."""
+		return self.colorize(self.compute(viewport), self.create_lut(palette))
@@ -0,0 +1,254 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+from NewtonCPUEngine import NewtonCPUEngine
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from PerturbationCPUEngine import PerturbationCPUEngine
+from PaletteRegistry import PaletteRegistry
+from TiledRenderer import TiledRenderer
+from MarianiSilverRenderer import MarianiSilverRenderer
+import numpy
+
+class CPUHandler(object):
+	"""Counterpart of GLHandler which renders the same scene parameters with
+	the NumPy engines, without requiring a GL context."""
+
+	def __init__(self, tile_size = 256, workers = 1, subdivide = False, palette_registry = None, auto_iterations = None, supersampler = None):
+		self._tile_size = tile_size
+		self._workers = workers
+		self._subdivide = subdivide
+		self._palette_registry = palette_registry or PaletteRegistry()
+		self._engine_input = None
+		self._engine = None
+		self._palette = None
+		self._data_input = None
+		self._data_center = None
+		self._data = None
+		self._computed_pixels = 0
+		self._statistics = { }
+		self._auto_iterations = auto_iterations
+		self._supersampler = supersampler
+		self._tiled_renderer = None
+		self._tiled_input = None
+
+	@property
+	def auto_iterations(self):
+		"""AdaptiveIterations object which overrides max_iterations, or None."""
+		return self._auto_iterations
+
+	@property
+	def supersampler(self):
+		"""AdaptiveSupersampler which anti-aliases rendered images, or None."""
+		return self._supersampler
+
+	@property
+	def engine(self):
+		return self._engine
+
+	@property
+	def palette(self):
+		return self._palette
+
+	@property
+	def data(self):
+		"""Data computed by the last in-process render(), i.e., the iteration
+		buffer that is colorized."""
+		return self._data
+
+	@property
+	def computed_pixels(self):
+		"""Number of pixels the last in-process render() computed; zero if
+		it only colorized again, less than the pixel count if it reused a
+		panned frame."""
+		return self._computed_pixels
+
+	@property
+	def statistics(self):
+		"""Statistics of the engine and renderer of the last in-process
+		render() which computed the whole viewport, e.g., the number of
+		pixels MarianiSilverRenderer filled without computing them or the
+		reference orbits PerturbationCPUEngine used."""
+		return self._statistics
+
+	@property
+	def palette_registry(self):
+		return self._palette_registry
+
+	def _initialize_engine(self, scene_params):
+		engine_input = (scene_params["type"], scene_params.get("deep_zoom", False))
+
+		if engine_input != self._engine_input:
+			self._engine_input = engine_input
+			engine_class = {
+				("newton", False):		NewtonCPUEngine,
+				("mandelbrot", False):	MandelbrotJuliaCPUEngine,
+				("julia", False):		MandelbrotJuliaCPUEngine,
+				("mandelbrot", True):	PerturbationCPUEngine,
+				("julia", True):		PerturbationCPUEngine,
+			}[engine_input]
+			self._engine = engine_class()
+
+	def _initialize_palette(self, scene_params):
+		self._palette = self._palette_registry.get(scene_params["color_scheme_filename"], scene_params["color_scheme"])
+
+	def setup(self, scene_params, viewport = None):
+		self._initialize_engine(scene_params)
+		self._initialize_palette(scene_params)
+		for (key, value) in scene_params["properties"].items():
+			self._engine.set_property(key, value)
+		if (self._auto_iterations is not None) and (viewport is not None):
+			self._engine.set_property("max_iterations", self._auto_iterations.limit(viewport))
+		if (viewport is not None) and isinstance(self._engine, PerturbationCPUEngine):
+			if viewport.high_precision:
+				# The reference orbit is computed for the exact center; all
+				# pixels are floating point offsets to it
+				self._engine.set_property("precise_center", viewport.decimal_center())
+			elif "precise_center" not in scene_params["properties"]:
+				# Not left over from a previous high precision viewport
+				self._engine.set_property("precise_center", None)
+
+	def render(self, viewport, scene_params):
+		"""Renders the viewport; returns an uint8 RGB array of shape (height,
+		width, 3). When rendering in-process, the computed data is kept, so
+		that a following render of the same viewport and scene which only
+		differs in palette or coloring properties merely colorizes again.
+		With automatic iterations, the iteration data of every in-process
+		computation adapts the limit of the following renders.
+
+		High precision viewports are rendered from their floating point
+		approximation, except for deep zoom scenes, whose reference orbit is
+		computed for the exact center."""
+		self.setup(scene_params, viewport)
+		if viewport.high_precision:
+			viewport = viewport.to_float()
+		renderer = self._engine
+		if self._subdivide and (scene_params["type"] != "newton"):
+			# Newton fractals are colored by more than the iteration count,
+			# which subdivision cannot fill in
+			renderer = MarianiSilverRenderer(renderer)
+		if self._workers != 1:
+			if self._supersampler is None:
+				return self._get_tiled_renderer(renderer).render(viewport, self._palette)
+			# Edges are detected by the same data as in-process
+			(data, image) = self._get_tiled_renderer(renderer).render_with_data(viewport, self._palette)
+			return self._supersampler.refine(self._engine, viewport, data, image, self._engine.create_lut(self._palette))
+
+		# Everything but the center has to match for the previous data to be
+		# reusable
+		data_input = (self._engine, type(renderer), tuple(viewport.device_size), tuple(viewport.logical_size), self._engine.compute_properties())
+		center = tuple(viewport.logical_center)
+		if data_input != self._data_input:
+			self._compute(renderer, viewport)
+		elif center != self._data_center:
+			shift = self._pan_shift(viewport)
+			if shift is None:
+				self._compute(renderer, viewport)
+			else:
+				self._compute_panned(renderer, viewport, shift)
+		else:
+			self._computed_pixels = 0
+		self._data_input = data_input
+		self._data_center = center
+		if (self._auto_iterations is not None) and (self._computed_pixels > 0):
+			self._auto_iterations.feedback_iterations(self._engine.iterations(self._data), self._engine.get_property("max_iterations"))
+		lut = self._engine.create_lut(self._palette)
+		image = self._engine.colorize(self._data, lut)
+		if self._supersampler is not None:
+			image = self._supersampler.refine(self._engine, viewport, self._data, image, lut)
+		return image
+
+	def _get_tiled_renderer(self, renderer):
+		"""Returns the TiledRenderer for the renderer. It is kept along with
+		its worker pool across frames, until the engine or the kind of
+		renderer changes."""
+		tiled_input = (self._engine, type(renderer))
+		if tiled_input != self._tiled_input:
+			self.close()
+			self._tiled_renderer = TiledRenderer(renderer, tile_size = self._tile_size, workers = self._workers)
+			self._tiled_input = tiled_input
+		return self._tiled_renderer
+
+	def close(self):
+		"""Terminates the worker processes of multi-worker rendering, e.g., at
+		the end of an animation. Later renders start them again."""
+		if self._tiled_renderer is not None:
+			self._tiled_renderer.close()
+			self._tiled_renderer = None
+			self._tiled_input = None
+
+	def _compute(self, renderer, viewport):
+		self._data = renderer.compute(viewport)
+		self._statistics = { }
+		for source in (self._engine, renderer):
+			self._statistics.update(getattr(source, "statistics", { }))
+		(width, height) = self._engine.device_dimensions(viewport)
+		self._computed_pixels = width * height
+
+	def _pan_shift(self, viewport):
+		"""Returns the integer pixel offset (x, y) by which the image content
+		moved since the last frame, i.e., pixel (x, y) now shows what was at
+		(x + shift_x, y + shift_y) before. Returns None if the previous data
+		cannot be reused."""
+		if not self._engine.pan_reusable():
+			return None
+		(width, height) = self._engine.device_dimensions(viewport)
+		shift = viewport.pan_offset(self._data_center[0], self._data_center[1], width, height)
+		if shift is None:
+			return None
+		# Image rows count from the top, device coordinates from the bottom
+		return (shift[0], -shift[1])
+
+	@staticmethod
+	def _shifted(data, shift_x, shift_y):
+		(height, width) = data.shape[:2]
+		result = numpy.empty_like(data)
+		(dst_x, dst_y) = (max(0, -shift_x), max(0, -shift_y))
+		(src_x, src_y) = (max(0, shift_x), max(0, shift_y))
+		(w, h) = (width - abs(shift_x), height - abs(shift_y))
+		result[dst_y : dst_y + h, dst_x : dst_x + w] = data[src_y : src_y + h, src_x : src_x + w]
+		return result
+
+	def _compute_panned(self, renderer, viewport, shift):
+		"""Shifts the previous data by the pan offset and only computes the
+		strips of pixels that became exposed."""
+		(shift_x, shift_y) = shift
+		(width, height) = self._engine.device_dimensions(viewport)
+		data = tuple(self._shifted(plane, shift_x, shift_y) for plane in self._engine.split_data(self._data))
+
+		regions = [ ]
+		if shift_x > 0:
+			regions.append((width - shift_x, 0, shift_x, height))
+		elif shift_x < 0:
+			regions.append((0, 0, -shift_x, height))
+		(x, w) = (max(0, -shift_x), width - abs(shift_x))
+		if shift_y > 0:
+			regions.append((x, height - shift_y, w, shift_y))
+		elif shift_y < 0:
+			regions.append((x, 0, w, -shift_y))
+
+		self._computed_pixels = 0
+		for region in regions:
+			values = renderer.compute(viewport, region = region)
+			(x, y, w, h) = region
+			for (plane, plane_values) in zip(data, self._engine.split_data(values)):
+				plane[y : y + h, x : x + w] = plane_values
+			self._computed_pixels += w * h
+		self._data = self._engine.join_data(data)
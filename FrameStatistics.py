@@ -0,0 +1,215 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import time
+import collections
+import contextlib
+import numpy
+
+try:
+	from OpenGL import GL
+except ImportError:
+	GL = None
+
+class FrameStatistics(object):
+	"""Rolling timing statistics of the last frames. Durations are recorded
+	in seconds per named phase (e.g., "compute" or "uniform_upload"); a phase
+	which is recorded several times within one frame counts as the sum of
+	them. Only the most recent "window" frames are kept."""
+
+	def __init__(self, window = 120, clock = time.perf_counter):
+		self._window = window
+		self._clock = clock
+		self._phases = collections.OrderedDict()
+		self._current = collections.OrderedDict()
+		self._frame_starts = collections.deque(maxlen = window)
+		self._frame_count = 0
+
+	@property
+	def frame_count(self):
+		return self._frame_count
+
+	@property
+	def phases(self):
+		return list(self._phases)
+
+	def begin_frame(self):
+		self._current = collections.OrderedDict()
+		self._frame_starts.append(self._clock())
+
+	def record(self, phase, duration):
+		self._current[phase] = self._current.get(phase, 0) + duration
+
+	@contextlib.contextmanager
+	def measure(self, phase):
+		"""Context manager which records the CPU time spent in its block."""
+		t0 = self._clock()
+		try:
+			yield
+		finally:
+			self.record(phase, self._clock() - t0)
+
+	def end_frame(self):
+		for (phase, duration) in self._current.items():
+			if phase not in self._phases:
+				self._phases[phase] = collections.deque(maxlen = self._window)
+			self._phases[phase].append(duration)
+		self._current = collections.OrderedDict()
+		self._frame_count += 1
+
+	def percentile(self, phase, percent):
+		"""Returns the given percentile of the phase's durations in seconds, or
+		None if it was never recorded."""
+		durations = self._phases.get(phase)
+		if (durations is None) or (len(durations) == 0):
+			return None
+		return float(numpy.percentile(numpy.array(durations), percent))
+
+	@property
+	def fps(self):
+		"""Frames per second, from the start times of the recent frames.
+		This includes time spent outside of rendering, e.g., by the toolkit."""
+		if len(self._frame_starts) < 2:
+			return None
+		elapsed = self._frame_starts[-1] - self._frame_starts[0]
+		if elapsed <= 0:
+			return None
+		return (len(self._frame_starts) - 1) / elapsed
+
+	def summary(self):
+		"""Returns a dictionary of phase names to dictionaries holding p50 and
+		p95 durations in seconds, plus the frame rate under the "fps" key."""
+		summary = collections.OrderedDict()
+		for phase in self._phases:
+			summary[phase] = { "p50": self.percentile(phase, 50), "p95": self.percentile(phase, 95) }
+		summary["fps"] = self.fps
+		return summary
+
+	def format(self):
+		"""Multi-line human readable text of the summary, in milliseconds."""
+		lines = [ ]
+		fps = self.fps
+		lines.append("FPS: %s" % ("-" if (fps is None) else ("%.1f" % (fps))))
+		for phase in self._phases:
+			lines.append("%s: %.2f ms p50, %.2f ms p95" % (phase, self.percentile(phase, 50) * 1000, self.percentile(phase, 95) * 1000))
+		return "\n".join(lines)
+
+	def reset(self):
+		self._phases = collections.OrderedDict()
+		self._current = collections.OrderedDict()
+		self._frame_starts.clear()
+		self._frame_count = 0
+
+class GPUTimer(object):
+	"""Measures GPU time of phases with GL_TIME_ELAPSED queries. Results are
+	only read once the GPU made them available, which is typically one or two
+	frames later, so measuring never stalls the pipeline; each phase keeps a
+	small ring of queries for that reason. If the driver does not support
+	timer queries, the timer disables itself and measures nothing."""
+
+	def __init__(self, gl = None, ring_size = 4):
+		self._gl = gl or GL
+		self._ring_size = ring_size
+		self._free = { }
+		self._pending = collections.deque()
+		self._active = None
+		self._supported = None
+
+	@property
+	def supported(self):
+		return self._supported is not False
+
+	def _query(self, phase):
+		free = self._free.setdefault(phase, [ ])
+		if len(free) > 0:
+			return free.pop()
+		if sum(1 for (pending_phase, query) in self._pending if pending_phase == phase) >= self._ring_size:
+			# All queries of this phase are still in flight; skip measuring it
+			return None
+		return self._gl.glGenQueries(1)
+
+	def begin(self, phase):
+		if (self._supported is False) or (self._active is not None):
+			return
+		try:
+			query = self._query(phase)
+			if query is None:
+				return
+			self._gl.glBeginQuery(self._gl.GL_TIME_ELAPSED, query)
+			self._active = (phase, query)
+			self._supported = True
+		except Exception:
+			self._supported = False
+
+	def end(self):
+		if self._active is None:
+			return
+		self._gl.glEndQuery(self._gl.GL_TIME_ELAPSED)
+		self._pending.append(self._active)
+		self._active = None
+
+	@contextlib.contextmanager
+	def measure(self, phase):
+		self.begin(phase)
+		try:
+			yield
+		finally:
+			self.end()
+
+	def collect(self, statistics, prefix = "gpu_"):
+		"""Records the durations of all queries whose results are available
+		into the FrameStatistics, in submission order."""
+		while len(self._pending) > 0:
+			(phase, query) = self._pending[0]
+			if not self._gl.glGetQueryObjectiv(query, self._gl.GL_QUERY_RESULT_AVAILABLE):
+				break
+			self._pending.popleft()
+			elapsed_ns = self._gl.glGetQueryObjectui64v(query, self._gl.GL_QUERY_RESULT)
+			statistics.record(prefix + phase, elapsed_ns / 1e9)
+			self._free[phase].append(query)
+
+	def release(self):
+		queries = [ query for queries in self._free.values() for query in queries ] + [ query for (phase, query) in self._pending ]
+		if len(queries) > 0:
+			self._gl.glDeleteQueries(len(queries), queries)
+		self._free = { }
+		self._pending.clear()
+		self._active = None
+
+def iteration_histogram(iterations, max_iterations, bins = 64, late_range = 0.1):
+	"""Histogram of per-pixel iteration counts to tune max_iterations by.
+	Returns a dictionary with the bin counts and edges, the fraction of
+	pixels which never escaped (i.e., reached max_iterations), the fraction
+	of pixels which escaped late (within the top late_range of the range)
+	and the 95th percentile and maximum of the iteration count among escaped
+	pixels. If many pixels escape late, the limit is too low; if the escaped
+	pixels' maximum is far below it, it may be reduced."""
+	iterations = numpy.asarray(iterations, dtype = float).reshape(-1)
+	escaped = iterations[iterations < max_iterations]
+	(counts, edges) = numpy.histogram(iterations, bins = bins, range = (0, max_iterations))
+	return {
+		"counts":			counts,
+		"edges":			edges,
+		"unescaped":		(1 - (len(escaped) / len(iterations))) if (len(iterations) > 0) else 0,
+		"late":				(numpy.count_nonzero(escaped >= (1 - late_range) * max_iterations) / len(iterations)) if (len(iterations) > 0) else 0,
+		"escaped_p95":		float(numpy.percentile(escaped, 95)) if (len(escaped) > 0) else None,
+		"escaped_max":		float(numpy.max(escaped)) if (len(escaped) > 0) else None,
+	}
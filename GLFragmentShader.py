@@ -19,30 +19,148 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
+import time
 import textwrap
 import numpy
-from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
+try:
+	from OpenGL import GL
+except ImportError:
+	# Programs can then only be created with an explicit GL backend (e.g., the
+	# call counting mock of the tests)
+	GL = None
+
+# GLSL implementation of double-float ("df64") arithmetic: every number is
+# represented as vec2(hi, lo) of two single precision floats whose sum is the
+# represented value, which gives about 48 bits of mantissa. Based on the
+# DSFUN90 algorithms by D. H. Bailey.
+DF64_LIBRARY = """\
+vec2 df64_add(vec2 a, vec2 b) {
+	float t1 = a.x + b.x;
+	float e = t1 - a.x;
+	float t2 = ((b.x - e) + (a.x - (t1 - e))) + a.y + b.y;
+	float hi = t1 + t2;
+	return vec2(hi, t2 - (hi - t1));
+}
+
+vec2 df64_mul(vec2 a, vec2 b) {
+	/* Split both high parts into 12 bit halves so that their products are
+	exact in single precision */
+	float cona = a.x * 8193.0;
+	float conb = b.x * 8193.0;
+	float a1 = cona - (cona - a.x);
+	float b1 = conb - (conb - b.x);
+	float a2 = a.x - a1;
+	float b2 = b.x - b1;
+	float c11 = a.x * b.x;
+	float c21 = a2 * b2 + (a2 * b1 + (a1 * b2 + (a1 * b1 - c11)));
+	float c2 = a.x * b.y + a.y * b.x;
+	float t1 = c11 + c2;
+	float e = t1 - c11;
+	float t2 = a.y * b.y + ((c2 - e) + (c11 - (t1 - e))) + c21;
+	float hi = t1 + t2;
+	return vec2(hi, t2 - (hi - t1));
+}
+
+/* Complex df64 numbers are vec4(re.hi, re.lo, im.hi, im.lo) */
+vec4 cplx_df64_add(vec4 a, vec4 b) {
+	return vec4(df64_add(a.xy, b.xy), df64_add(a.zw, b.zw));
+}
+
+vec4 cplx_df64_mul(vec4 a, vec4 b) {
+	return vec4(df64_add(df64_mul(a.xy, b.xy), -df64_mul(a.zw, b.zw)), df64_add(df64_mul(a.xy, b.zw), df64_mul(a.zw, b.xy)));
+}
+"""
+
+def split_df64(value):
+	"""Splits a Python float into the (hi, lo) single precision pair that
+	represents it in df64 arithmetic."""
+	hi = float(numpy.float32(value))
+	lo = float(numpy.float32(value - hi))
+	return (hi, lo)
+
+# Shaders switch to df64 once pixels are smaller than 16 single precision
+# ulps of the coordinates
+DF64_PIXEL_THRESHOLD = 16 * (2 ** -23)
+
+def required_precision(viewport, fractal_type, precision = "auto"):
+	"""Determines the precision ("single" or "df64") a shader needs to
+	compute the viewport with. Unless another precision than "auto" is
+	requested, df64 is chosen for Mandelbrot and Julia sets once a pixel gets
+	close to the resolution of single precision floats at the logical
+	center."""
+	if precision != "auto":
+		return precision
+	if fractal_type not in [ "mandelbrot", "julia" ]:
+		return "single"
+	pixel_size = min(viewport.logical_size.x / viewport.device_size.x, viewport.logical_size.y / viewport.device_size.y)
+	magnitude = max(abs(viewport.logical_center.x), abs(viewport.logical_center.y), 1)
+	if pixel_size < DF64_PIXEL_THRESHOLD * magnitude:
+		return "df64"
+	else:
+		return "single"
 
 class GLFragmentShaderProgram(object):
-	def __init__(self, shader_source):
+	"""A linked fragment shader program along with the values of its uniforms.
+	Values set by set_property() are only uploaded by use() if they changed
+	since the last upload, and uniform locations are only queried once per
+	program. All GL calls go through the "gl" backend, which defaults to
+	PyOpenGL's OpenGL.GL module. If a FrameStatistics object is assigned to
+	"statistics", use() records the time it spends uploading uniforms."""
+
+	def __init__(self, shader_source, gl = None, binary_cache = None):
+		self._gl = gl or GL
+		self.statistics = None
 		self._uniforms = { }
-		shader_source = textwrap.dedent(shader_source)
-		self._program = glCreateProgram()
-		self._shader = self._compile_shader(shader_source, GL_FRAGMENT_SHADER)
-		glAttachShader(self._program, self._shader)
-		glLinkProgram(self._program)
-		link_status = glGetProgramiv(self._program, GL_LINK_STATUS)
+		self._dirty_uniforms = set()
+		self._uniform_locations = { }
+		self._shader_source = textwrap.dedent(shader_source)
+		self._program = self._gl.glCreateProgram()
+		if (binary_cache is not None) and binary_cache.load(self._program, self._shader_source):
+			return
+
+		self._shader = self._compile_shader(self._shader_source, self._gl.GL_FRAGMENT_SHADER)
+		self._gl.glAttachShader(self._program, self._shader)
+		if binary_cache is not None:
+			binary_cache.prepare(self._program)
+		self._gl.glLinkProgram(self._program)
+		link_status = self._gl.glGetProgramiv(self._program, self._gl.GL_LINK_STATUS)
 		if link_status == 0:
-			raise Exception("Shader linking failed: %s" % (link_status, glGetProgramInfoLog(self._program)))
-		glDeleteShader(self._shader)
+			raise Exception("Shader linking failed: %s" % (self._gl.glGetProgramInfoLog(self._program)))
+		self._gl.glDeleteShader(self._shader)
+		if binary_cache is not None:
+			binary_cache.store(self._program, self._shader_source)
+
+	@property
+	def shader_source(self):
+		return self._shader_source
+
+	def delete(self):
+		"""Frees the GL program object. The instance must not be used
+		afterwards."""
+		self._gl.glDeleteProgram(self._program)
+		self._program = None
 
 	def set_property(self, key, value):
+		if (key in self._uniforms) and (self._uniforms[key] == value):
+			return
 		self._uniforms[key] = value
+		self._dirty_uniforms.add(key)
+
+	@property
+	def dirty_uniforms(self):
+		"""Names of the uniforms which the next use() uploads."""
+		return frozenset(self._dirty_uniforms)
+
+	def uniform_location(self, uniform_name):
+		"""Location of the uniform, which is queried from GL only once since it
+		never changes after linking. Returns -1 for uniforms which do not exist
+		(or were optimized away by the compiler)."""
+		if uniform_name not in self._uniform_locations:
+			self._uniform_locations[uniform_name] = self._gl.glGetUniformLocation(self._program, uniform_name)
+		return self._uniform_locations[uniform_name]
 
 	def set_uniform(self, uniform_name, value, error = "except"):
-		uniform = glGetUniformLocation(self._program, uniform_name)
+		uniform = self.uniform_location(uniform_name)
 		if uniform < 0:
 			msg = "No such uniform in shader program: %s" % (uniform_name)
 			if error == "warn":
@@ -52,26 +170,29 @@ class GLFragmentShaderProgram(object):
 			else:
 				raise Exception(msg)
 #		print("Setting uniform \"%s\" (%d) to %s" % (uniform_name, uniform, str(value)))
+		gl = self._gl
 		if isinstance(value, tuple) and (len(value) == 2):
-			glUniform2f(uniform, value[0], value[1])
+			gl.glUniform2f(uniform, value[0], value[1])
+		elif isinstance(value, tuple) and (len(value) == 4):
+			gl.glUniform4f(uniform, value[0], value[1], value[2], value[3])
 		elif isinstance(value, list) and (len(value) > 0) and isinstance(value[0], tuple) and (len(value[0]) == 2):
-			glUniform2fv(uniform, len(value), value)
+			gl.glUniform2fv(uniform, len(value), value)
 		elif isinstance(value, int):
-			glUniform1i(uniform, value)
+			gl.glUniform1i(uniform, value)
 		elif isinstance(value, float):
-			glUniform1f(uniform, value)
+			gl.glUniform1f(uniform, value)
 		elif isinstance(value, complex):
-			glUniform2f(uniform, value.real, value.imag)
+			gl.glUniform2f(uniform, value.real, value.imag)
 		else:
 			raise Exception("Do not know how to set uniform \"%s\" to value of unknown type: %s" % (uniform_name, str(value)))
 
 	def _compile_shader(self, shader_source, shader_type):
-		shader = glCreateShader(shader_type)
-		glShaderSource(shader, shader_source)
-		glCompileShader(shader)
-		compile_status = glGetShaderiv(shader, GL_COMPILE_STATUS)
+		shader = self._gl.glCreateShader(shader_type)
+		self._gl.glShaderSource(shader, shader_source)
+		self._gl.glCompileShader(shader)
+		compile_status = self._gl.glGetShaderiv(shader, self._gl.GL_COMPILE_STATUS)
 		if compile_status == 0:
-			raise Exception("Shader compilation failed: %s" % (glGetShaderInfoLog(shader).decode("utf-8")))
+			raise Exception("Shader compilation failed: %s" % (self._gl.glGetShaderInfoLog(shader).decode("utf-8")))
 		return shader
 
 	@property
@@ -79,9 +200,15 @@ class GLFragmentShaderProgram(object):
 		return self._program
 
 	def use(self):
-		glUseProgram(self.program)
-		for (key, value) in self._uniforms.items():
-			self.set_uniform(key, value)
+		# Uniform values are part of the program object's state and survive
+		# switching to other programs, so only changed values are uploaded
+		t0 = time.perf_counter()
+		self._gl.glUseProgram(self.program)
+		for key in sorted(self._dirty_uniforms):
+			self.set_uniform(key, self._uniforms[key])
+		self._dirty_uniforms.clear()
+		if self.statistics is not None:
+			self.statistics.record("uniform_upload", time.perf_counter() - t0)
 
 class TrivialFragmentShaderProgram(GLFragmentShaderProgram):
 	"""Shader that colors entire screen red."""
@@ -19,47 +19,147 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
+import time
 from geo import Viewport2d
 from OpenGL.GL import *
 from OpenGL.GLU import *
-from NewtonFragmentShaderProgram import NewtonFragmentShaderProgram
-from MandelbrotJuliaFragmentShaderProgram import MandelbrotJuliaFragmentShaderProgram
+from NewtonFragmentShaderProgram import NewtonFragmentShaderProgram, NewtonColorizeFragmentShaderProgram
+from MandelbrotJuliaFragmentShaderProgram import MandelbrotJuliaFragmentShaderProgram, MandelbrotJuliaColorizeFragmentShaderProgram
 from NewtonSolver import Polynomial
-from AdvancedColorPalette import AdvancedColorPalette
+from PaletteRegistry import PaletteRegistry
+from GLResourceManager import GLResourceManager
+from GLFragmentShader import required_precision
+from RenderScaleController import RenderScaleController
+from FrameStatistics import FrameStatistics, GPUTimer, iteration_histogram
 
 class GLHandler(object):
-	def __init__(self):
+	def __init__(self, program_binary_cache_directory = None, palette_registry = None):
 		self._viewport = Viewport2d(device_width = 640, device_height = 480, keep_aspect_ratio = True)
-		self._shader_pgm_input = None
+		self._resources = GLResourceManager(binary_cache_directory = program_binary_cache_directory)
+		self._palette_registry = palette_registry or PaletteRegistry()
 		self._shader_pgm = None
-		self._lut_texture_input = None
+		self._colorize_pgm = None
 		self._lut_texture = None
+		self._iteration_size = None
+		self._iteration_fbo = None
+		self._iteration_texture = None
+		self._iteration_pgm = None
+		self._iteration_center = None
+		self._spare_fbo = None
+		self._spare_texture = None
+		self._dynamic_resolution = False
+		self._render_scale_controller = RenderScaleController()
+		self._lowres_size = None
+		self._lowres_fbo = None
+		self._lowres_texture = None
+		self._statistics = FrameStatistics()
+		self._gpu_timer = GPUTimer()
+		self._histogram_bins = None
+		self._iteration_histogram = None
+		self._auto_iterations = None
 
-	def _initialize_shader(self, scene_params):
-		shader_pgm_input = (scene_params["type"], )
+	@property
+	def statistics(self):
+		"""FrameStatistics of the recent frames. Phases are "setup" (program
+		selection), "lut" (palette texture), "compute" and "colorize" (the two
+		passes, including "uniform_upload"), "histogram" if enabled and
+		"total", all in CPU time; "gpu_compute" and "gpu_colorize" hold GPU
+		time if the driver supports timer queries."""
+		return self._statistics
+
+	@property
+	def iteration_histogram(self):
+		"""Histogram of the last computed iteration data (see
+		FrameStatistics.iteration_histogram), or None if neither the histogram
+		nor automatic iterations are enabled."""
+		return self._iteration_histogram
+
+	def set_iteration_histogram(self, enabled, bins = 64):
+		"""The histogram requires reading back the iteration data from the GPU
+		after every computation, so it is disabled by default."""
+		self._histogram_bins = bins if enabled else None
+		if not enabled:
+			self._iteration_histogram = None
+
+	@property
+	def auto_iterations(self):
+		return self._auto_iterations
+
+	def set_auto_iterations(self, auto_iterations):
+		"""Sets an AdaptiveIterations object which overrides max_iterations of
+		all scenes, or None to use the scene's value. It is fed with the
+		iteration data of every computed frame, which is read back from the
+		GPU for that purpose."""
+		self._auto_iterations = auto_iterations
+
+	@property
+	def resources(self):
+		return self._resources
+
+	@property
+	def palette_registry(self):
+		return self._palette_registry
+
+	def release(self):
+		"""Frees all GL resources; must be called while the GL context is still
+		current."""
+		self._resources.release()
+		self._gpu_timer.release()
+		if self._iteration_fbo is not None:
+			glDeleteFramebuffers(2, [ self._iteration_fbo, self._spare_fbo ])
+			glDeleteTextures([ self._iteration_texture, self._spare_texture ])
+			self._iteration_fbo = None
+			self._iteration_texture = None
+			self._spare_fbo = None
+			self._spare_texture = None
+			self._iteration_size = None
+			self._iteration_pgm = None
+		if self._lowres_fbo is not None:
+			glDeleteFramebuffers(1, [ self._lowres_fbo ])
+			glDeleteTextures([ self._lowres_texture ])
+			self._lowres_fbo = None
+			self._lowres_texture = None
+			self._lowres_size = None
+		self._shader_pgm = None
+		self._colorize_pgm = None
+		self._lut_texture = None
 
-		if shader_pgm_input != self._shader_pgm_input:
-			self._shader_pgm_input = shader_pgm_input
-			shader_pgm_class = {
-				"newton":		NewtonFragmentShaderProgram,
-				"mandelbrot":	MandelbrotJuliaFragmentShaderProgram,
-				"julia":		MandelbrotJuliaFragmentShaderProgram,
-			}[scene_params["type"]]
-			self._shader_pgm = shader_pgm_class()
+	@property
+	def render_scale(self):
+		return self._render_scale_controller.scale
+
+	def set_dynamic_resolution(self, enabled, frame_time_budget = None, min_render_scale = None):
+		"""When dynamic resolution is enabled, interactive frames are rendered
+		into a smaller offscreen target and upscaled. Its size is adapted so
+		that rendering a frame takes about frame_time_budget seconds; see
+		RenderScaleController."""
+		self._dynamic_resolution = enabled
+		if frame_time_budget is not None:
+			self._render_scale_controller.frame_time_budget = frame_time_budget
+		if min_render_scale is not None:
+			self._render_scale_controller.min_scale = min_render_scale
+
+	def _initialize_shader(self, scene_params):
+		# Rendering is split into a compute program which writes iteration
+		# data into a float texture and a colorize program which turns that
+		# into colors
+		if scene_params["type"] == "newton":
+			# One program per polynomial degree
+			degree = scene_params["properties"]["poly"].degree if ("poly" in scene_params["properties"]) else 3
+			self._shader_pgm = self._resources.get_program(NewtonFragmentShaderProgram, output = "iterations", degree = degree)
+			self._colorize_pgm = self._resources.get_program(NewtonColorizeFragmentShaderProgram)
+		else:
+			self._shader_pgm = self._resources.get_program(MandelbrotJuliaFragmentShaderProgram, precision = required_precision(self._viewport, scene_params["type"], scene_params.get("precision", "auto")), output = "iterations")
+			self._colorize_pgm = self._resources.get_program(MandelbrotJuliaColorizeFragmentShaderProgram)
 
 	def _initialize_lookup_texture(self, scene_params):
-		lut_texture_input = (scene_params["color_scheme_filename"], scene_params["color_scheme"])
-		if lut_texture_input != self._lut_texture_input:
-			self._lut_texture_input = lut_texture_input
-			palette = AdvancedColorPalette.load_from_json(scene_params["color_scheme_filename"], scene_params["color_scheme"])
-			self._lut_texture = self._create_gradient_texture(palette, 256)
+		# The registry returns a new palette object once the file changed, which
+		# then also gets a new texture
+		palette = self._palette_registry.get(scene_params["color_scheme_filename"], scene_params["color_scheme"])
+		self._lut_texture = self._resources.get_texture(palette, lambda: self._create_gradient_texture(palette, 256))
 
 	def _create_gradient_texture(self, palette, data_points):
-		data = bytearray()
-		for i in range(data_points):
-			pixel = palette[i / (data_points - 1)]
-			data += bytes(pixel)
-		return self.create_texture_1d_rgb(data)
+		return self.create_texture_1d_rgb(palette.lut(data_points).tobytes())
 
 	def create_texture_1d_rgb(self, data):
 		assert(isinstance(data, bytes) or isinstance(data, bytearray))
@@ -86,16 +186,94 @@ class GLHandler(object):
 		gluPerspective(45.0, self._viewport.device_size.x / self._viewport.device_size.y, 0.1, 100.0)
 		glMatrixMode(GL_MODELVIEW)
 
-	def render(self, glctx, scene_params):
-		self._initialize_shader(scene_params)
-		self._initialize_lookup_texture(scene_params)
+	def _initialize_lowres_target(self, width, height):
+		if self._lowres_size == (width, height):
+			return
+		if self._lowres_fbo is not None:
+			glDeleteFramebuffers(1, [ self._lowres_fbo ])
+			glDeleteTextures([ self._lowres_texture ])
+		self._lowres_size = (width, height)
+		self._lowres_texture = glGenTextures(1)
+		glBindTexture(GL_TEXTURE_2D, self._lowres_texture)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+		glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+		self._lowres_fbo = glGenFramebuffers(1)
+		glBindFramebuffer(GL_FRAMEBUFFER, self._lowres_fbo)
+		glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self._lowres_texture, 0)
+
+	def _create_iteration_buffer(self, width, height):
+		texture = glGenTextures(1)
+		glBindTexture(GL_TEXTURE_2D, texture)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+		glTexImage2D(GL_TEXTURE_2D, 0, GL_RG32F, width, height, 0, GL_RG, GL_FLOAT, None)
+		fbo = glGenFramebuffers(1)
+		glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+		glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, texture, 0)
+		return (fbo, texture)
+
+	def _initialize_iteration_target(self, width, height):
+		# Two buffers are kept: when panning, the previous iteration data is
+		# copied shifted from one into the other
+		if self._iteration_size == (width, height):
+			return
+		if self._iteration_fbo is not None:
+			glDeleteFramebuffers(2, [ self._iteration_fbo, self._spare_fbo ])
+			glDeleteTextures([ self._iteration_texture, self._spare_texture ])
+		self._iteration_size = (width, height)
+		self._iteration_pgm = None
+		(self._iteration_fbo, self._iteration_texture) = self._create_iteration_buffer(width, height)
+		(self._spare_fbo, self._spare_texture) = self._create_iteration_buffer(width, height)
 
-		glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+	def _pan_shift(self, width, height):
+		"""Returns the integer offset (x, y) in GL window coordinates by which
+		the iteration data moved since it was computed, i.e., pixel (x, y)
+		now shows what was at (x + shift_x, y + shift_y) before. Returns None
+		if anything but the center changed or if the offset is not a whole
+		number of pixels."""
+		if (self._iteration_pgm is not self._shader_pgm) or (self._shader_pgm.dirty_uniforms != frozenset([ "center" ])):
+			return None
+		return self._viewport.pan_offset(self._iteration_center[0], self._iteration_center[1], width, height)
 
-		glViewport(0, 0, self._viewport.device_size.x, self._viewport.device_size.y)
-		glClearDepth(1)
-		glClearColor(0, 0, 0, 0)
-		glClear(GL_COLOR_BUFFER_BIT)
+	def _compute_panned(self, width, height, shift):
+		"""Blits the previous iteration data shifted into the spare buffer and
+		only computes the strips that became exposed."""
+		(shift_x, shift_y) = shift
+		(w, h) = (width - abs(shift_x), height - abs(shift_y))
+		(src_x, src_y) = (max(0, shift_x), max(0, shift_y))
+		(dst_x, dst_y) = (max(0, -shift_x), max(0, -shift_y))
+		glBindFramebuffer(GL_READ_FRAMEBUFFER, self._iteration_fbo)
+		glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self._spare_fbo)
+		glBlitFramebuffer(src_x, src_y, src_x + w, src_y + h, dst_x, dst_y, dst_x + w, dst_y + h, GL_COLOR_BUFFER_BIT, GL_NEAREST)
+		(self._iteration_fbo, self._spare_fbo) = (self._spare_fbo, self._iteration_fbo)
+		(self._iteration_texture, self._spare_texture) = (self._spare_texture, self._iteration_texture)
+
+		regions = [ ]
+		if shift_x > 0:
+			regions.append((width - shift_x, 0, shift_x, height))
+		elif shift_x < 0:
+			regions.append((0, 0, -shift_x, height))
+		if shift_y > 0:
+			regions.append((dst_x, height - shift_y, w, shift_y))
+		elif shift_y < 0:
+			regions.append((dst_x, 0, w, -shift_y))
+
+		glBindFramebuffer(GL_FRAMEBUFFER, self._iteration_fbo)
+		self._setup_projection(width, height, clear = False)
+		self._shader_pgm.use()
+		glEnable(GL_SCISSOR_TEST)
+		for region in regions:
+			glScissor(*region)
+			self._draw_quad()
+		glDisable(GL_SCISSOR_TEST)
+
+	def _setup_projection(self, width, height, clear = True):
+		glViewport(0, 0, width, height)
+		if clear:
+			glClearDepth(1)
+			glClearColor(0, 0, 0, 0)
+			glClear(GL_COLOR_BUFFER_BIT)
 
 		glMatrixMode(GL_PROJECTION)
 		glLoadIdentity()
@@ -104,14 +282,7 @@ class GLHandler(object):
 		glMatrixMode(GL_MODELVIEW);
 		glLoadIdentity()
 
-		self._shader_pgm.set_property("center", tuple(self._viewport.logical_center))
-		self._shader_pgm.set_property("size", tuple(self._viewport.logical_size))
-		for (key, value) in scene_params["properties"].items():
-			self._shader_pgm.set_property(key, value)
-		self._shader_pgm.use()
-
-		glBindTexture(GL_TEXTURE_1D, self._lut_texture)
-		glEnable(GL_TEXTURE_1D)
+	def _draw_quad(self):
 		glBegin(GL_QUADS)
 		glTexCoord2f(-1, -1)
 		glVertex2f(-1, -1)
@@ -123,3 +294,104 @@ class GLHandler(object):
 		glVertex2f(-1, 1)
 		glEnd()
 
+	def _draw_fractal(self, width, height, scene_params):
+		target_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+
+		self._shader_pgm.set_property("center", tuple(self._viewport.logical_center))
+		self._shader_pgm.set_property("size", tuple(self._viewport.logical_size))
+		for (key, value) in scene_params["properties"].items():
+			if key not in self._shader_pgm.colorize_properties:
+				self._shader_pgm.set_property(key, value)
+			if key in self._colorize_pgm.properties:
+				self._colorize_pgm.set_property(key, value)
+
+		# The iteration data only needs to be computed again if any of the
+		# compute program's uniforms changed; palette and coloring changes
+		# only need the colorize pass, pans by whole pixels only the newly
+		# exposed strips
+		self._initialize_iteration_target(width, height)
+		if (self._iteration_pgm is not self._shader_pgm) or (len(self._shader_pgm.dirty_uniforms) > 0):
+			with self._statistics.measure("compute"), self._gpu_timer.measure("compute"):
+				shift = self._pan_shift(width, height)
+				if shift is not None:
+					self._compute_panned(width, height, shift)
+				else:
+					glBindFramebuffer(GL_FRAMEBUFFER, self._iteration_fbo)
+					self._setup_projection(width, height)
+					self._shader_pgm.use()
+					self._draw_quad()
+			self._iteration_pgm = self._shader_pgm
+			self._iteration_center = tuple(self._viewport.logical_center)
+			if (self._histogram_bins is not None) or (self._auto_iterations is not None):
+				with self._statistics.measure("histogram"):
+					self._update_iteration_histogram(width, height, scene_params)
+				if self._auto_iterations is not None:
+					self._auto_iterations.feedback_histogram(self._iteration_histogram, scene_params["properties"]["max_iterations"])
+
+		with self._statistics.measure("colorize"), self._gpu_timer.measure("colorize"):
+			glBindFramebuffer(GL_FRAMEBUFFER, target_fbo)
+			self._setup_projection(width, height)
+			self._colorize_pgm.use()
+			glActiveTexture(GL_TEXTURE1)
+			glBindTexture(GL_TEXTURE_1D, self._lut_texture)
+			glActiveTexture(GL_TEXTURE0)
+			glBindTexture(GL_TEXTURE_2D, self._iteration_texture)
+			self._draw_quad()
+
+	def _update_iteration_histogram(self, width, height, scene_params):
+		max_iterations = scene_params["properties"].get("max_iterations")
+		if max_iterations is None:
+			return
+		glBindFramebuffer(GL_READ_FRAMEBUFFER, self._iteration_fbo)
+		iterations = glReadPixels(0, 0, width, height, GL_RED, GL_FLOAT)
+		# Automatic iterations are fed back from this histogram, so its late
+		# pixels have to be counted the same way
+		late_range = { "late_range": self._auto_iterations.late_range } if (self._auto_iterations is not None) else { }
+		self._iteration_histogram = iteration_histogram(iterations, max_iterations, bins = self._histogram_bins or 64, **late_range)
+
+	def _render_dynamic_resolution(self, scene_params):
+		(width, height) = (int(self._viewport.device_size.x), int(self._viewport.device_size.y))
+		(lowres_width, lowres_height) = self._render_scale_controller.size(width, height)
+
+		# GtkGLArea renders into its own framebuffer, so remember which one to
+		# blit the upscaled image to
+		target_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+
+		t0 = time.perf_counter()
+		self._initialize_lowres_target(lowres_width, lowres_height)
+		glBindFramebuffer(GL_FRAMEBUFFER, self._lowres_fbo)
+		self._draw_fractal(lowres_width, lowres_height, scene_params)
+		glFinish()
+		self._render_scale_controller.update(time.perf_counter() - t0)
+
+		glBindFramebuffer(GL_READ_FRAMEBUFFER, self._lowres_fbo)
+		glBindFramebuffer(GL_DRAW_FRAMEBUFFER, target_fbo)
+		glBlitFramebuffer(0, 0, lowres_width, lowres_height, 0, 0, width, height, GL_COLOR_BUFFER_BIT, GL_LINEAR)
+		glBindFramebuffer(GL_FRAMEBUFFER, target_fbo)
+
+	def render(self, glctx, scene_params, interactive = False):
+		"""Renders the scene. Frames which are marked interactive (i.e., ones
+		which are rendered while parameters are still being changed) are
+		rendered at reduced resolution if dynamic resolution is enabled.
+		Otherwise, the full device resolution is used."""
+		if self._auto_iterations is not None:
+			properties = dict(scene_params["properties"], max_iterations = self._auto_iterations.limit(self._viewport))
+			scene_params = dict(scene_params, properties = properties)
+
+		self._statistics.begin_frame()
+		self._gpu_timer.collect(self._statistics)
+		with self._statistics.measure("total"):
+			with self._statistics.measure("setup"):
+				self._initialize_shader(scene_params)
+				self._shader_pgm.statistics = self._statistics
+				self._colorize_pgm.statistics = self._statistics
+			with self._statistics.measure("lut"):
+				self._initialize_lookup_texture(scene_params)
+
+			glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+			if self._dynamic_resolution and interactive:
+				self._render_dynamic_resolution(scene_params)
+			else:
+				self._draw_fractal(int(self._viewport.device_size.x), int(self._viewport.device_size.y), scene_params)
+		self._statistics.end_frame()
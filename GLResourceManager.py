@@ -0,0 +1,177 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import hashlib
+import collections
+import numpy
+from GLFragmentShader import GL
+
+class ProgramBinaryCache(object):
+	"""On-disk cache of linked program binaries (glGetProgramBinary), so that
+	later sessions can skip compiling and linking. Entries are keyed by the
+	shader source along with the renderer and driver version; a binary which
+	the driver nevertheless rejects simply causes a regular compile. If the
+	driver does not support program binaries at all, the cache disables
+	itself and programs are always compiled."""
+
+	def __init__(self, directory, gl = None):
+		self._directory = directory
+		self._gl = gl or GL
+		self._driver_id = None
+		self._supported = None
+
+	@property
+	def directory(self):
+		return self._directory
+
+	@property
+	def supported(self):
+		return self._supported is not False
+
+	def prepare(self, program):
+		"""Asks the driver to keep the binary of the program retrievable; must
+		be called before it is linked."""
+		if self._supported is False:
+			return
+		try:
+			self._gl.glProgramParameteri(program, self._gl.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, self._gl.GL_TRUE)
+		except Exception:
+			self._supported = False
+
+	def _filename(self, shader_source):
+		if self._driver_id is None:
+			self._driver_id = b"\0".join(bytes(self._gl.glGetString(name) or b"") for name in [ self._gl.GL_VENDOR, self._gl.GL_RENDERER, self._gl.GL_VERSION ])
+		digest = hashlib.sha256(self._driver_id + b"\0" + shader_source.encode("utf-8")).hexdigest()
+		return os.path.join(self._directory, digest + ".bin")
+
+	def load(self, program, shader_source):
+		"""Tries to initialize the program from a cached binary. Returns True
+		if the program was successfully linked that way."""
+		if self._supported is False:
+			return False
+		try:
+			with open(self._filename(shader_source), "rb") as f:
+				binary_format = int.from_bytes(f.read(4), byteorder = "little")
+				binary = f.read()
+		except FileNotFoundError:
+			return False
+		try:
+			self._gl.glProgramBinary(program, binary_format, binary, len(binary))
+			return self._gl.glGetProgramiv(program, self._gl.GL_LINK_STATUS) != 0
+		except Exception:
+			# No driver support for program binaries
+			return False
+
+	def store(self, program, shader_source):
+		"""Writes the binary of a linked program to the cache. Does nothing if
+		the driver does not support retrieving program binaries."""
+		if self._supported is False:
+			return
+		try:
+			length = self._gl.glGetProgramiv(program, self._gl.GL_PROGRAM_BINARY_LENGTH)
+			if length <= 0:
+				return
+			binary = numpy.zeros(length, dtype = numpy.uint8)
+			actual_length = numpy.zeros(1, dtype = numpy.int32)
+			binary_format = numpy.zeros(1, dtype = numpy.uint32)
+			self._gl.glGetProgramBinary(program, length, actual_length, binary_format, binary)
+		except Exception:
+			return
+		filename = self._filename(shader_source)
+		os.makedirs(self._directory, exist_ok = True)
+
+		# Write to a temporary file first so that concurrent sessions never
+		# read a partial binary
+		tmp_filename = "%s.%d" % (filename, os.getpid())
+		with open(tmp_filename, "wb") as f:
+			f.write(int(binary_format[0]).to_bytes(4, byteorder = "little"))
+			f.write(binary[:int(actual_length[0])].tobytes())
+		os.replace(tmp_filename, filename)
+
+class GLResourceManager(object):
+	"""Owns the shader programs and lookup textures of a GL context. Both are
+	kept in least recently used pools, so switching back and forth between
+	fractal types or palettes reuses them, while evicted resources are freed
+	with glDeleteProgram/glDeleteTextures. Programs are keyed by their
+	generated shader source, i.e., two requests which result in the same
+	source share one program. If a binary cache directory is given, linked
+	programs are additionally persisted there."""
+
+	def __init__(self, max_programs = 8, max_textures = 8, binary_cache_directory = None, gl = None):
+		assert(max_programs > 0)
+		assert(max_textures > 0)
+		self._gl = gl or GL
+		self._max_programs = max_programs
+		self._max_textures = max_textures
+		self._programs = collections.OrderedDict()
+		self._textures = collections.OrderedDict()
+		if binary_cache_directory is not None:
+			self._binary_cache = ProgramBinaryCache(binary_cache_directory, gl = self._gl)
+		else:
+			self._binary_cache = None
+
+	@property
+	def binary_cache(self):
+		return self._binary_cache
+
+	@property
+	def program_count(self):
+		return len(self._programs)
+
+	@property
+	def texture_count(self):
+		return len(self._textures)
+
+	def get_program(self, program_class, **kwargs):
+		"""Returns a program of the given GLFragmentShaderProgram subclass,
+		which is created with the keyword arguments unless a program with the
+		same shader source is pooled already."""
+		shader_source = program_class.generate_source(**kwargs)
+		if shader_source in self._programs:
+			self._programs.move_to_end(shader_source)
+		else:
+			self._programs[shader_source] = program_class(gl = self._gl, binary_cache = self._binary_cache, **kwargs)
+			while len(self._programs) > self._max_programs:
+				(evicted_source, evicted_program) = self._programs.popitem(last = False)
+				evicted_program.delete()
+		return self._programs[shader_source]
+
+	def get_texture(self, key, create_texture):
+		"""Returns the texture stored under the given key. If there is none,
+		create_texture() is called to create it."""
+		if key in self._textures:
+			self._textures.move_to_end(key)
+		else:
+			self._textures[key] = create_texture()
+			while len(self._textures) > self._max_textures:
+				(evicted_key, evicted_texture) = self._textures.popitem(last = False)
+				self._gl.glDeleteTextures([ evicted_texture ])
+		return self._textures[key]
+
+	def release(self):
+		"""Frees all pooled resources; the GL context must still be current."""
+		for program in self._programs.values():
+			program.delete()
+		if len(self._textures) > 0:
+			self._gl.glDeleteTextures(list(self._textures.values()))
+		self._programs.clear()
+		self._textures.clear()
@@ -0,0 +1,74 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import zlib
+import struct
+import numpy
+
+class ImageWriter(object):
+	"""Writes uint8 RGB images of shape (height, width, 3) as binary PPM or
+	PNG files without any dependencies beyond NumPy."""
+
+	@staticmethod
+	def _check_image(image):
+		assert(image.dtype == numpy.uint8)
+		assert((image.ndim == 3) and (image.shape[2] == 3))
+
+	@classmethod
+	def encode_ppm(cls, image):
+		cls._check_image(image)
+		(height, width) = image.shape[:2]
+		return ("P6\n%d %d\n255\n" % (width, height)).encode("ascii") + numpy.ascontiguousarray(image).tobytes()
+
+	@classmethod
+	def encode_png(cls, image, compression_level = 6):
+		def _chunk(chunk_type, data):
+			return struct.pack(">L", len(data)) + chunk_type + data + struct.pack(">L", zlib.crc32(chunk_type + data) & 0xffffffff)
+
+		cls._check_image(image)
+		(height, width) = image.shape[:2]
+
+		# Every scanline is prefixed with filter type 0 (none)
+		scanlines = numpy.zeros((height, 1 + (3 * width)), dtype = numpy.uint8)
+		scanlines[:, 1:] = image.reshape(height, 3 * width)
+
+		ihdr = struct.pack(">LLBBBBB", width, height, 8, 2, 0, 0, 0)
+		return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", ihdr) + _chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression_level)) + _chunk(b"IEND", b"")
+
+	@classmethod
+	def encode(cls, image, image_format):
+		encoder = {
+			"ppm":	cls.encode_ppm,
+			"png":	cls.encode_png,
+		}.get(image_format)
+		if encoder is None:
+			raise Exception("Unsupported image format: %s" % (image_format))
+		return encoder(image)
+
+	@classmethod
+	def write(cls, filename, image, image_format = None):
+		"""Writes the image to a file. Unless given explicitly, the format is
+		determined by the filename extension."""
+		if image_format is None:
+			image_format = filename.rsplit(".", 1)[-1].lower()
+		data = cls.encode(image, image_format)
+		with open(filename, "wb") as f:
+			f.write(data)
@@ -0,0 +1,145 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import numpy
+from CPUEngine import CPUEngine
+
+class MandelbrotJuliaCPUEngine(CPUEngine):
+	"""NumPy implementation of MandelbrotJuliaFragmentShaderProgram."""
+	colorize_properties = frozenset([ "palette_offset" ])
+
+	def __init__(self):
+		CPUEngine.__init__(self)
+		self.set_property("max_iterations", 40)
+		self.set_property("cutoff", 10.0)
+		self.set_property("periodicity_tolerance", 1e-6)
+		self.set_property("smooth_coloring", 0)
+		self.set_property("palette_offset", 0.0)
+		self.use_mandelbrot()
+
+	def use_mandelbrot(self):
+		self.set_property("is_mandelbrot", 1)
+		self.set_property("julia_coeff", complex(0))
+
+	def use_julia(self, julia_coeff):
+		assert(isinstance(julia_coeff, complex))
+		self.set_property("is_mandelbrot", 0)
+		self.set_property("julia_coeff", julia_coeff)
+
+	@staticmethod
+	def in_main_cardioid_or_bulb(c, margin = 0):
+		"""Analytic test which values of the complex array c lie within the
+		main cardioid or the period-2 bulb of the Mandelbrot set. With a
+		margin, values which are that close to the boundary (by the value of
+		the test expressions) are considered outside."""
+		(x, y) = (c.real, c.imag)
+		q = ((x - 0.25) ** 2) + (y ** 2)
+		cardioid = (q * (q + (x - 0.25))) <= (0.25 * y * y) - margin
+		bulb = (((x + 1) ** 2) + (y ** 2)) <= 0.0625 - margin
+		return cardioid | bulb
+
+	def _interior_check_applicable(self):
+		# Only for the plain Mandelbrot iteration; points in the set never leave
+		# the circle of radius 2, so they cannot break at a larger cutoff
+		return (self.get_property("is_mandelbrot") == 1) and (self.get_property("julia_coeff") == 0) and (self.get_property("cutoff") >= 2)
+
+	def _smooth_coloring_applicable(self):
+		return (self.get_property("smooth_coloring") == 1) and (self.get_property("cutoff") > 1)
+
+	def _smooth(self, iterations, escape_abs_sqr):
+		"""Turns iteration counts into continuous values n + 1 - log2(log|z_n| /
+		log(cutoff)) from the absolute value at escape; values which never
+		escaped keep max_iterations."""
+		result = iterations.astype(float)
+		escaped = iterations < self.get_property("max_iterations")
+		result[escaped] += 1 - numpy.log2((0.5 * numpy.log(escape_abs_sqr[escaped])) / numpy.log(self.get_property("cutoff")))
+		return result
+
+	def iterate(self, c):
+		"""Runs the escape time iteration for all values of the complex array
+		c and returns an int32 array of the same shape which holds the
+		iteration in which the value escaped (or max_iterations if it never
+		did). With smooth coloring, a float array of continuous iteration
+		counts is returned instead."""
+		max_iterations = self.get_property("max_iterations")
+		cutoff_sqr = self.get_property("cutoff") ** 2
+		is_mandelbrot = self.get_property("is_mandelbrot")
+		julia_coeff = complex(self.get_property("julia_coeff"))
+		tolerance_sqr = self.get_property("periodicity_tolerance") ** 2
+
+		c = numpy.asarray(c, dtype = complex)
+		iterations = numpy.full(c.shape, max_iterations, dtype = numpy.int32)
+		flat_iterations = iterations.reshape(-1)
+		escape_abs_sqr = numpy.zeros(c.shape)
+		flat_escape_abs_sqr = escape_abs_sqr.reshape(-1)
+
+		# Only the values which have not escaped yet are kept in the working
+		# arrays; "index" maps them back into the output.
+		index = numpy.arange(c.size)
+		c = c.reshape(-1).copy()
+		if self._interior_check_applicable():
+			remaining = ~self.in_main_cardioid_or_bulb(c)
+			(index, c) = (index[remaining], c[remaining])
+		cur = c.copy()
+
+		# Brent-style cycle detection: compare against a saved orbit point which
+		# is updated at power-of-two iterations
+		saved = c.copy()
+		check_at = 1
+		for iteration in range(max_iterations):
+			if len(index) == 0:
+				break
+
+			# Mandelbrot: Add c every step of the iteration. Julia: Add c only
+			# the first time, the Julia value every other iteration step.
+			if (iteration == 0) or is_mandelbrot:
+				cur = (cur * cur) + c + julia_coeff
+			else:
+				cur = (cur * cur) + julia_coeff
+
+			abs_sqr = (cur.real * cur.real) + (cur.imag * cur.imag)
+			escaped = abs_sqr > cutoff_sqr
+			delta = cur - saved
+			periodic = ((delta.real * delta.real) + (delta.imag * delta.imag)) < tolerance_sqr
+			finished = escaped | periodic
+			if numpy.any(finished):
+				# Periodic orbits never escape and keep max_iterations
+				flat_iterations[index[escaped]] = iteration
+				flat_escape_abs_sqr[index[escaped]] = abs_sqr[escaped]
+				remaining = ~finished
+				(index, c, cur, saved) = (index[remaining], c[remaining], cur[remaining], saved[remaining])
+
+			if iteration == check_at:
+				saved = cur.copy()
+				check_at *= 2
+		if self._smooth_coloring_applicable():
+			return self._smooth(iterations, escape_abs_sqr)
+		return iterations
+
+	def compute_at(self, viewport, x, y):
+		return self.iterate(self.pixel_grid_at(viewport, x, y))
+
+	def colorize(self, iterations, lut):
+		coord = iterations / float(self.get_property("max_iterations") - 1)
+		if self.get_property("palette_offset") != 0:
+			# Palette cycling wraps around instead of clamping
+			coord = numpy.mod(coord + self.get_property("palette_offset"), 1)
+		return self.to_rgb8(self.texture1d(lut, coord))
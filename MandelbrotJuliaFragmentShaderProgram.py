@@ -20,19 +20,32 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
-from GLFragmentShader import GLFragmentShaderProgram
+import textwrap
+from GLFragmentShader import GLFragmentShaderProgram, DF64_LIBRARY, split_df64
 
 class MandelbrotJuliaFragmentShaderProgram(GLFragmentShaderProgram):
-	def __init__(self):
-		GLFragmentShaderProgram.__init__(self, """\
+	_SINGLE_SOURCE = """\
 		#define cplx_mul(a, b)		vec2(a.x * b.x - a.y * b.y, a.x * b.y + a.y * b.x)
 
-		uniform sampler1D tex;
 		uniform vec2 center, size;
 		uniform int max_iterations;
 		uniform float cutoff;
 		uniform int is_mandelbrot;
 		uniform vec2 julia_coeff;
+		uniform float periodicity_tolerance;
+		uniform int smooth_coloring;
+
+		vec4 colorize(float iteration);
+
+		/* Analytic test if c lies within the main cardioid or the period-2
+		bulb of the Mandelbrot set; those points never escape */
+		bool in_main_cardioid_or_bulb(vec2 c) {
+			float q = ((c.x - 0.25) * (c.x - 0.25)) + (c.y * c.y);
+			if ((q * (q + (c.x - 0.25))) <= (0.25 * c.y * c.y)) {
+				return true;
+			}
+			return (((c.x + 1.0) * (c.x + 1.0)) + (c.y * c.y)) <= 0.0625;
+		}
 
 		void main() {
 			vec2 c;
@@ -40,26 +53,207 @@ class MandelbrotJuliaFragmentShaderProgram(GLFragmentShaderProgram):
 			c.y = center.y + (size.y * (gl_TexCoord[0].y - 0.5));
 
 			int iteration;
-			vec2 cur = c;
-			for (iteration = 0; iteration < max_iterations; iteration++) {
-				/* Mandelbrot: Add c every step of the iteration.
-				   Julia     : Add c only the first time, the Julia value every other iteration step.
-				*/
-				cur = cplx_mul(cur, cur) + ((iteration == 0) ? c : (is_mandelbrot * c)) + julia_coeff;
-				float abs_value = length(cur);
-				if (abs_value > cutoff) {
-					break;
+			float escape_abs_value = cutoff;
+			if ((is_mandelbrot == 1) && (julia_coeff == vec2(0, 0)) && (cutoff >= 2.0) && in_main_cardioid_or_bulb(c)) {
+				/* Points in the Mandelbrot set never leave the circle of
+				   radius 2, so they would run all iterations */
+				iteration = max_iterations;
+			} else {
+				vec2 cur = c;
+
+				/* Brent-style cycle detection: compare against a saved orbit
+				   point which is updated at power-of-two iterations */
+				vec2 saved = c;
+				int check_at = 1;
+				for (iteration = 0; iteration < max_iterations; iteration++) {
+					/* Mandelbrot: Add c every step of the iteration.
+					   Julia     : Add c only the first time, the Julia value every other iteration step.
+					*/
+					cur = cplx_mul(cur, cur) + ((iteration == 0) ? c : (is_mandelbrot * c)) + julia_coeff;
+					float abs_value = length(cur);
+					if (abs_value > cutoff) {
+						escape_abs_value = abs_value;
+						break;
+					}
+
+					vec2 delta = cur - saved;
+					if (dot(delta, delta) < (periodicity_tolerance * periodicity_tolerance)) {
+						/* Periodic orbit, will never escape */
+						iteration = max_iterations;
+						break;
+					}
+					if (iteration == check_at) {
+						saved = cur;
+						check_at *= 2;
+					}
 				}
 			}
 
+			/* Continuous iteration count for smooth coloring */
+			float value = float(iteration);
+			if ((smooth_coloring == 1) && (iteration < max_iterations) && (cutoff > 1.0)) {
+				value += 1.0 - log2(log(escape_abs_value) / log(cutoff));
+			}
+
+		#ifdef OUTPUT_ITERATIONS
+			gl_FragColor = vec4(value, 0.0, 0.0, 1.0);
+		#else
+			gl_FragColor = colorize(value);
+		#endif
+		}
+	"""
+
+	# Same program, but center, size and the iteration run in double-float
+	# arithmetic, which is usable down to sizes of about 1e-13
+	_DF64_SOURCE = DF64_LIBRARY + textwrap.dedent("""\
+		#define cplx_df64(a)		vec4(a.x, 0, a.y, 0)
+
+		uniform vec4 center, size;
+		uniform int max_iterations;
+		uniform float cutoff;
+		uniform int is_mandelbrot;
+		uniform vec2 julia_coeff;
+		uniform float periodicity_tolerance;
+		uniform int smooth_coloring;
+
+		vec4 colorize(float iteration);
+
+		/* Analytic test if c lies within the main cardioid or the period-2
+		bulb of the Mandelbrot set; those points never escape */
+		bool in_main_cardioid_or_bulb(vec4 c) {
+			vec2 x = df64_add(c.xy, vec2(-0.25, 0));
+			vec2 y_sqr = df64_mul(c.zw, c.zw);
+			vec2 q = df64_add(df64_mul(x, x), y_sqr);
+			vec2 cardioid = df64_add(df64_mul(q, df64_add(q, x)), -0.25 * y_sqr);
+			if (cardioid.x + cardioid.y <= 0.0) {
+				return true;
+			}
+			vec2 x1 = df64_add(c.xy, vec2(1, 0));
+			vec2 bulb = df64_add(df64_add(df64_mul(x1, x1), y_sqr), vec2(-0.0625, 0));
+			return bulb.x + bulb.y <= 0.0;
+		}
+
+		void main() {
+			vec4 c;
+			c.xy = df64_add(center.xy, df64_mul(size.xy, vec2(gl_TexCoord[0].x - 0.5, 0)));
+			c.zw = df64_add(center.zw, df64_mul(size.zw, vec2(gl_TexCoord[0].y - 0.5, 0)));
+
+			int iteration;
+			float escape_abs_value = cutoff;
+			if ((is_mandelbrot == 1) && (julia_coeff == vec2(0, 0)) && (cutoff >= 2.0) && in_main_cardioid_or_bulb(c)) {
+				/* Points in the Mandelbrot set never leave the circle of
+				   radius 2, so they would run all iterations */
+				iteration = max_iterations;
+			} else {
+				vec4 cur = c;
+				vec4 julia = cplx_df64(julia_coeff);
+
+				/* Brent-style cycle detection: compare against a saved orbit
+				   point which is updated at power-of-two iterations */
+				vec4 saved = c;
+				int check_at = 1;
+				for (iteration = 0; iteration < max_iterations; iteration++) {
+					/* Mandelbrot: Add c every step of the iteration.
+					   Julia     : Add c only the first time, the Julia value every other iteration step.
+					*/
+					cur = cplx_df64_mul(cur, cur);
+					if ((iteration == 0) || (is_mandelbrot == 1)) {
+						cur = cplx_df64_add(cur, c);
+					}
+					cur = cplx_df64_add(cur, julia);
+					float abs_value = length(cur.xz);
+					if (abs_value > cutoff) {
+						escape_abs_value = abs_value;
+						break;
+					}
+
+					vec2 delta = vec2(df64_add(cur.xy, -saved.xy).x, df64_add(cur.zw, -saved.zw).x);
+					if (dot(delta, delta) < (periodicity_tolerance * periodicity_tolerance)) {
+						/* Periodic orbit, will never escape */
+						iteration = max_iterations;
+						break;
+					}
+					if (iteration == check_at) {
+						saved = cur;
+						check_at *= 2;
+					}
+				}
+			}
+
+			/* Continuous iteration count for smooth coloring */
+			float value = float(iteration);
+			if ((smooth_coloring == 1) && (iteration < max_iterations) && (cutoff > 1.0)) {
+				value += 1.0 - log2(log(escape_abs_value) / log(cutoff));
+			}
+
+		#ifdef OUTPUT_ITERATIONS
+			gl_FragColor = vec4(value, 0.0, 0.0, 1.0);
+		#else
+			gl_FragColor = colorize(value);
+		#endif
+		}
+	""")
+
+	# Maps the (possibly continuous) iteration count to a color. Requires the
+	# max_iterations uniform to be declared already.
+	_COLORIZE_SOURCE = """\
+		uniform sampler1D tex;
+		uniform float palette_offset;
+
+		vec4 colorize(float iteration) {
 			float flt_iteration = iteration / float(max_iterations - 1);
-			gl_FragColor = texture1D(tex, flt_iteration);
+			if (palette_offset != 0.0) {
+				/* Palette cycling wraps around instead of clamping */
+				flt_iteration = fract(flt_iteration + palette_offset);
+			}
+			return texture1D(tex, flt_iteration);
 		}
-		""")
+	"""
+
+	# Properties which only the colorize stage uses
+	colorize_properties = frozenset([ "palette_offset" ])
+
+	@classmethod
+	def generate_source(cls, precision = "single", output = "color"):
+		"""Returns the shader source which either directly outputs colors or,
+		for output = "iterations", writes the (continuous) iteration count
+		into the red channel of a float render target. The latter is then
+		colored by MandelbrotJuliaColorizeFragmentShaderProgram."""
+		source = textwrap.dedent({
+			"single":	cls._SINGLE_SOURCE,
+			"df64":		cls._DF64_SOURCE,
+		}[precision])
+		if output == "iterations":
+			return "#define OUTPUT_ITERATIONS\n" + source
+		else:
+			return source + textwrap.dedent(cls._COLORIZE_SOURCE)
+
+	def __init__(self, precision = "single", output = "color", gl = None, binary_cache = None):
+		self._precision = precision
+		self._output = output
+		GLFragmentShaderProgram.__init__(self, self.generate_source(precision, output), gl = gl, binary_cache = binary_cache)
 		self.set_property("max_iterations", 40)
 		self.set_property("cutoff", 10.0)
+		self.set_property("periodicity_tolerance", 1e-6)
+		self.set_property("smooth_coloring", 0)
+		if output == "color":
+			self.set_property("palette_offset", 0.0)
 		self.use_mandelbrot()
 
+	@property
+	def output(self):
+		return self._output
+
+	@property
+	def precision(self):
+		return self._precision
+
+	def set_property(self, key, value):
+		if (self._precision == "df64") and (key in [ "center", "size" ]):
+			# Upload as vec4(x.hi, x.lo, y.hi, y.lo)
+			value = split_df64(value[0]) + split_df64(value[1])
+		GLFragmentShaderProgram.set_property(self, key, value)
+
 	def use_mandelbrot(self):
 		self.set_property("is_mandelbrot", 1)
 		self.set_property("julia_coeff", complex(0))
@@ -68,3 +262,30 @@ class MandelbrotJuliaFragmentShaderProgram(GLFragmentShaderProgram):
 		assert(isinstance(julia_coeff, complex))
 		self.set_property("is_mandelbrot", 0)
 		self.set_property("julia_coeff", julia_coeff)
+
+class MandelbrotJuliaColorizeFragmentShaderProgram(GLFragmentShaderProgram):
+	"""Colorize stage for MandelbrotJuliaFragmentShaderProgram with output =
+	"iterations": reads the iteration counts from a float texture (bound to
+	texture unit 0) and maps them through the palette texture (unit 1). This
+	is cheap enough to be repeated for every palette change."""
+
+	properties = frozenset([ "max_iterations", "palette_offset" ])
+
+	@classmethod
+	def generate_source(cls):
+		return textwrap.dedent("""\
+			uniform sampler2D iteration_data;
+			uniform int max_iterations;
+		""") + textwrap.dedent(MandelbrotJuliaFragmentShaderProgram._COLORIZE_SOURCE) + textwrap.dedent("""\
+
+			void main() {
+				gl_FragColor = colorize(texture2D(iteration_data, gl_TexCoord[0].xy).r);
+			}
+		""")
+
+	def __init__(self, gl = None, binary_cache = None):
+		GLFragmentShaderProgram.__init__(self, self.generate_source(), gl = gl, binary_cache = binary_cache)
+		self.set_property("iteration_data", 0)
+		self.set_property("tex", 1)
+		self.set_property("max_iterations", 40)
+		self.set_property("palette_offset", 0.0)
@@ -0,0 +1,147 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+
+import numpy
+
+class MarianiSilverRenderer(object):
+	"""Renders a viewport with an escape time CPUEngine (i.e., one whose
+	compute() returns a single iteration count array) by rectangle
+	subdivision: only the border of a rectangle is computed; if all of it
+	escaped in the same iteration, the rectangle is filled with that count,
+	otherwise it is split into four by a horizontal and a vertical line which
+	are computed next. Rectangles at most min_size pixels wide or high are
+	computed completely.
+
+	All rectangles of one subdivision level are computed by a single call to
+	the engine, so the NumPy engines still see large batches. Like the
+	engines themselves, the renderer provides compute(viewport, region), so
+	it can also be handed to TiledRenderer in place of an engine."""
+
+	def __init__(self, engine, min_size = 16):
+		assert(min_size >= 3)
+		self._engine = engine
+		self._min_size = min_size
+		self._statistics = { }
+
+	@property
+	def engine(self):
+		return self._engine
+
+	@property
+	def min_size(self):
+		return self._min_size
+
+	@property
+	def statistics(self):
+		"""Statistics of the last compute() call: the number of pixels which
+		were computed, the number of pixels which were filled without
+		computing them and the fraction of skipped pixels."""
+		return self._statistics
+
+	def device_dimensions(self, viewport):
+		return self._engine.device_dimensions(viewport)
+
+	def create_lut(self, palette, data_points = 256):
+		return self._engine.create_lut(palette, data_points)
+
+	def colorize(self, data, lut):
+		return self._engine.colorize(data, lut)
+
+	@property
+	def data_plane_count(self):
+		return self._engine.data_plane_count
+
+	def iterations(self, data):
+		return self._engine.iterations(data)
+
+	def split_data(self, data):
+		return self._engine.split_data(data)
+
+	def join_data(self, planes):
+		return self._engine.join_data(planes)
+
+	def compute(self, viewport, region = None):
+		"""Computes the iteration counts of the viewport, or of the given
+		region (x, y, width, height) of it, like CPUEngine.compute() does."""
+		(x0, y0, width, height) = region or ((0, 0) + self.device_dimensions(viewport))
+		self._statistics = { "computed": 0, "filled": 0, "skipped_fraction": 0 }
+		if width * height == 0:
+			return numpy.empty((height, width), dtype = numpy.int32)
+
+		# Pixels which are computed next are collected in a mask, so that all
+		# rectangles of one level become a single call to the engine
+		pending = numpy.zeros((height, width), dtype = bool)
+		data = None
+		def evaluate():
+			nonlocal data
+			(ys, xs) = numpy.nonzero(pending)
+			if len(xs) > 0:
+				# The engine expects image rather than region coordinates
+				values = self._engine.compute_at(viewport, xs + x0, ys + y0)
+				if data is None:
+					# Iteration counts are integers, unless smooth coloring is
+					# used; the outer border, which is computed first, tells
+					data = numpy.empty((height, width), dtype = values.dtype)
+				data[ys, xs] = values
+				self._statistics["computed"] += len(xs)
+				pending[ys, xs] = False
+
+		pending[0, :] = pending[-1, :] = pending[:, 0] = pending[:, -1] = True
+		evaluate()
+		rectangles = [ (0, 0, width, height) ]
+		while len(rectangles) > 0:
+			next_rectangles = [ ]
+			for (x, y, w, h) in rectangles:
+				if (w <= 2) or (h <= 2):
+					# Border only, nothing left to do
+					continue
+
+				value = data[y, x]
+				(x1, y1) = (x + w - 1, y + h - 1)
+				if (data[y, x : x1 + 1] == value).all() and (data[y1, x : x1 + 1] == value).all() and (data[y : y1 + 1, x] == value).all() and (data[y : y1 + 1, x1] == value).all():
+					data[y + 1 : y1, x + 1 : x1] = value
+					self._statistics["filled"] += (w - 2) * (h - 2)
+				elif (w <= self._min_size) or (h <= self._min_size):
+					pending[y + 1 : y1, x + 1 : x1] = True
+				else:
+					# The split lines become the shared border of the four
+					# sub-rectangles
+					split_x = x + (w // 2)
+					split_y = y + (h // 2)
+					pending[y + 1 : y1, split_x] = True
+					pending[split_y, x + 1 : x1] = True
+					next_rectangles += [
+						(x, y, split_x - x + 1, split_y - y + 1),
+						(split_x, y, x1 - split_x + 1, split_y - y + 1),
+						(x, split_y, split_x - x + 1, y1 - split_y + 1),
+						(split_x, split_y, x1 - split_x + 1, y1 - split_y + 1),
+					]
+			evaluate()
+			rectangles = next_rectangles
+
+		self._statistics["skipped_fraction"] = self._statistics["filled"] / (width * height)
+		return data
+
+	def render(self, viewport, palette):
+		"""Renders the viewport; returns an uint8 array of shape (height,
+		width, 3) just like CPUEngine.render() does."""
+		return self.colorize(self.compute(viewport), self.create_lut(palette))
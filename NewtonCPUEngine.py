@@ -0,0 +1,133 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import numpy
+from CPUEngine import CPUEngine
+from NewtonSolver import Polynomial, NewtonSolver
+
+class NewtonCPUEngine(CPUEngine):
+	"""NumPy implementation of NewtonFragmentShaderProgram."""
+	colorize_properties = frozenset([ "darken_brighten_shift", "darken_brighten_clamp", "darken_brighten_exp" ])
+	# (iterations, closest_index)
+	data_plane_count = 2
+
+	def __init__(self):
+		CPUEngine.__init__(self)
+		self.set_property("max_iterations", 50)
+		self.set_property("cutoff", 1e-4)
+		self.set_property("darken_brighten_shift", 0.75)
+		self.set_property("darken_brighten_clamp", 0.5)
+		self.set_property("darken_brighten_exp", 0.6)
+		self._solution = None
+		self.set_property("poly", Polynomial(3, 0, 0, 1))
+
+	@property
+	def poly(self):
+		return self._solution.poly
+
+	def set_property(self, key, value):
+		if key == "poly":
+			if (self._solution is None) or (self._solution.poly != value):
+				self._solution = NewtonSolver(value)
+				self.set_property("poly_degree", self._solution.poly.degree)
+				self.set_property("solutions", sorted([ (value.real, value.imag) for value in self._solution.find_all(field_size = 5, step_size = 0.1) ]))
+		else:
+			CPUEngine.set_property(self, key, value)
+
+	@property
+	def roots(self):
+		"""The roots the shader considers for coloring: the first poly_degree
+		entries of the uniform array, which reads as zero where the solver
+		found fewer solutions than that."""
+		poly_degree = self.get_property("poly_degree")
+		roots = numpy.zeros(poly_degree, dtype = complex)
+		solutions = [ complex(x, y) for (x, y) in self.get_property("solutions")[:poly_degree] ]
+		roots[:len(solutions)] = solutions
+		return roots
+
+	def iterate(self, c):
+		"""Runs Newton's method on all values of the complex array c. Returns
+		a tuple (iterations, closest_index) of int32 arrays of the same shape;
+		the former holds the iteration in which the step size fell below the
+		cutoff (or max_iterations) and the latter the index of the root the
+		value converged to."""
+		max_iterations = self.get_property("max_iterations")
+		cutoff = self.get_property("cutoff")
+		poly = self._solution.poly
+
+		c = numpy.asarray(c, dtype = complex)
+		shape = c.shape
+		c = c.reshape(-1).copy()
+		iterations = numpy.full(c.shape, max_iterations, dtype = numpy.int32)
+
+		index = numpy.arange(c.size)
+		cur = c.copy()
+		with numpy.errstate(divide = "ignore", invalid = "ignore", over = "ignore"):
+			for iteration in range(max_iterations):
+				(cur_p, cur_dx) = poly.eval_with_dx(cur)
+				new_cur = cur - (cur_p / cur_dx)
+				converged = numpy.abs(new_cur - cur) < cutoff
+				cur = new_cur
+				c[index] = cur
+				if numpy.any(converged):
+					iterations[index[converged]] = iteration
+					remaining = ~converged
+					(index, cur) = (index[remaining], cur[remaining])
+					if len(index) == 0:
+						break
+
+			# Among the pre-computed solutions, pick the one that most closely
+			# matches. NaN distances never compare smaller, like in GLSL.
+			distances = numpy.abs(c[:, numpy.newaxis] - self.roots[numpy.newaxis, :])
+			closest_index = numpy.argmin(numpy.where(numpy.isnan(distances), numpy.inf, distances), axis = 1).astype(numpy.int32)
+		return (iterations.reshape(shape), closest_index.reshape(shape))
+
+	def compute_at(self, viewport, x, y):
+		return self.iterate(self.pixel_grid_at(viewport, x, y))
+
+	def iterations(self, data):
+		return data[0]
+
+	def split_data(self, data):
+		return data
+
+	def join_data(self, planes):
+		return tuple(planes)
+
+	def shading(self, iterations):
+		"""Darken or brighten by iteration count, returns values in the range
+		from -darken_brighten_clamp to darken_brighten_clamp."""
+		# Convert to value from -1 to 1 first, then shift value according to
+		# shifting property and clamp
+		flt_iterations = (iterations / float(self.get_property("max_iterations")) * 2.0) - 1.0
+		flt_iterations = flt_iterations + self.get_property("darken_brighten_shift")
+		flt_iterations = numpy.clip(flt_iterations, -1, 1) * self.get_property("darken_brighten_clamp")
+
+		# Finally exponentiate it according to darken/brighten exponent while
+		# keeping the sign
+		return numpy.sign(flt_iterations) * (numpy.abs(flt_iterations) ** self.get_property("darken_brighten_exp"))
+
+	def colorize(self, data, lut):
+		(iterations, closest_index) = data
+		# A single root (degree 1) maps to the start of the palette
+		flt_closest = closest_index / float(max(self.get_property("poly_degree") - 1, 1))
+		base_color = self.texture1d(lut, flt_closest)
+		return self.to_rgb8(base_color + self.shading(iterations)[..., numpy.newaxis])
@@ -20,116 +20,214 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
+import textwrap
 from GLFragmentShader import GLFragmentShaderProgram
 from NewtonSolver import Polynomial, NewtonSolver
 
 class NewtonFragmentShaderProgram(GLFragmentShaderProgram):
-	def __init__(self):
-		GLFragmentShaderProgram.__init__(self, """\
-		#define MAX_POLY_DEGREE		16
-		#define cplx_mul(a, b)		vec2(a.x * b.x - a.y * b.y, a.x * b.y + a.y * b.x)
-		#define cplx_div(a, b)		vec2(((a.x * b.x + a.y * b.y) / (b.x * b.x + b.y * b.y)), ((a.y * b.x - a.x * b.y) / (b.x * b.x + b.y * b.y)))
-		#define cplx_abs(x)			length(x)
-
-		uniform sampler1D tex;
-		uniform vec2 center, size;
-		uniform vec2 poly_coeffs[MAX_POLY_DEGREE];
-		uniform vec2 poly_dx_coeffs[MAX_POLY_DEGREE - 1];
-		uniform vec2 solutions[MAX_POLY_DEGREE];
-		uniform int max_iterations;
-		uniform float cutoff;
-		uniform int poly_degree;
-		uniform float darken_brighten_shift, darken_brighten_clamp, darken_brighten_exp;
-
-		/* Calculate complex exponentation base ^ exponent */
-		vec2 cplx_pow(vec2 base, float exponent) {
-			float absval = pow(cplx_abs(base), exponent);
-			float arg = exponent * atan2(base.y, base.x);
-			return vec2(absval * cos(arg), absval * sin(arg));
+	# Sources are specialized for the degree of the polynomial: the Horner
+	# scheme and the search for the closest root are unrolled by
+	# generate_source(), arrays are sized exactly and the degree is a
+	# constant. Coefficients and roots remain uniforms, so changing the
+	# polynomial without changing its degree does not require a new program.
+	_SOURCE = """\
+	#define POLY_DEGREE			%(degree)d
+	#define cplx_mul(a, b)		vec2(a.x * b.x - a.y * b.y, a.x * b.y + a.y * b.x)
+	#define cplx_div(a, b)		vec2(((a.x * b.x + a.y * b.y) / (b.x * b.x + b.y * b.y)), ((a.y * b.x - a.x * b.y) / (b.x * b.x + b.y * b.y)))
+	#define cplx_abs(x)			length(x)
+
+	uniform vec2 center, size;
+	uniform vec2 poly_coeffs[POLY_DEGREE + 1];
+	uniform vec2 solutions[POLY_DEGREE];
+	uniform int max_iterations;
+	uniform float cutoff;
+	const int poly_degree = POLY_DEGREE;
+
+	vec4 colorize(float iterations, float closest_index);
+
+	/* Evaluate the polynomial and its first derivative at the position "x"
+	in a single pass using the Horner scheme */
+	void poly_eval(vec2 x, out vec2 result, out vec2 result_dx) {
+	%(poly_eval)s
+	}
+
+	void main() {
+		vec2 c;
+		c.x = center.x + (size.x * (gl_TexCoord[0].x - 0.5));
+		c.y = center.y + (size.y * (gl_TexCoord[0].y - 0.5));
+
+		/* First, find convergent value of Newton solver with the given
+		starting point "c" */
+		int iterations;
+		for (iterations = 0; iterations < max_iterations; iterations++) {
+			vec2 value, value_dx;
+			poly_eval(c, value, value_dx);
+			vec2 new_c = c - cplx_div(value, value_dx);
+			float err = length(new_c - c);
+			c = new_c;
+			if (err < cutoff) {
+				break;
+			}
 		}
 
-		/* Evaluate the polynomial with the given coefficients "coeffs" at the
-		position "x" */
-		vec2 poly_eval(vec2 coeffs[], int coeff_cnt, vec2 x) {
-			vec2 result = vec2(0, 0);
-			for (int exponent = 0; exponent < coeff_cnt; exponent++) {
-				result = result + cplx_mul(coeffs[exponent], cplx_pow(x, exponent));
-			}
-			return result;
+		/* Then, among the previously pre-computed solutions, pick the one
+		that most closely matches */
+		int closest_index = 0;
+		float min_err = length(solutions[0] - c);
+		float err;
+	%(root_matching)s
+
+	#ifdef OUTPUT_ITERATIONS
+		gl_FragColor = vec4(float(iterations), float(closest_index), 0.0, 1.0);
+	#else
+		gl_FragColor = colorize(float(iterations), float(closest_index));
+	#endif
+	}
+	"""
+
+	# Colors by root and darkens or brightens by iteration count. Requires the
+	# max_iterations and poly_degree uniforms to be declared already.
+	_COLORIZE_SOURCE = """\
+	uniform sampler1D tex;
+	uniform float darken_brighten_shift, darken_brighten_clamp, darken_brighten_exp;
+
+	vec4 colorize(float iterations, float closest_index) {
+		/* Convert into a float and lookup color value */
+		float flt_closest = closest_index / max(float(poly_degree - 1), 1.0);
+		vec4 base_color = texture1D(tex, flt_closest);
+
+		/* Darken or brighten by iteration count; convert to value from -1 to 1 first */
+		float flt_iterations = (iterations / float(max_iterations) * 2.0) - 1.0;
+
+		/* Then shift value according to shifting uniform */
+		flt_iterations += darken_brighten_shift;
+
+		/* Finally clamp to final value */
+		flt_iterations = clamp(flt_iterations, -1, 1) * darken_brighten_clamp;
+
+		/* Finally exponentiate it according to uniform darken/brighten exponent */
+		if (flt_iterations >= 0) {
+			flt_iterations = pow(flt_iterations, darken_brighten_exp);
+		} else {
+			flt_iterations = -pow(-flt_iterations, darken_brighten_exp);
 		}
 
-		void main() {
-			vec2 c;
-			c.x = center.x + (size.x * (gl_TexCoord[0].x - 0.5));
-			c.y = center.y + (size.y * (gl_TexCoord[0].y - 0.5));
-
-			/* First, find convergent value of Newton solver with the given
-			starting point "c" */
-			int iterations;
-			for (iterations = 0; iterations < max_iterations; iterations++) {
-				vec2 new_c = c - cplx_div(poly_eval(poly_coeffs, poly_degree + 1, c), poly_eval(poly_dx_coeffs, poly_degree, c));
-				float err = length(new_c - c);
-				c = new_c;
-				if (err < cutoff) {
-					break;
-				}
-			}
+		vec4 add_color = vec4(1, 1, 1, 0) * flt_iterations;
+		return base_color + add_color;
+	}
+	"""
+
+	# Properties which only the colorize stage uses
+	colorize_properties = frozenset([ "darken_brighten_shift", "darken_brighten_clamp", "darken_brighten_exp" ])
+
+	@staticmethod
+	def _poly_eval_source(degree):
+		lines = [ "result = poly_coeffs[%d];" % (degree) ]
+		for exponent in reversed(range(degree)):
+			if exponent == degree - 1:
+				lines.append("result_dx = result;")
+			else:
+				lines.append("result_dx = cplx_mul(result_dx, x) + result;")
+			lines.append("result = cplx_mul(result, x) + poly_coeffs[%d];" % (exponent))
+		return lines
+
+	@staticmethod
+	def _root_matching_source(degree):
+		lines = [ ]
+		for i in range(1, degree):
+			lines.append("err = length(solutions[%d] - c);" % (i))
+			lines.append("if (err < min_err) { min_err = err; closest_index = %d; }" % (i))
+		return lines
+
+	@classmethod
+	def generate_source(cls, output = "color", degree = 3):
+		"""Returns the shader source for polynomials of the given degree which
+		either directly outputs colors or, for output = "iterations", writes
+		iteration count and index of the closest root into the red and green
+		channel of a float render target. The latter is then colored by
+		NewtonColorizeFragmentShaderProgram."""
+		assert(degree >= 1)
+		source = textwrap.dedent(cls._SOURCE) % {
+			"degree":			degree,
+			"poly_eval":		"\n".join("\t" + line for line in cls._poly_eval_source(degree)),
+			"root_matching":	"\n".join("\t" + line for line in cls._root_matching_source(degree)),
+		}
+		if output == "iterations":
+			return "#define OUTPUT_ITERATIONS\n" + source
+		else:
+			return source + textwrap.dedent(cls._COLORIZE_SOURCE)
 
-			/* Then, among the previously pre-computed solutions, pick the one
-			that most closely matches */
-			int closest_index = 0;
-			float min_err = length(solutions[0] - c);
-			for (int i = 1; i < poly_degree; i++) {
-				float err = length(solutions[i] - c);
-				if (err < min_err) {
-					min_err = err;
-					closest_index = i;
-				}
-			}
+	def __init__(self, output = "color", degree = 3, gl = None, binary_cache = None):
+		self._output = output
+		self._degree = degree
+		GLFragmentShaderProgram.__init__(self, self.generate_source(output, degree), gl = gl, binary_cache = binary_cache)
+		self.set_property("max_iterations", 50)
+		self.set_property("cutoff", 1e-4)
+		if output == "color":
+			self.set_property("darken_brighten_shift", 0.75)
+			self.set_property("darken_brighten_clamp", 0.5)
+			self.set_property("darken_brighten_exp", 0.6)
+		self._solution = None
+		self.set_property("poly", Polynomial(*([ 3 ] + ([ 0 ] * (degree - 1)) + [ 1 ])))
 
-			/* Convert into a float and lookup color value */
-			float flt_closest = closest_index / float(poly_degree - 1);
-			vec4 base_color = texture1D(tex, flt_closest);
+	@property
+	def output(self):
+		return self._output
 
-			/* Darken or brighten by iteration count; convert to value from -1 to 1 first */
-			float flt_iterations = (float(iterations) / float(max_iterations) * 2.0) - 1.0;
+	@property
+	def degree(self):
+		return self._degree
 
-			/* Then shift value according to shifting uniform */
-			flt_iterations += darken_brighten_shift;
+	@property
+	def poly(self):
+		return self._solution.poly
 
-			/* Finally clamp to final value */
-			flt_iterations = clamp(flt_iterations, -1, 1) * darken_brighten_clamp;
+	def set_property(self, key, value):
+		if key == "poly":
+			if value.degree != self._degree:
+				raise Exception("Polynomial of degree %d given to a Newton shader program specialized for degree %d." % (value.degree, self._degree))
+			if (self._solution is None) or (self._solution.poly != value):
+				self._solution = NewtonSolver(value)
+				self.set_property("poly_coeffs", self._solution.poly.coeffs)
+				self.set_property("solutions", sorted([ (value.real, value.imag) for value in self._solution.find_all(field_size = 5, step_size = 0.1) ]))
+		else:
+			GLFragmentShaderProgram.set_property(self, key, value)
 
-			/* Finally exponentiate it according to uniform darken/brighten exponent */
-			if (flt_iterations >= 0) {
-				flt_iterations = pow(flt_iterations, darken_brighten_exp);
-			} else {
-				flt_iterations = -pow(-flt_iterations, darken_brighten_exp);
+class NewtonColorizeFragmentShaderProgram(GLFragmentShaderProgram):
+	"""Colorize stage for NewtonFragmentShaderProgram with output =
+	"iterations": reads iteration count and root index from a float texture
+	(bound to texture unit 0) and applies palette (unit 1) and iteration
+	dependent shading. Only needs the degree of the polynomial, which is
+	taken from the "poly" property."""
+
+	properties = frozenset([ "max_iterations", "poly", "darken_brighten_shift", "darken_brighten_clamp", "darken_brighten_exp" ])
+
+	@classmethod
+	def generate_source(cls):
+		return textwrap.dedent("""\
+			uniform sampler2D iteration_data;
+			uniform int max_iterations;
+			uniform int poly_degree;
+		""") + textwrap.dedent(NewtonFragmentShaderProgram._COLORIZE_SOURCE) + textwrap.dedent("""\
+
+			void main() {
+				vec2 data = texture2D(iteration_data, gl_TexCoord[0].xy).rg;
+				gl_FragColor = colorize(data.r, data.g);
 			}
-
-			vec4 add_color = vec4(1, 1, 1, 0) * flt_iterations;
-			gl_FragColor = base_color + add_color;
-		}
 		""")
+
+	def __init__(self, gl = None, binary_cache = None):
+		GLFragmentShaderProgram.__init__(self, self.generate_source(), gl = gl, binary_cache = binary_cache)
+		self.set_property("iteration_data", 0)
+		self.set_property("tex", 1)
 		self.set_property("max_iterations", 50)
-		self.set_property("cutoff", 1e-4)
 		self.set_property("darken_brighten_shift", 0.75)
 		self.set_property("darken_brighten_clamp", 0.5)
 		self.set_property("darken_brighten_exp", 0.6)
-		self._solution = None
 		self.set_property("poly", Polynomial(3, 0, 0, 1))
 
-	@property
-	def poly(self):
-		return self._poly
-
 	def set_property(self, key, value):
 		if key == "poly":
-			if (self._solution is None) or (self._solution.poly != value):
-				self._solution = NewtonSolver(value)
-				self.set_property("poly_degree", self._solution.poly.degree)
-				self.set_property("poly_coeffs", self._solution.poly.coeffs)
-				self.set_property("poly_dx_coeffs", self._solution.poly_dx.coeffs)
-				self.set_property("solutions", sorted([ (value.real, value.imag) for value in self._solution.find_all(field_size = 5, step_size = 0.1) ]))
+			GLFragmentShaderProgram.set_property(self, "poly_degree", value.degree)
 		else:
 			GLFragmentShaderProgram.set_property(self, key, value)
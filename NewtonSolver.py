@@ -19,6 +19,8 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
+import numpy
+
 class Polynomial(object):
 	def __init__(self, *coefficients):
 		assert(len(coefficients) >= 1)
@@ -49,14 +51,31 @@ class Polynomial(object):
 		return " + ".join(terms)
 
 	def dx(self):
+		if self.degree == 0:
+			return Polynomial(0)
 		return Polynomial(*[ exp * coeff for (exp, coeff) in enumerate(self._coeffs[1:], 1) ])
 
 	def __call__(self, value):
+		"""Evaluates the polynomial at the given position, which can either be
+		a scalar or a NumPy array (evaluated element-wise)."""
+		if isinstance(value, (list, tuple)):
+			value = numpy.asarray(value, dtype = complex)
 		result = 0
-		for (exponent, coeff) in enumerate(self._coeffs):
-			result += coeff * (value ** exponent)
+		for coeff in reversed(self._coeffs):
+			result = (result * value) + coeff
 		return result
 
+	def eval_with_dx(self, value):
+		"""Evaluates the polynomial and its first derivative at the given
+		position in a single Horner pass. Returns a tuple (p(x), p'(x))."""
+		if isinstance(value, (list, tuple)):
+			value = numpy.asarray(value, dtype = complex)
+		(result, result_dx) = (0, 0)
+		for coeff in reversed(self._coeffs):
+			result_dx = (result_dx * value) + result
+			result = (result * value) + coeff
+		return (result, result_dx)
+
 	@property
 	def coeffs(self):
 		return [ (coeff.real, coeff.imag) for coeff in self._coeffs ]
@@ -87,6 +106,7 @@ class ApproxEqualComplex(object):
 
 class NewtonSolver(object):
 	_max_iterations = 1000
+	_max_error = 1e-5
 
 	def __init__(self, poly):
 		self._poly = poly
@@ -101,30 +121,57 @@ class NewtonSolver(object):
 		return self._poly_dx
 
 	def find_all(self, field_size, step_size):
-		values = set()
 		(minx, maxx) = (-field_size / 2, field_size / 2)
 		(miny, maxy) = (-field_size / 2, field_size / 2)
-		(stepx, stepy) = (step_size, step_size)
-		x = minx
-		while x < maxx:
-			y = miny
-			while y < maxy:
-				value = complex(x, y)
-				zero = self(value)
-				values.add(ApproxEqualComplex(zero))
-				y += step_size
-			x += step_size
+		x = numpy.arange(minx, maxx, step_size)
+		y = numpy.arange(miny, maxy, step_size)
+		seeds = x[:, numpy.newaxis] + 1j * y[numpy.newaxis, :]
+		zeros = self(seeds)
+
+		# Seeds which hit a critical point of the polynomial diverge to NaN
+		zeros = zeros[numpy.isfinite(zeros)]
+		values = set(ApproxEqualComplex(complex(zero)) for zero in zeros.flat)
 		return [ value.complex for value in values ]
 
-	def __call__(self, value):
+	def _solve_scalar(self, value):
 		for i in range(self._max_iterations):
-			new_value = value - (self._poly(value) / self._poly_dx(value))
+			(value_p, value_dx) = self._poly.eval_with_dx(value)
+			new_value = value - (value_p / value_dx)
 			err = abs(new_value - value)
 			value = new_value
-			if err < 1e-5:
+			if err < self._max_error:
 				break
 		return value
 
+	def _solve_array(self, values):
+		values = numpy.array(values, dtype = complex)
+		flat_values = values.reshape(-1)
+
+		# Only the values which have not converged yet are kept in the working
+		# array; "index" maps them back into the result.
+		index = numpy.arange(flat_values.size)
+		cur = flat_values.copy()
+		with numpy.errstate(divide = "ignore", invalid = "ignore", over = "ignore"):
+			for i in range(self._max_iterations):
+				(cur_p, cur_dx) = self._poly.eval_with_dx(cur)
+				new_cur = cur - (cur_p / cur_dx)
+				converged = numpy.abs(new_cur - cur) < self._max_error
+				flat_values[index] = new_cur
+				remaining = ~converged
+				(index, cur) = (index[remaining], new_cur[remaining])
+				if len(index) == 0:
+					break
+		return values
+
+	def __call__(self, value):
+		"""Runs Newton's method starting at the given value. If it is a NumPy
+		array (or list), every element is solved for independently and an
+		array of the same shape is returned."""
+		if isinstance(value, (numpy.ndarray, list, tuple)):
+			return self._solve_array(value)
+		else:
+			return self._solve_scalar(value)
+
 if __name__ == "__main__":
 	poly = Polynomial(-1, 0, 0, 1)
 	solver = NewtonSolver(poly)
@@ -0,0 +1,77 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import json
+from AdvancedColorPalette import AdvancedColorPalette
+
+class PaletteRegistry(object):
+	"""Cache of the palettes of any number of JSON palette files. Each file is
+	parsed only once and each palette is only built once; since palettes
+	cache their lookup tables, those are kept as well. Before every lookup,
+	the file's modification time and size are checked and all of its
+	entries are dropped when it changed."""
+
+	def __init__(self):
+		# filename -> (stat key, parsed JSON, { name: AdvancedColorPalette })
+		self._files = { }
+
+	@staticmethod
+	def _stat_key(filename):
+		stat = os.stat(filename)
+		return (stat.st_mtime_ns, stat.st_size)
+
+	def _get_file(self, filename):
+		filename = os.path.abspath(filename)
+		stat_key = self._stat_key(filename)
+		entry = self._files.get(filename)
+		if (entry is None) or (entry[0] != stat_key):
+			with open(filename) as f:
+				palettes = json.load(f)
+			entry = (stat_key, palettes, { })
+			self._files[filename] = entry
+		return entry
+
+	def schemata(self, filename):
+		"""Returns the sorted names of all palettes in the file."""
+		(stat_key, palettes, compiled) = self._get_file(filename)
+		return sorted(palettes.keys())
+
+	def get(self, filename, palettename):
+		"""Returns the palette of the given name. The same palette object is
+		returned until the file changes."""
+		(stat_key, palettes, compiled) = self._get_file(filename)
+		if palettename not in compiled:
+			if palettename not in palettes:
+				raise KeyError("No palette '%s' contained in JSON file %s." % (palettename, filename))
+			compiled[palettename] = AdvancedColorPalette(palettes[palettename])
+		return compiled[palettename]
+
+	def lut(self, filename, palettename, size = 4096):
+		"""Returns the palette's uint8 lookup table of the given size."""
+		return self.get(filename, palettename).lut(size)
+
+	def forget(self, filename = None):
+		"""Drops the cached entries of one file, or of all files."""
+		if filename is None:
+			self._files.clear()
+		else:
+			self._files.pop(os.path.abspath(filename), None)
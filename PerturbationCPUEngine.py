@@ -0,0 +1,260 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import math
+import decimal
+import numpy
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+
+class PerturbationCPUEngine(MandelbrotJuliaCPUEngine):
+	"""Deep zoom variant of MandelbrotJuliaCPUEngine. A single reference orbit
+	is computed with arbitrary precision using decimal; every pixel then only
+	iterates its (tiny) difference to that orbit in double precision:
+
+		z_n = Z_n + d_n
+		d_{n+1} = 2 Z_n d_n + d_n^2 + dc
+
+	The first iterations are skipped altogether by a third order series
+	approximation of d_n in dc. Pixels for which the reference orbit is not
+	representative (glitches) are detected and recomputed with a new
+	reference which is picked among them.
+
+	Interior points are detected like MandelbrotJuliaCPUEngine does: pixels
+	within the main cardioid or the period-2 bulb are not iterated at all
+	and orbits which return to a previously saved point are stopped. The
+	periodicity_tolerance is relative to the pixel spacing, though: deep
+	zoom orbits may stay close to a repelling cycle for many iterations
+	before they escape, so an absolute tolerance would wrongly stop them.
+
+	Since only offsets to the center are kept in floating point, the logical
+	center needs more precision than the viewport's floats provide for deep
+	zooms. It is given as "precise_center" property, a tuple of Decimal
+	values (or strings); when it is None, the viewport center is used."""
+
+	# Far larger than the rounding error of the interior test expressions for
+	# double precision coordinates of points in the set
+	_interior_margin = 1e-12
+
+	def __init__(self):
+		MandelbrotJuliaCPUEngine.__init__(self)
+		self.set_property("precise_center", None)
+		self.set_property("series_tolerance", 1e-6)
+		self.set_property("glitch_tolerance", 1e-3)
+		self.set_property("max_references", 10)
+		self._statistics = { }
+
+	@property
+	def statistics(self):
+		"""Statistics of the last compute() call: the iterations skipped by
+		series approximation, the number of reference orbits used and the
+		number of pixels which were still glitched after the last one."""
+		return self._statistics
+
+	@staticmethod
+	def _decimal_precision(offsets):
+		# Enough digits to resolve the smallest pixel offset, plus guard digits
+		smallest = numpy.min(numpy.abs(offsets[offsets != 0])) if numpy.any(offsets != 0) else 1
+		return max(30, 20 - math.floor(math.log10(smallest)))
+
+	def _reference_orbit(self, center, precision):
+		"""Iterates the reference point at the given decimal precision and
+		returns its orbit Z_0 ... Z_n as complex array. The orbit ends early
+		when the reference point escapes."""
+		max_iterations = self.get_property("max_iterations")
+		is_mandelbrot = self.get_property("is_mandelbrot")
+		julia_coeff = complex(self.get_property("julia_coeff"))
+
+		with decimal.localcontext() as ctx:
+			ctx.prec = precision
+			cutoff_sqr = decimal.Decimal(repr(self.get_property("cutoff"))) ** 2
+			(jx, jy) = (decimal.Decimal(repr(julia_coeff.real)), decimal.Decimal(repr(julia_coeff.imag)))
+			(cx, cy) = (+center[0], +center[1])
+			(x, y) = (cx, cy)
+			orbit = [ complex(float(x), float(y)) ]
+			for iteration in range(max_iterations):
+				if (iteration == 0) or is_mandelbrot:
+					(x, y) = ((x * x) - (y * y) + cx + jx, (2 * x * y) + cy + jy)
+				else:
+					(x, y) = ((x * x) - (y * y) + jx, (2 * x * y) + jy)
+				orbit.append(complex(float(x), float(y)))
+				if (x * x) + (y * y) > cutoff_sqr:
+					break
+		return numpy.array(orbit)
+
+	def _adds_c(self, iteration):
+		return (iteration == 0) or (self.get_property("is_mandelbrot") == 1)
+
+	def _series_approximation(self, orbit, max_offset, pixel_spacing):
+		"""Determines how many iterations can be skipped by approximating
+		d_n = A_n dc + B_n dc^2 + C_n dc^3. Returns the iteration count and
+		the coefficients at that iteration."""
+		tolerance = self.get_property("series_tolerance")
+		cutoff = self.get_property("cutoff")
+		(a, b, c, d) = (complex(1), complex(0), complex(0), complex(0))
+		skip = 0
+		if tolerance <= 0:
+			return (skip, (a, b, c))
+
+		# The last orbit point is kept out of reach so that the reference has
+		# not escaped yet at the iteration the pixels are resumed at
+		for iteration in range(len(orbit) - 2):
+			z = orbit[iteration]
+			(next_a, next_b, next_c, next_d) = ((2 * z * a) + (1 if self._adds_c(iteration) else 0), (2 * z * b) + (a * a), (2 * z * c) + (2 * a * b), (2 * z * d) + (2 * a * c) + (b * b))
+
+			# The third and (neglected) fourth order terms estimate the
+			# truncation error, which must remain small compared to the pixel
+			# spacing after the iteration. The third order term alone is not
+			# enough since it may vanish while the fourth does not.
+			error = (abs(next_c) * (max_offset ** 3)) + (abs(next_d) * (max_offset ** 4))
+			if error > tolerance * abs(next_a) * pixel_spacing:
+				break
+
+			# No pixel may escape during the iterations that are skipped
+			bound = abs(orbit[iteration + 1]) + (abs(next_a) * max_offset) + (abs(next_b) * (max_offset ** 2)) + error
+			if bound >= cutoff:
+				break
+			(a, b, c, d) = (next_a, next_b, next_c, next_d)
+			skip = iteration + 1
+		return (skip, (a, b, c))
+
+	def _perturb(self, orbit, dc, pixel_spacing, detect_glitches):
+		"""Iterates the pixel offsets dc (relative to the reference orbit).
+		Returns a tuple of the iteration counts, the squared absolute values
+		at escape and a boolean glitch mask."""
+		max_iterations = self.get_property("max_iterations")
+		cutoff_sqr = self.get_property("cutoff") ** 2
+		glitch_tolerance_sqr = self.get_property("glitch_tolerance") ** 2
+		periodicity_tolerance_sqr = (self.get_property("periodicity_tolerance") * pixel_spacing) ** 2
+
+		iterations = numpy.full(dc.shape, max_iterations, dtype = numpy.int32)
+		escape_abs_sqr = numpy.zeros(dc.shape)
+		glitched = numpy.zeros(dc.shape, dtype = bool)
+
+		max_offset = numpy.max(numpy.abs(dc)) if (len(dc) > 0) else 0
+		(skip, (a, b, c)) = self._series_approximation(orbit, max_offset, pixel_spacing)
+		self._statistics["series_skip"] = max(self._statistics.get("series_skip", 0), skip)
+
+		index = numpy.arange(len(dc))
+		delta = (a * dc) + (b * dc * dc) + (c * dc * dc * dc)
+
+		# Brent-style cycle detection on the full orbit z_n = Z_n + d_n,
+		# starting at the first iteration that is not skipped
+		saved = orbit[skip] + delta
+		check_at = 1
+		for iteration in range(skip, max_iterations):
+			if len(index) == 0:
+				break
+			if iteration + 1 >= len(orbit):
+				# The reference escaped before these pixels did, so it cannot be
+				# used to continue them
+				glitched[index] = True
+				break
+
+			delta = (2 * orbit[iteration] * delta) + (delta * delta)
+			if self._adds_c(iteration):
+				delta = delta + dc
+			z = orbit[iteration + 1] + delta
+			abs_sqr = (z.real * z.real) + (z.imag * z.imag)
+
+			escaped = abs_sqr > cutoff_sqr
+			finished = escaped
+			if detect_glitches:
+				ref = orbit[iteration + 1]
+				glitch = (~escaped) & (abs_sqr < glitch_tolerance_sqr * ((ref.real * ref.real) + (ref.imag * ref.imag)))
+				glitched[index[glitch]] = True
+				finished = finished | glitch
+			cycle = z - saved
+			periodic = ((cycle.real * cycle.real) + (cycle.imag * cycle.imag)) < periodicity_tolerance_sqr
+			# Periodic orbits never escape and keep max_iterations
+			finished = finished | periodic
+			if numpy.any(finished):
+				iterations[index[escaped]] = iteration
+				escape_abs_sqr[index[escaped]] = abs_sqr[escaped]
+				remaining = ~finished
+				(index, dc, delta, z, saved) = (index[remaining], dc[remaining], delta[remaining], z[remaining], saved[remaining])
+
+			if iteration - skip == check_at:
+				saved = z
+				check_at *= 2
+		return (iterations, escape_abs_sqr, glitched)
+
+	def iterate_offsets(self, center, offsets, pixel_spacing):
+		"""Computes iteration counts for the pixels at the given complex
+		offsets relative to the high-precision center. The pixel spacing
+		determines how precise the series approximation needs to be."""
+		offsets = numpy.asarray(offsets, dtype = complex)
+		flat_offsets = offsets.reshape(-1)
+		iterations = numpy.full(flat_offsets.shape, self.get_property("max_iterations"), dtype = numpy.int32)
+		escape_abs_sqr = numpy.zeros(flat_offsets.shape)
+		self._statistics = { "series_skip": 0, "references": 0, "glitched": 0 }
+		if flat_offsets.size == 0:
+			return iterations.reshape(offsets.shape)
+
+		precision = self._decimal_precision(flat_offsets)
+		center = (decimal.Decimal(center[0]), decimal.Decimal(center[1]))
+		pending = numpy.arange(flat_offsets.size)
+		if self._interior_check_applicable():
+			# Pixel coordinates are only known to double precision here, so
+			# pixels right at the boundary are iterated nevertheless
+			c = complex(float(center[0]), float(center[1])) + flat_offsets
+			pending = pending[~self.in_main_cardioid_or_bulb(c, margin = self._interior_margin)]
+		reference_offset = complex(0)
+		max_references = self.get_property("max_references") if (len(pending) > 0) else 0
+		for reference in range(max_references):
+			self._statistics["references"] = reference + 1
+			with decimal.localcontext() as ctx:
+				ctx.prec = precision
+				reference_center = (center[0] + decimal.Decimal(reference_offset.real), center[1] + decimal.Decimal(reference_offset.imag))
+			orbit = self._reference_orbit(reference_center, precision)
+
+			# The last reference is used for all remaining pixels, glitched or
+			# not
+			last_reference = (reference == max_references - 1)
+			dc = flat_offsets[pending] - reference_offset
+			(pending_iterations, pending_escape_abs_sqr, glitched) = self._perturb(orbit, dc, pixel_spacing, detect_glitches = not last_reference)
+			iterations[pending] = pending_iterations
+			escape_abs_sqr[pending] = pending_escape_abs_sqr
+			pending = pending[glitched]
+			if len(pending) == 0:
+				break
+
+			# Pick the glitched pixel closest to the centroid of all glitched
+			# pixels as next reference
+			glitched_offsets = flat_offsets[pending]
+			centroid = numpy.mean(glitched_offsets)
+			reference_offset = glitched_offsets[numpy.argmin(numpy.abs(glitched_offsets - centroid))]
+		self._statistics["glitched"] = len(pending)
+		if self._smooth_coloring_applicable():
+			iterations = self._smooth(iterations, escape_abs_sqr)
+		return iterations.reshape(offsets.shape)
+
+	def pan_reusable(self):
+		# With a precise center, pixels are offsets to it and do not move
+		# along with the viewport center
+		return self.get_property("precise_center") is None
+
+	def compute_at(self, viewport, x, y):
+		center = self.get_property("precise_center")
+		if center is None:
+			center = (repr(viewport.logical_center.x), repr(viewport.logical_center.y))
+		(width, height) = self.device_dimensions(viewport)
+		pixel_spacing = min(viewport.logical_size.x / width, viewport.logical_size.y / height)
+		return self.iterate_offsets(center, self.pixel_offsets_at(viewport, x, y), pixel_spacing)
@@ -0,0 +1,90 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import math
+
+class RenderScaleController(object):
+	"""Chooses the resolution scale of interactive frames so that rendering
+	one takes about frame_time_budget seconds. The cost of a frame is taken
+	to be proportional to its pixel count, i.e., quadratic in the scale.
+
+	Scales are quantized to multiples of "step", and the scale only moves to
+	another step once the ideal scale is at least three quarters of a step
+	away. Every change of the scale changes the size of the offscreen
+	targets, which then have to be reallocated; quantization keeps that to
+	a few sizes instead of a new one on almost every frame."""
+
+	def __init__(self, frame_time_budget = 1 / 30, min_scale = 0.125, step = 0.125):
+		assert(frame_time_budget > 0)
+		assert(0 < min_scale <= 1)
+		assert(0 < step <= 1)
+		self._frame_time_budget = frame_time_budget
+		self._min_scale = min_scale
+		self._step = step
+		self._scale = 1
+
+	@property
+	def scale(self):
+		return self._scale
+
+	@property
+	def frame_time_budget(self):
+		return self._frame_time_budget
+
+	@frame_time_budget.setter
+	def frame_time_budget(self, value):
+		assert(value > 0)
+		self._frame_time_budget = value
+
+	@property
+	def min_scale(self):
+		return self._min_scale
+
+	@min_scale.setter
+	def min_scale(self, value):
+		assert(0 < value <= 1)
+		self._min_scale = value
+		self._scale = max(self._scale, value)
+
+	def ideal_scale(self, frame_time):
+		"""Unquantized scale which would have rendered the frame, which took
+		frame_time seconds at the current scale, within the budget."""
+		scale = self._scale * math.sqrt(self._frame_time_budget / max(frame_time, 1e-6))
+		return min(max(scale, self._min_scale), 1)
+
+	def update(self, frame_time):
+		"""Adapts the scale to the time the last frame took to render at the
+		current scale. Returns True if the scale changed."""
+		ideal = self.ideal_scale(frame_time)
+		if abs(ideal - self._scale) < 0.75 * self._step:
+			return False
+		scale = min(max(round(ideal / self._step) * self._step, self._min_scale), 1)
+		if scale == self._scale:
+			return False
+		self._scale = scale
+		return True
+
+	def size(self, width, height):
+		"""Size of a frame at the current scale."""
+		return (max(1, round(width * self._scale)), max(1, round(height * self._scale)))
+
+	def reset(self):
+		self._scale = 1
@@ -0,0 +1,205 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import pickle
+import collections
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy
+
+Tile = collections.namedtuple("Tile", [ "x", "y", "width", "height" ])
+
+# State of a worker process: the image buffer (and data buffer, if the
+# per-pixel data is returned as well) it is attached to and the job of the
+# render() call it currently works on
+_worker_state = { }
+
+def _buffers(shm, shape, data_planes):
+	"""Returns the views of the shared memory segment: the uint8 image of the
+	given shape, followed by the float64 data planes (which hold integer
+	iteration counts exactly) of shape (data_planes, height, width)."""
+	image = numpy.ndarray(shape, dtype = numpy.uint8, buffer = shm.buf)
+	data = numpy.ndarray((data_planes, ) + shape[:2], dtype = numpy.float64, buffer = shm.buf, offset = image.nbytes)
+	return (image, data)
+
+def _worker_attach(shm_name, shape, data_planes):
+	if _worker_state.get("buffers") == (shm_name, shape, data_planes):
+		return
+	if "shm" in _worker_state:
+		# The views have to go before the segment can be closed
+		del _worker_state["image"]
+		del _worker_state["data"]
+		_worker_state["shm"].close()
+	# Pool workers share the resource tracker with the parent, which thus
+	# remains the only one to unlink the segment
+	shm = shared_memory.SharedMemory(name = shm_name)
+	_worker_state["buffers"] = (shm_name, shape, data_planes)
+	_worker_state["shm"] = shm
+	(_worker_state["image"], _worker_state["data"]) = _buffers(shm, shape, data_planes)
+
+def _worker_render_tile(task):
+	(job_id, job, tile) = task
+	if _worker_state.get("job_id") != job_id:
+		# The job is unpickled only once per render() and worker
+		(shm_name, shape, data_planes, engine, viewport, lut) = pickle.loads(job)
+		_worker_attach(shm_name, shape, data_planes)
+		_worker_state.update({ "job_id": job_id, "engine": engine, "viewport": viewport, "lut": lut })
+	engine = _worker_state["engine"]
+	data = engine.compute(_worker_state["viewport"], region = tile)
+	_worker_state["image"][tile.y : tile.y + tile.height, tile.x : tile.x + tile.width] = engine.colorize(data, _worker_state["lut"])
+	# The data types are returned so that the data can be converted back
+	planes = engine.split_data(data)[:len(_worker_state["data"])]
+	for (plane, values) in zip(_worker_state["data"], planes):
+		plane[tile.y : tile.y + tile.height, tile.x : tile.x + tile.width] = values
+	return tuple(values.dtype.str for values in planes)
+
+class TiledRenderer(object):
+	"""Renders a viewport with a CPUEngine by splitting it up into tiles which
+	are computed by a pool of worker processes. Workers write their results
+	directly into an image buffer in shared memory, so only the (tiny) tile
+	descriptions and, once per render() call, the engine, viewport and
+	lookup table are pickled. render_with_data() returns the per-pixel data
+	through the same segment.
+
+	The pool and the shared memory segment are created on first use and kept
+	for following render() calls, e.g., the frames of an animation; the
+	segment is only reallocated when the image size changes. close() frees
+	both."""
+
+	def __init__(self, engine, tile_size = 256, workers = None):
+		if isinstance(tile_size, int):
+			tile_size = (tile_size, tile_size)
+		assert(tile_size[0] > 0)
+		assert(tile_size[1] > 0)
+		self._engine = engine
+		self._tile_size = tuple(tile_size)
+		self._workers = workers or os.cpu_count() or 1
+		self._pool = None
+		self._shm = None
+		self._shm_size = None
+		self._job_id = 0
+
+	@property
+	def engine(self):
+		return self._engine
+
+	@property
+	def tile_size(self):
+		return self._tile_size
+
+	@property
+	def workers(self):
+		return self._workers
+
+	def tiles(self, viewport):
+		"""Yields all tiles of the viewport in row-major order. Tile
+		coordinates are in image space, i.e., y = 0 is the top row. Each tile
+		is a region of the viewport which engines compute on their own; since
+		pixel coordinates are always derived from the whole viewport, they are
+		identical to the ones of an untiled computation (for deep zoom engines
+		this also keeps every tile relative to the same precise center)."""
+		(width, height) = self._engine.device_dimensions(viewport)
+		(tile_width, tile_height) = self._tile_size
+		for y in range(0, height, tile_height):
+			h = min(tile_height, height - y)
+			for x in range(0, width, tile_width):
+				w = min(tile_width, width - x)
+				yield Tile(x = x, y = y, width = w, height = h)
+
+	def render(self, viewport, palette):
+		"""Renders the viewport; returns an uint8 array of shape (height,
+		width, 3) just like CPUEngine.render() does."""
+		return self._render(viewport, palette, with_data = False)[1]
+
+	def render_with_data(self, viewport, palette):
+		"""Renders the viewport; returns a tuple (data, image) of the per-pixel
+		data, like the engine's compute() returns it, and the image render()
+		returns."""
+		return self._render(viewport, palette, with_data = True)
+
+	def _render(self, viewport, palette, with_data):
+		(width, height) = self._engine.device_dimensions(viewport)
+		shape = (height, width, 3)
+		data_planes = self._engine.data_plane_count if with_data else 0
+		lut = self._engine.create_lut(palette)
+		if self._workers == 1:
+			image = numpy.empty(shape, dtype = numpy.uint8)
+			planes = None
+			for tile in self.tiles(viewport):
+				data = self._engine.compute(viewport, region = tile)
+				image[tile.y : tile.y + tile.height, tile.x : tile.x + tile.width] = self._engine.colorize(data, lut)
+				if with_data:
+					if planes is None:
+						planes = [ numpy.empty((height, width), dtype = values.dtype) for values in self._engine.split_data(data) ]
+					for (plane, values) in zip(planes, self._engine.split_data(data)):
+						plane[tile.y : tile.y + tile.height, tile.x : tile.x + tile.width] = values
+			return ((self._engine.join_data(planes) if with_data else None), image)
+
+		shm = self._segment(width * height * (3 + (8 * data_planes)))
+		self._job_id += 1
+		job = pickle.dumps((shm.name, shape, data_planes, self._engine, viewport, lut))
+		dtypes = None
+		for dtypes in self._get_pool().imap_unordered(_worker_render_tile, ((self._job_id, job, tile) for tile in self.tiles(viewport))):
+			pass
+		(image, data) = _buffers(shm, shape, data_planes)
+		image = image.copy()
+		if with_data:
+			data = self._engine.join_data([ plane.astype(dtype) for (plane, dtype) in zip(data, dtypes) ])
+		else:
+			data = None
+		return (data, image)
+
+	def _get_pool(self):
+		if self._pool is None:
+			self._pool = multiprocessing.Pool(self._workers)
+		return self._pool
+
+	def _segment(self, size):
+		"""Returns the shared memory segment, which is reallocated if it does
+		not have the given size."""
+		if self._shm_size != size:
+			self._release_segment()
+			self._shm = shared_memory.SharedMemory(create = True, size = size)
+			self._shm_size = size
+		return self._shm
+
+	def _release_segment(self):
+		if self._shm is not None:
+			self._shm.close()
+			self._shm.unlink()
+			self._shm = None
+			self._shm_size = None
+
+	def close(self):
+		"""Terminates the worker pool and frees the shared memory segment. The
+		renderer may still be used afterwards, which sets both up again."""
+		if self._pool is not None:
+			self._pool.close()
+			self._pool.join()
+			self._pool = None
+		self._release_segment()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import sys
+from FriendlyArgumentParser import FriendlyArgumentParser
+from BenchmarkSuite import BenchmarkSuite
+
+def resolution(value):
+	(width, height) = value.lower().split("x")
+	return (int(width), int(height))
+
+def print_result(result):
+	print("%-20s %-15s %4dx%-4d %5d  %8.3fs  %12.0f px/s  %14.0f it/s" % (result["scene"], result["engine"], result["resolution"][0], result["resolution"][1], result["max_iterations"], result["seconds"], result["pixels_per_second"], result["iterations_per_second"]))
+
+if __name__ == "__main__":
+	parser = FriendlyArgumentParser(description = "Benchmark the CPU fractal engines on a fixed set of scenes.")
+	parser.add_argument("-s", "--scene", metavar = "name", choices = sorted(BenchmarkSuite.SCENES), action = "append", help = "Only run the given scene; can be given multiple times. Can be one of %(choices)s.")
+	parser.add_argument("-e", "--engine", metavar = "name", action = "append", help = "Only run the given engine (numpy, mariani-silver, perturbation); can be given multiple times.")
+	parser.add_argument("-r", "--resolution", metavar = "WxH", type = resolution, action = "append", help = "Resolution to render at; can be given multiple times. Defaults to 320x240 and 640x480.")
+	parser.add_argument("-i", "--max-iterations", metavar = "count", type = int, action = "append", help = "Iteration limit to render with; can be given multiple times. Defaults to 100 and 1000 for Mandelbrot and Julia sets and to 25 and 50 for Newton fractals.")
+	parser.add_argument("-n", "--repeats", metavar = "count", type = int, default = 3, help = "Number of runs of each case, of which the fastest counts. Defaults to %(default)d.")
+	parser.add_argument("-o", "--output", metavar = "filename", type = str, help = "Write the results as JSON to this file.")
+	parser.add_argument("-b", "--baseline", metavar = "filename", type = str, help = "Compare the results against a JSON file written previously and exit with status 1 if any case regressed.")
+	parser.add_argument("-t", "--tolerance", metavar = "fraction", type = float, default = 0.1, help = "Relative slowdown against the baseline that is still tolerated. Defaults to %(default).2f.")
+	args = parser.parse_args(sys.argv[1:])
+
+	suite = BenchmarkSuite(resolutions = args.resolution, max_iterations = args.max_iterations, scenes = args.scene, engines = args.engine, repeats = args.repeats)
+	results = suite.run(progress = print_result)
+	if args.output is not None:
+		BenchmarkSuite.save(args.output, results)
+
+	if args.baseline is not None:
+		regressions = BenchmarkSuite.compare(results, BenchmarkSuite.load(args.baseline), tolerance = args.tolerance)
+		for (key, reason) in regressions:
+			print("Regression: %s: %s" % (key, reason), file = sys.stderr)
+		if len(regressions) > 0:
+			sys.exit(1)
+		print("No regressions against %s." % (args.baseline))
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+# Compares the per-pixel cost of one Newton step's polynomial evaluation:
+# the former scheme, which computes every power by cplx_pow (pow, atan2, cos
+# and sin) separately for p(x) and p'(x), against the Horner scheme which
+# yields p(x) and p'(x) in a single pass.
+
+import time
+import numpy
+from NewtonSolver import Polynomial
+
+def cplx_pow(base, exponent):
+	absval = numpy.abs(base) ** exponent
+	arg = exponent * numpy.arctan2(base.imag, base.real)
+	return absval * (numpy.cos(arg) + 1j * numpy.sin(arg))
+
+def eval_pow(poly, x):
+	coeffs = [ complex(*coeff) for coeff in poly.coeffs ]
+	result = 0
+	for (exponent, coeff) in enumerate(coeffs):
+		result = result + coeff * cplx_pow(x, exponent)
+	result_dx = 0
+	for (exponent, coeff) in enumerate(coeffs[1:]):
+		result_dx = result_dx + (exponent + 1) * coeff * cplx_pow(x, exponent)
+	return (result, result_dx)
+
+def eval_horner(poly, x):
+	return poly.eval_with_dx(x)
+
+def time_per_pixel(function, poly, x, repeats = 5):
+	best = None
+	for i in range(repeats):
+		t0 = time.perf_counter()
+		function(poly, x)
+		t = time.perf_counter() - t0
+		if (best is None) or (t < best):
+			best = t
+	return best / x.size
+
+if __name__ == "__main__":
+	rng = numpy.random.RandomState(1234)
+	pixels = 250000
+	x = (rng.uniform(-2.5, 2.5, pixels) + 1j * rng.uniform(-2.5, 2.5, pixels))
+	print("Degree     pow [ns/px]  Horner [ns/px]  Speedup")
+	for degree in [ 3, 8, 16 ]:
+		poly = Polynomial(*(rng.uniform(-3, 3, degree + 1) + 1j * rng.uniform(-3, 3, degree + 1)))
+		(ref, ref_dx) = eval_pow(poly, x)
+		(val, val_dx) = eval_horner(poly, x)
+		assert(numpy.allclose(ref, val) and numpy.allclose(ref_dx, val_dx))
+
+		t_pow = time_per_pixel(eval_pow, poly, x)
+		t_horner = time_per_pixel(eval_horner, poly, x)
+		print("%6d  %14.1f  %14.1f  %6.1fx" % (degree, t_pow * 1e9, t_horner * 1e9, t_pow / t_horner))
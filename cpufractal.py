@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import sys
+import decimal
+from FriendlyArgumentParser import FriendlyArgumentParser
+from geo import Viewport2d
+from NewtonSolver import Polynomial
+from CPUHandler import CPUHandler
+from ImageWriter import ImageWriter
+from Animation import Animation, AnimationRenderer
+from AdaptiveIterations import AdaptiveIterations
+from AdaptiveSupersampler import AdaptiveSupersampler
+
+def cplx(value):
+	return complex(value.replace(" ", ""))
+
+def polynomial(value):
+	return Polynomial(*[ cplx(coeff) for coeff in value.split(",") ])
+
+def coordinate(value):
+	# Kept as decimal strings so deep zoom coordinates retain their precision
+	(x, y) = value.split(",")
+	return (str(decimal.Decimal(x)), str(decimal.Decimal(y)))
+
+def float_triple(value):
+	(x, y, z) = value.split(",")
+	return (float(x), float(y), float(z))
+
+def zoom_target(value):
+	(x, y, size) = value.split(",")
+	return (float(x), float(y), float(size))
+
+def resolution(value):
+	(width, height) = value.lower().split("x")
+	return (int(width), int(height))
+
+def scene_params_from_args(args):
+	"""Translates command line arguments into the same scene parameters
+	dictionary the GTK application hands to GLHandler."""
+	scene_params = {
+		"color_scheme_filename":	args.palette_file,
+		"color_scheme":				args.palette,
+		"type":						args.type,
+		"properties":				{ },
+	}
+	if args.deep_zoom:
+		# The precise center is taken from the high precision viewport
+		scene_params["deep_zoom"] = True
+	if args.max_iterations is not None:
+		scene_params["properties"]["max_iterations"] = args.max_iterations
+	if args.cutoff is not None:
+		scene_params["properties"]["cutoff"] = args.cutoff
+	if args.smooth and (args.type != "newton"):
+		scene_params["properties"]["smooth_coloring"] = 1
+
+	if args.type == "newton":
+		(shift, clamp, exp) = args.darken_brighten
+		scene_params["properties"].update({
+			"poly":						args.poly,
+			"darken_brighten_exp":		exp,
+			"darken_brighten_shift":	shift,
+			"darken_brighten_clamp":	clamp,
+		})
+	elif args.type == "mandelbrot":
+		scene_params["properties"].update({
+			"is_mandelbrot":			1,
+			"julia_coeff":				complex(0),
+		})
+	elif args.type == "julia":
+		scene_params["properties"].update({
+			"is_mandelbrot":			0,
+			"julia_coeff":				args.julia_coeff,
+		})
+	return scene_params
+
+def viewport_from_args(args, center = None, size = None, resolution = None):
+	if (args.bookmark is not None) and (center is None):
+		return Viewport2d.from_bookmark(args.bookmark)
+	(width, height) = resolution or args.resolution
+	(center_x, center_y) = center or args.center
+	size = size or args.size
+	if args.deep_zoom:
+		# Keeps all digits of the center
+		return Viewport2d(device_width = width, device_height = height, logical_center_x = decimal.Decimal(center_x), logical_center_y = decimal.Decimal(center_y), logical_width = decimal.Decimal(repr(size)), logical_height = decimal.Decimal(repr(size)), keep_aspect_ratio = True)
+	return Viewport2d(device_width = width, device_height = height, logical_center_x = float(center_x), logical_center_y = float(center_y), logical_width = size, logical_height = size, keep_aspect_ratio = True)
+
+def animation_from_args(args):
+	scene_params = scene_params_from_args(args)
+	(x, y, size) = args.zoom_to
+	animation = Animation()
+	start = viewport_from_args(args).to_float()
+	# A bookmark determines the resolution of all frames
+	resolution = (round(start.device_size.x), round(start.device_size.y))
+	animation.add_keyframe(0, start, scene_params)
+	animation.add_keyframe(args.duration, viewport_from_args(args, center = (x, y), size = size, resolution = resolution), scene_params)
+	return animation
+
+if __name__ == "__main__":
+	parser = FriendlyArgumentParser(description = "Render a fractal on the CPU, without requiring a display or a GL context.")
+	parser.add_argument("-t", "--type", choices = [ "newton", "mandelbrot", "julia" ], default = "mandelbrot", help = "Type of fractal to render. Can be one of %(choices)s, defaults to %(default)s.")
+	parser.add_argument("--poly", metavar = "coeffs", type = polynomial, default = "3,0,-3j,3j", help = "For Newton fractals, comma-separated complex coefficients of the polynomial, starting with the constant term. Defaults to %(default)s.")
+	parser.add_argument("--julia-coeff", metavar = "complex", type = cplx, default = "0.5+0.25j", help = "For Julia sets, the complex Julia coefficient. Defaults to %(default)s.")
+	parser.add_argument("--darken-brighten", metavar = "shift,clamp,exp", type = float_triple, default = "0.75,0.5,0.6", help = "For Newton fractals, shift, clamp and exponent of the iteration-dependent shading. Defaults to %(default)s.")
+	parser.add_argument("-d", "--deep-zoom", action = "store_true", help = "For Mandelbrot and Julia sets, use perturbation theory with an arbitrary precision reference orbit. Required for sizes below about 1e-13.")
+	parser.add_argument("--smooth", action = "store_true", help = "For Mandelbrot and Julia sets, color by continuous instead of integer iteration counts, which avoids banding.")
+	parser.add_argument("-m", "--subdivide", action = "store_true", help = "For Mandelbrot and Julia sets, use Mariani-Silver subdivision which only computes the borders of rectangles and fills them if all of the border has the same iteration count. Much faster for images with large uniform areas, but may miss details that lie entirely within a rectangle.")
+	parser.add_argument("--antialias", metavar = "samples", type = int, help = "Anti-alias edges: pixels whose color or iteration count differs strongly from their neighbors are computed again at this many jittered positions within the pixel.")
+	parser.add_argument("--sample-budget", metavar = "factor", type = float, default = 1, help = "Limits the extra samples of --antialias to this factor times the pixel count; the strongest edges are sampled first. Defaults to %(default).1f.")
+	parser.add_argument("-c", "--center", metavar = "x,y", type = coordinate, default = "0,0", help = "Logical center of the image. Defaults to %(default)s.")
+	parser.add_argument("-s", "--size", metavar = "height", type = float, default = 3, help = "Logical height of the image; its width follows from the aspect ratio of the resolution. Defaults to %(default)s.")
+	parser.add_argument("-b", "--bookmark", metavar = "text", type = str, help = "Render the location of a bookmark as printed by --print-bookmark, which replaces --center, --size and --resolution. Bookmarks of deep zooms keep all digits of the location.")
+	parser.add_argument("--print-bookmark", action = "store_true", help = "Print the bookmark of the rendered location to stderr, from which it can be rendered again exactly.")
+	parser.add_argument("--print-statistics", action = "store_true", help = "Print statistics of the computation to stderr, e.g., the fraction of pixels --subdivide skipped. For animations, they refer to the last frame. Not available with multiple workers.")
+	parser.add_argument("-r", "--resolution", metavar = "WxH", type = resolution, default = "1024x768", help = "Resolution of the output image in pixels. Defaults to %(default)s.")
+	parser.add_argument("-i", "--max-iterations", metavar = "count", type = int, help = "Maximum number of iterations. Defaults to the fractal's default value.")
+	parser.add_argument("-a", "--auto-iterations", action = "store_true", help = "Choose the maximum number of iterations automatically from the zoom depth; in animations, the escape statistics of every frame adapt it for the following ones. The value given by --max-iterations then is the cap, which defaults to 5000.")
+	parser.add_argument("--cutoff", metavar = "value", type = float, help = "Cutoff value of the iteration. Defaults to the fractal's default value.")
+	parser.add_argument("--palette-file", metavar = "filename", type = str, default = "palettes.json", help = "JSON file containing the color palettes. Defaults to %(default)s.")
+	parser.add_argument("-p", "--palette", metavar = "name", type = str, default = "flatui", help = "Name of the color palette to use. Defaults to %(default)s.")
+	parser.add_argument("-w", "--workers", metavar = "count", type = int, default = 1, help = "Number of worker processes which render tiles in parallel. Defaults to %(default)d.")
+	parser.add_argument("--tile-size", metavar = "pixels", type = int, default = 256, help = "Edge length of the tiles when rendering with multiple workers. Defaults to %(default)d.")
+	parser.add_argument("--zoom-to", metavar = "x,y,height", type = zoom_target, help = "Render an animation instead of a single image which zooms from center and size towards the given center and logical height. The output is written as YUV4MPEG2 (.y4m) or as a sequence of PPM images (.ppm); \"-\" streams YUV4MPEG2 to stdout, e.g., into an encoder.")
+	parser.add_argument("--duration", metavar = "secs", type = float, default = 10, help = "Duration of the animation. Defaults to %(default).0f seconds.")
+	parser.add_argument("--fps", metavar = "rate", type = float, default = 25, help = "Frame rate of the animation. Defaults to %(default).0f.")
+	parser.add_argument("-f", "--force", action = "store_true", help = "Overwrite the output file if it already exists.")
+	parser.add_argument("outfile", metavar = "filename", type = str, help = "Output image filename; the format (PNG or PPM, or Y4M or PPM for animations) is determined by its extension.")
+	args = parser.parse_args(sys.argv[1:])
+
+	if (args.zoom_to is not None) and args.deep_zoom:
+		print("Deep zoom animations are not supported, the precise center cannot be interpolated.", file = sys.stderr)
+		sys.exit(1)
+
+	if (not args.force) and (args.outfile != "-") and os.path.exists(args.outfile):
+		print("Refusing to overwrite %s without --force." % (args.outfile), file = sys.stderr)
+		sys.exit(1)
+
+	auto_iterations = AdaptiveIterations(max_cap = args.max_iterations or 5000, min_iterations = min(args.max_iterations or 5000, 20)) if args.auto_iterations else None
+	supersampler = AdaptiveSupersampler(samples = args.antialias, budget = args.sample_budget) if (args.antialias is not None) else None
+	handler = CPUHandler(tile_size = args.tile_size, workers = args.workers, subdivide = args.subdivide, auto_iterations = auto_iterations, supersampler = supersampler)
+	if args.print_bookmark:
+		print(viewport_from_args(args).to_bookmark(), file = sys.stderr)
+	try:
+		if args.zoom_to is None:
+			image = handler.render(viewport_from_args(args), scene_params_from_args(args))
+			ImageWriter.write(args.outfile, image)
+		else:
+			renderer = AnimationRenderer(handler, animation_from_args(args), fps = args.fps)
+			if args.outfile == "-":
+				renderer.write(sys.stdout.buffer, video_format = "y4m")
+			else:
+				video_format = args.outfile.rsplit(".", 1)[-1].lower()
+				with open(args.outfile, "wb") as f:
+					renderer.write(f, video_format = video_format)
+	finally:
+		handler.close()
+	if args.print_statistics:
+		print(" ".join("%s=%s" % (key, value) for (key, value) in sorted(handler.statistics.items())), file = sys.stderr)
@@ -23,6 +23,8 @@
 import math
 
 class Vector2d(object):
+	__slots__ = ( "_x", "_y" )
+
 	def __init__(self, x, y):
 		self._x = x
 		self._y = y
@@ -36,49 +38,48 @@ class Vector2d(object):
 		return self._y
 
 	def length(self):
-		return math.sqrt((self.x ** 2) + (self.y ** 2))
+		return math.hypot(self._x, self._y)
 
 	def comp_div(self, other):
 		"""Component-wise division."""
-		return Vector2d(self.x / other.x, self.y / other.y)
+		return Vector2d(self._x / other.x, self._y / other.y)
 
 	def comp_mul(self, other):
 		"""Component-wise multiplication."""
-		return Vector2d(self.x * other.x, self.y * other.y)
+		return Vector2d(self._x * other.x, self._y * other.y)
 
 	def __mul__(self, scalar):
-		return Vector2d(self.x * scalar, self.y * scalar)
+		return Vector2d(self._x * scalar, self._y * scalar)
 
 	def __rmul__(self, scalar):
-		return self * scalar
+		return Vector2d(self._x * scalar, self._y * scalar)
 
 	def __truediv__(self, scalar):
-		divscalar = 1 / scalar
-		return self * (1 / scalar)
+		return Vector2d(self._x / scalar, self._y / scalar)
 
 	def __add__(self, other):
-		return Vector2d(self.x + other.x, self.y + other.y)
+		return Vector2d(self._x + other.x, self._y + other.y)
 
 	def __sub__(self, other):
-		return Vector2d(self.x - other.x, self.y - other.y)
+		return Vector2d(self._x - other.x, self._y - other.y)
 
 	def __neg__(self):
-		return Vector2d(-self.x, -self.y)
+		return Vector2d(-self._x, -self._y)
 
 	@staticmethod
 	def _almost_equal(x, y):
 		return abs(x - y) < 1e-6
 
 	def __eq__(self, other):
-		return self._almost_equal(self.x, other.x) and self._almost_equal(self.y, other.y)
+		return self._almost_equal(self._x, other.x) and self._almost_equal(self._y, other.y)
 
 	def __neq__(self, other):
 		return not (self == other)
 
 	def __iter__(self):
-		yield self.x
-		yield self.y
+		yield self._x
+		yield self._y
 
 	def __repr__(self):
-		return "(%.3f, %.3f)" % (self.x, self.y)
+		return "(%.3f, %.3f)" % (self._x, self._y)
 
@@ -19,25 +19,109 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
+import decimal
+import fractions
+import contextlib
+import numpy
 from .Vector2d import Vector2d
 
+@contextlib.contextmanager
+def _no_context():
+	yield
+
 class Viewport2d(object):
+	"""Maps between device (pixel) coordinates and logical coordinates.
+
+	The logical center and size are floats by default. If any of them is
+	given as decimal.Decimal or fractions.Fraction, the viewport works in
+	high precision mode instead: all of its logical values are kept in that
+	type and zooming and panning do not lose precision, so arbitrarily deep
+	zooms can be represented. Decimal arithmetic is performed with enough
+	digits for the current zoom depth. Compute engines work in floating
+	point and are given offsets relative to a precise reference point
+	instead, see offset_from() and relative_to()."""
+
+	# Significant digits beyond the zoom depth that decimal arithmetic keeps
+	_GUARD_DIGITS = 20
+
 	def __init__(self, device_width, device_height, logical_center_x = 0, logical_center_y = 0, logical_width = 1, logical_height = 1, keep_aspect_ratio = False):
 		assert(logical_width > 0)
 		assert(logical_height > 0)
+		self._number_type = self._detect_number_type(logical_center_x, logical_center_y, logical_width, logical_height)
+		self._device_size = Vector2d(device_width, device_height)
+		self._logical_center = Vector2d(self._convert(logical_center_x), self._convert(logical_center_y))
+		self._logical_size = Vector2d(self._convert(logical_width), self._convert(logical_height))
 		self._keep_aspect_ratio = keep_aspect_ratio
 		if self._keep_aspect_ratio:
-			logical_width = logical_width * device_width / device_height
-		self._device_size = Vector2d(device_width, device_height)
-		self._logical_center = Vector2d(logical_center_x, logical_center_y)
-		self._logical_size = Vector2d(logical_width, logical_height)
-		self.set_device_size(device_width, device_height)
+			with self._context():
+				self._logical_size = Vector2d(self._logical_size.x * device_width / device_height, self._logical_size.y)
+
+	@staticmethod
+	def _detect_number_type(*values):
+		number_types = set(type(value) for value in values if isinstance(value, (decimal.Decimal, fractions.Fraction)))
+		if len(number_types) > 1:
+			raise Exception("Cannot mix Decimal and Fraction values in one viewport.")
+		return number_types.pop() if (len(number_types) == 1) else float
+
+	def _convert(self, value):
+		"""Converts a value to the number type of the viewport. Floats are
+		taken by their shortest representation (i.e., 0.1 becomes exactly
+		one tenth), strings are parsed."""
+		if (self._number_type is float) or isinstance(value, self._number_type):
+			return value
+		if isinstance(value, float):
+			return self._number_type(repr(value))
+		if isinstance(value, fractions.Fraction):
+			with self._decimal_context():
+				return self._to_decimal(value)
+		return self._number_type(value)
+
+	def _precision(self):
+		"""Number of significant decimal digits that represent the logical
+		values of the viewport down to well below the size of a pixel, but at
+		least the digits the center is given with."""
+		def digits(value):
+			if not isinstance(value, decimal.Decimal):
+				return 0
+			return len("".join(str(digit) for digit in value.as_tuple().digits).rstrip("0"))
+
+		def exponent(value):
+			if value == 0:
+				return 0
+			if isinstance(value, fractions.Fraction):
+				return len(str(abs(value.numerator))) - len(str(value.denominator))
+			return decimal.Decimal(value).adjusted()
+		magnitude = max(exponent(self._logical_center.x), exponent(self._logical_center.y), 0)
+		depth = min(exponent(self._logical_size.x), exponent(self._logical_size.y))
+		return max(28, self._GUARD_DIGITS + magnitude - depth, digits(self._logical_center.x), digits(self._logical_center.y))
+
+	def _decimal_context(self):
+		context = decimal.getcontext().copy()
+		context.prec = self._precision()
+		return decimal.localcontext(context)
+
+	def _context(self):
+		"""Context manager for arithmetic on the logical values; sets the
+		decimal precision in decimal mode."""
+		if self._number_type is not decimal.Decimal:
+			return _no_context()
+		return self._decimal_context()
 
 	def clone(self):
-		return Viewport2d(device_width = self.device_size.x, device_height = self.device_size.y,
+		# The logical width already includes the aspect ratio
+		clone = Viewport2d(device_width = self.device_size.x, device_height = self.device_size.y,
 				logical_center_x = self.logical_center.x, logical_center_y = self.logical_center.y,
-				logical_width = self.logical_size.x, logical_height = self.logical_size.y,
-				keep_aspect_ratio = self._keep_aspect_ratio)
+				logical_width = self.logical_size.x, logical_height = self.logical_size.y)
+		clone._keep_aspect_ratio = self._keep_aspect_ratio
+		return clone
+
+	@property
+	def high_precision(self):
+		return self._number_type is not float
+
+	@property
+	def number_type(self):
+		return self._number_type
 
 	@property
 	def device_size(self):
@@ -53,28 +137,37 @@ class Viewport2d(object):
 
 	@property
 	def logical_lower(self):
-		return self.logical_center - (self.logical_size / 2)
+		with self._context():
+			return self.logical_center - (self.logical_size / 2)
 
 	@property
 	def logical_upper(self):
-		return self.logical_center + (self.logical_size / 2)
+		with self._context():
+			return self.logical_center + (self.logical_size / 2)
 
 	def zoom_in(self, scalar):
-		self._logical_size = self.logical_size / scalar
+		with self._context():
+			self._logical_size = self.logical_size / self._convert(scalar)
+
+	def _reciprocal(self, scalar):
+		with self._context():
+			return 1 / self._convert(scalar)
 
 	def zoom_out(self, scalar):
-		return self.zoom_in(1 / scalar)
+		return self.zoom_in(self._reciprocal(scalar))
 
 	def move_device_point_to_logical(self, device_x, device_y, logical_x, logical_y):
 		"""Move the logical center so that the given device coordinates map to
 		the given logical coordinates."""
 		current_logical = self.device_to_logical(device_x, device_y)
-		translation = Vector2d(logical_x, logical_y) - current_logical
-		self._logical_center = self._logical_center + translation
+		with self._context():
+			translation = Vector2d(self._convert(logical_x), self._convert(logical_y)) - current_logical
+			self._logical_center = self._logical_center + translation
 
 	def move_relative_device(self, device_x, device_y):
-		ratio = self.device_size.comp_div(self.logical_size)
-		self._logical_center += Vector2d(device_x, device_y).comp_div(ratio)
+		with self._context():
+			ratio = self.device_size.comp_div(self.logical_size)
+			self._logical_center += Vector2d(self._convert(device_x), self._convert(device_y)).comp_div(ratio)
 
 	def zoom_in_around_device(self, scalar, device_x, device_y):
 		logical = self.device_to_logical(device_x, device_y)
@@ -82,7 +175,7 @@ class Viewport2d(object):
 		self.move_device_point_to_logical(device_x, device_y, logical.x, logical.y)
 
 	def zoom_out_around_device(self, scalar, device_x, device_y):
-		return self.zoom_in_around_device(1 / scalar, device_x, device_y)
+		return self.zoom_in_around_device(self._reciprocal(scalar), device_x, device_y)
 
 	def zoom_in_around_logical(self, scalar, logical_x, logical_y):
 		device = self.logical_to_device(logical_x, logical_y)
@@ -90,29 +183,197 @@ class Viewport2d(object):
 		self.move_device_point_to_logical(device.x, device.y, logical_x, logical_y)
 
 	def zoom_out_around_logical(self, scalar, logical_x, logical_y):
-		return self.zoom_in_around_logical(1 / scalar, logical_x, logical_y)
+		return self.zoom_in_around_logical(self._reciprocal(scalar), logical_x, logical_y)
+
+	def _precise_device_to_logical(self, device_x, device_y):
+		(center, size, device_size) = (self._logical_center, self._logical_size, self._device_size)
+		half = self._number_type("0.5")
+		with self._context():
+			(device_x, device_y) = (self._convert(device_x), self._convert(device_y))
+			return Vector2d(center.x + size.x * ((device_x / device_size.x) - half), center.y + size.y * ((device_y / device_size.y) - half))
+
+	def _precise_logical_to_device(self, logical_x, logical_y):
+		(center, size, device_size) = (self._logical_center, self._logical_size, self._device_size)
+		half = self._number_type("0.5")
+		with self._context():
+			(logical_x, logical_y) = (self._convert(logical_x), self._convert(logical_y))
+			return Vector2d((((logical_x - center.x) / size.x) + half) * device_size.x, (((logical_y - center.y) / size.y) + half) * device_size.y)
 
 	def device_to_logical(self, device_x, device_y):
-		device = Vector2d(device_x, device_y)
-		ratio = device.comp_div(self.device_size)
-		return self.logical_lower + ratio.comp_mul(self.logical_size)
+		if self._number_type is not float:
+			return self._precise_device_to_logical(device_x, device_y)
+		(center, size, device_size) = (self._logical_center, self._logical_size, self._device_size)
+		return Vector2d(center.x + size.x * ((device_x / device_size.x) - 0.5), center.y + size.y * ((device_y / device_size.y) - 0.5))
 
 	def logical_to_device(self, logical_x, logical_y):
-		logical = Vector2d(logical_x, logical_y)
-		ratio = (logical - self.logical_lower).comp_div(self.logical_size)
-		return ratio.comp_mul(self.device_size)
+		if self._number_type is not float:
+			return self._precise_logical_to_device(logical_x, logical_y)
+		(center, size, device_size) = (self._logical_center, self._logical_size, self._device_size)
+		return Vector2d((((logical_x - center.x) / size.x) + 0.5) * device_size.x, (((logical_y - center.y) / size.y) + 0.5) * device_size.y)
+
+	@staticmethod
+	def _float(vector):
+		return Vector2d(float(vector.x), float(vector.y))
+
+	def device_to_logical_array(self, device_x, device_y):
+		"""Like device_to_logical(), but maps whole arrays of device
+		coordinates (which are broadcast against each other) at once. Returns
+		a tuple of the logical x and y arrays. Arrays are always computed in
+		floating point, also in high precision mode."""
+		(center, size, device_size) = (self._float(self._logical_center), self._float(self._logical_size), self._device_size)
+		logical_x = center.x + size.x * ((numpy.asarray(device_x) / device_size.x) - 0.5)
+		logical_y = center.y + size.y * ((numpy.asarray(device_y) / device_size.y) - 0.5)
+		return (logical_x, logical_y)
+
+	def logical_to_device_array(self, logical_x, logical_y):
+		"""Inverse of device_to_logical_array()."""
+		(center, size, device_size) = (self._float(self._logical_center), self._float(self._logical_size), self._device_size)
+		device_x = (((numpy.asarray(logical_x) - center.x) / size.x) + 0.5) * device_size.x
+		device_y = (((numpy.asarray(logical_y) - center.y) / size.y) + 0.5) * device_size.y
+		return (device_x, device_y)
+
+	def pixel_center_offsets(self, x, y, width = None, height = None):
+		"""Returns a tuple of arrays holding the logical offset of the pixel
+		centers at the image coordinates x and y (broadcast against each
+		other) relative to the logical center, for an image of the given
+		resolution which defaults to the device size. Unlike device
+		coordinates, image row 0 is the top, i.e., the largest logical y
+		value, which is how image files are laid out."""
+		width = self._device_size.x if (width is None) else width
+		height = self._device_size.y if (height is None) else height
+		size = self._float(self._logical_size)
+		offset_x = size.x * (((numpy.asarray(x) + 0.5) / width) - 0.5)
+		offset_y = size.y * (0.5 - ((numpy.asarray(y) + 0.5) / height))
+		return (offset_x, offset_y)
+
+	def pixel_centers(self, width = None, height = None):
+		"""Returns a tuple of the logical x and y coordinates of all pixel
+		centers of an image of the given resolution (defaulting to the device
+		size) as arrays of shape (height, width), in image layout."""
+		width = round(self._device_size.x) if (width is None) else width
+		height = round(self._device_size.y) if (height is None) else height
+		(offset_x, offset_y) = self.pixel_center_offsets(numpy.arange(width)[numpy.newaxis, :], numpy.arange(height)[:, numpy.newaxis], width, height)
+		(offset_x, offset_y) = numpy.broadcast_arrays(offset_x, offset_y)
+		center = self._float(self._logical_center)
+		return (offset_x + center.x, offset_y + center.y)
+
+	def pan_offset(self, previous_center_x, previous_center_y, width = None, height = None, tolerance = 1e-3):
+		"""Returns the whole number of pixels (x, y) in device coordinates by
+		which the content moved since the logical center was at the given
+		previous one, for a frame of the given resolution (defaulting to the
+		device size): pixel (x, y) now shows what was at (x + shift_x, y +
+		shift_y) before. Previous frames can then be reused by shifting them.
+		Returns None if the offset is not within tolerance of a whole number
+		of pixels or if no pixel of the previous frame remains visible."""
+		width = self._device_size.x if (width is None) else width
+		height = self._device_size.y if (height is None) else height
+		offset = self.offset_from(previous_center_x, previous_center_y)
+		size = self._float(self._logical_size)
+		shift_x = offset.x * width / size.x
+		shift_y = offset.y * height / size.y
+		(int_shift_x, int_shift_y) = (round(shift_x), round(shift_y))
+		if (abs(shift_x - int_shift_x) > tolerance) or (abs(shift_y - int_shift_y) > tolerance):
+			return None
+		if (abs(int_shift_x) >= width) or (abs(int_shift_y) >= height):
+			return None
+		return (int_shift_x, int_shift_y)
 
 	def set_device_size(self, device_width, device_height):
 		assert(device_width > 0)
 		assert(device_height > 0)
-		width_scale = device_width / self._device_size.x
-		height_scale = device_height / self._device_size.y
-		self._device_size = Vector2d(device_width, device_height)
-		if self._keep_aspect_ratio:
-			self._logical_size = Vector2d(self._logical_size.x * width_scale, self._logical_size.y * height_scale)
+		with self._context():
+			width_scale = self._convert(device_width) / self._convert(self._device_size.x)
+			height_scale = self._convert(device_height) / self._convert(self._device_size.y)
+			self._device_size = Vector2d(device_width, device_height)
+			if self._keep_aspect_ratio:
+				self._logical_size = Vector2d(self._logical_size.x * width_scale, self._logical_size.y * height_scale)
 
 	def set_logical_center(self, logical_x, logical_y):
-		self._logical_center = Vector2d(logical_x, logical_y)
+		self._logical_center = Vector2d(self._convert(logical_x), self._convert(logical_y))
+
+	def offset_from(self, reference_x, reference_y):
+		"""Returns the logical center relative to the given reference point
+		(e.g., the center a reference orbit was computed for) as a Vector2d of
+		floats. The difference is computed exactly before it is rounded, so
+		it is accurate even when the coordinates themselves are not
+		representable as floats."""
+		with self._context():
+			return self._float(Vector2d(self._convert(self._logical_center.x) - self._convert(reference_x), self._convert(self._logical_center.y) - self._convert(reference_y)))
+
+	def relative_to(self, reference_x, reference_y):
+		"""Returns a floating point viewport of the same device and logical
+		size whose logical origin is moved to the given reference point, i.e.,
+		whose logical coordinates are offsets to it."""
+		offset = self.offset_from(reference_x, reference_y)
+		size = self._float(self._logical_size)
+		viewport = Viewport2d(device_width = self._device_size.x, device_height = self._device_size.y, logical_center_x = offset.x, logical_center_y = offset.y, logical_width = size.x, logical_height = size.y)
+		viewport._keep_aspect_ratio = self._keep_aspect_ratio
+		return viewport
+
+	def to_float(self):
+		"""Returns the viewport with all values rounded to floats."""
+		return self.relative_to(0, 0)
+
+	def decimal_center(self):
+		"""Returns the logical center as a tuple of decimal.Decimal values,
+		with as many digits as the zoom depth requires."""
+		with self._decimal_context():
+			return tuple(self._to_decimal(value) for value in self._logical_center)
+
+	@staticmethod
+	def _to_decimal(value):
+		if isinstance(value, float):
+			return decimal.Decimal(repr(value))
+		if isinstance(value, fractions.Fraction):
+			return decimal.Decimal(value.numerator) / decimal.Decimal(value.denominator)
+		return decimal.Decimal(value)
+
+	_BOOKMARK_PREFIXES = {
+		float:				"",
+		decimal.Decimal:	"d:",
+		fractions.Fraction:	"f:",
+	}
+
+	@staticmethod
+	def _float_text(value):
+		# Shortest representation that parses to the identical float
+		text = repr(float(value))
+		return text[:-2] if text.endswith(".0") else text
+
+	def to_bookmark(self):
+		"""Serializes the location to a compact string from which
+		from_bookmark() restores the identical viewport, including all digits
+		in high precision mode. It consists of the center, the logical size
+		and the device size, e.g., "d:-0.74364,0.13182,4E-5,3E-5,1024x768"."""
+		values = list(self._logical_center) + list(self._logical_size)
+		if self._number_type is decimal.Decimal:
+			# Drops the trailing zeros of decimal arithmetic
+			with self._decimal_context():
+				values = [ value.normalize() for value in values ]
+		text = ",".join(self._float_text(value) if (self._number_type is float) else str(value) for value in values)
+		text = "%s%s,%dx%d" % (self._BOOKMARK_PREFIXES[self._number_type], text, self._device_size.x, self._device_size.y)
+		if self._keep_aspect_ratio:
+			text += ",k"
+		return text
+
+	@classmethod
+	def from_bookmark(cls, text):
+		"""Restores a viewport serialized by to_bookmark()."""
+		number_type = float
+		for (prefix_type, prefix) in cls._BOOKMARK_PREFIXES.items():
+			if (prefix != "") and text.startswith(prefix):
+				(number_type, text) = (prefix_type, text[len(prefix):])
+		fields = text.strip().split(",")
+		keep_aspect_ratio = (fields[-1] == "k")
+		if keep_aspect_ratio:
+			fields = fields[:-1]
+		if len(fields) != 5:
+			raise ValueError("Invalid viewport bookmark: %s" % (text))
+		(center_x, center_y, width, height) = (number_type(value) for value in fields[:4])
+		(device_width, device_height) = (int(value) for value in fields[4].lower().split("x"))
+		viewport = cls(device_width = device_width, device_height = device_height, logical_center_x = center_x, logical_center_y = center_y, logical_width = width, logical_height = height)
+		viewport._keep_aspect_ratio = keep_aspect_ratio
+		return viewport
 
 	def __str__(self):
 		return "%s - %s onto device %s" % (self.logical_lower, self.logical_upper, self.device_size)
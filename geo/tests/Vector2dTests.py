@@ -73,3 +73,9 @@ class Vector2dTests(unittest.TestCase):
 		self.assertNotEqual(Vector2d(99, 3), Vector2d(99, 3.1))
 		self.assertNotEqual(Vector2d(99, 3), Vector2d(99.1, 3))
 
+
+	def test_slots(self):
+		v = Vector2d(1, 2)
+		with self.assertRaises(AttributeError):
+			v.z = 3
+		self.assertFalse(hasattr(v, "__dict__"))
@@ -21,6 +21,9 @@
 
 import unittest
 import random
+import decimal
+import fractions
+import numpy
 from .. import Viewport2d, Vector2d
 
 class Viewport2dTests(unittest.TestCase):
@@ -149,3 +152,102 @@ class Viewport2dTests(unittest.TestCase):
 		self.assertEqual(zoom_ctr_logical_before, zoom_ctr_logical_after)
 
 
+
+	def test_array_transforms(self):
+		v = Viewport2d(device_width = 640, device_height = 480, logical_center_x = 3, logical_center_y = 5, logical_width = 7, logical_height = 11)
+		device_x = numpy.array([ 0, 123, 320, 640 ])
+		device_y = numpy.array([ 0, 456, 240, 480 ])
+		(logical_x, logical_y) = v.device_to_logical_array(device_x, device_y)
+		for (dx, dy, lx, ly) in zip(device_x, device_y, logical_x, logical_y):
+			self.assertEqual(v.device_to_logical(dx, dy), Vector2d(lx, ly))
+		(back_x, back_y) = v.logical_to_device_array(logical_x, logical_y)
+		self.assertTrue(numpy.allclose(back_x, device_x))
+		self.assertTrue(numpy.allclose(back_y, device_y))
+
+	def test_pixel_centers(self):
+		v = Viewport2d(device_width = 4, device_height = 2, logical_center_x = 1, logical_center_y = -1, logical_width = 8, logical_height = 2)
+		(x, y) = v.pixel_centers()
+		self.assertEqual(x.shape, (2, 4))
+		self.assertEqual(x[0].tolist(), [ -2, 0, 2, 4 ])
+		self.assertEqual(y[:, 0].tolist(), [ -0.5, -1.5 ])
+
+		# At another resolution, the same logical area is covered more finely
+		(x, y) = v.pixel_centers(8, 4)
+		self.assertEqual(x.shape, (4, 8))
+		self.assertAlmostEqual(x[0, 0], -2.5)
+		self.assertAlmostEqual(y[0, 0], -0.25)
+		self.assertEqual(tuple(v.pixel_center_offsets(0, 0)), (-3, 0.5))
+
+	def test_high_precision_zoom(self):
+		center = (decimal.Decimal("-0.743643887037158704752191506114774"), decimal.Decimal("0.131825904205311970493132056385139"))
+		v = Viewport2d(device_width = 640, device_height = 480, logical_center_x = center[0], logical_center_y = center[1], logical_width = decimal.Decimal(3), logical_height = decimal.Decimal(3), keep_aspect_ratio = True)
+		self.assertTrue(v.high_precision)
+		for i in range(120):
+			v.zoom_in_around_device(2, 320, 240)
+		self.assertEqual(tuple(v.logical_center), center)
+		self.assertEqual(v.logical_size.y * (2 ** 120), 3)
+
+		# Panning far below float resolution is exact and reversible
+		v.move_relative_device(17, -3)
+		offset = v.offset_from(*center)
+		self.assertAlmostEqual(offset.x / float(v.logical_size.x), 17 / 640)
+		self.assertAlmostEqual(offset.y / float(v.logical_size.y), -3 / 480)
+		v.move_relative_device(-17, 3)
+		self.assertEqual(tuple(v.logical_center), center)
+		self.assertEqual(tuple(v.relative_to(*center).logical_center), (0, 0))
+
+		v = Viewport2d(device_width = 640, device_height = 480, logical_center_x = fractions.Fraction(-3, 4), logical_width = fractions.Fraction(3), logical_height = 3)
+		self.assertIs(v.number_type, fractions.Fraction)
+		v.zoom_in_around_logical(10, fractions.Fraction(-1, 3), 0)
+		self.assertEqual(v.device_to_logical(*v.logical_to_device(fractions.Fraction(-1, 3), 0)), Vector2d(fractions.Fraction(-1, 3), 0))
+		self.assertEqual(v.logical_to_device(fractions.Fraction(-1, 3), 0).x, fractions.Fraction(640 * 5, 36) + 320)
+
+	def test_bookmark(self):
+		v = Viewport2d(device_width = 640, device_height = 480, logical_center_x = decimal.Decimal("-1.7499"), logical_center_y = decimal.Decimal("1E-3"), logical_width = decimal.Decimal(3), logical_height = decimal.Decimal(3), keep_aspect_ratio = True)
+		for i in range(80):
+			v.zoom_in_around_device(3, 100, 400)
+		for viewport in [ v, Viewport2d(device_width = 64, device_height = 48, logical_center_x = fractions.Fraction(-1, 3), logical_width = 2, logical_height = 2), Viewport2d(device_width = 64, device_height = 48, logical_center_x = 0.1, logical_width = 2.5, logical_height = 2) ]:
+			bookmark = viewport.to_bookmark()
+			restored = Viewport2d.from_bookmark(bookmark)
+			self.assertIs(restored.number_type, viewport.number_type)
+			self.assertEqual(tuple(restored.logical_center), tuple(viewport.logical_center))
+			self.assertEqual(tuple(restored.logical_size), tuple(viewport.logical_size))
+			self.assertEqual(tuple(restored.device_size), tuple(viewport.device_size))
+			self.assertEqual(restored.to_bookmark(), bookmark)
+		self.assertEqual(Viewport2d(device_width = 64, device_height = 48, logical_center_x = 0.1, logical_width = 2.5, logical_height = 2).to_bookmark(), "0.1,0,2.5,2,64x48")
+
+		# Resizing keeps the aspect ratio after restoring
+		restored = Viewport2d.from_bookmark(v.to_bookmark())
+		restored.set_device_size(320, 480)
+		self.assertAlmostEqual(float(restored.logical_size.x / restored.logical_size.y), 2 / 3)
+		self.assertRaises(ValueError, Viewport2d.from_bookmark, "1,2,3")
+
+	def test_clone_keep_aspect_ratio(self):
+		v = Viewport2d(device_width = 640, device_height = 480, logical_width = 3, logical_height = 3, keep_aspect_ratio = True)
+		self.assertAlmostEqual(v.clone().logical_size.x, 4)
+
+	def test_pan_offset(self):
+		v = Viewport2d(device_width = 64, device_height = 48, logical_center_x = -0.5, logical_width = 3, logical_height = 3)
+		self.assertEqual(v.pan_offset(-0.5, 0), (0, 0))
+		v.move_relative_device(5, -3)
+		self.assertEqual(v.pan_offset(-0.5, 0), (5, -3))
+
+		# Pixel (x, y) now shows what was at (x + 5, y - 3) before
+		previous = Viewport2d(device_width = 64, device_height = 48, logical_center_x = -0.5, logical_width = 3, logical_height = 3)
+		for (now, before) in zip(v.device_to_logical(10, 10), previous.device_to_logical(15, 7)):
+			self.assertAlmostEqual(now, before)
+
+		# Offsets are given for the requested resolution
+		self.assertEqual(v.pan_offset(-0.5, 0, width = 128, height = 96), (10, -6))
+
+		# Fractional pixel offsets and offsets leaving nothing visible
+		self.assertIsNone(v.pan_offset(-0.5 + 0.5 * 3 / 64, 0))
+		self.assertIsNone(v.pan_offset(-0.5 - 64 * 3 / 64, 0))
+		self.assertIsNone(v.pan_offset(-0.5, 48 * 3 / 48))
+
+		# High precision offsets are exact even far below float resolution
+		center = (decimal.Decimal("-0.743643887037158704752191506114774"), decimal.Decimal("0.131825904205311970493132056385139"))
+		v = Viewport2d(device_width = 64, device_height = 48, logical_center_x = center[0], logical_center_y = center[1], logical_width = decimal.Decimal(3), logical_height = decimal.Decimal(3))
+		v.zoom_in(2 ** 100)
+		v.move_relative_device(-7, 2)
+		self.assertEqual(v.pan_offset(*center), (-7, 2))
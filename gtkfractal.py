@@ -20,14 +20,16 @@
 #
 #       Johannes Bauer <JohannesBauer@gmx.de>
 
+import os
 import gi
 gi.require_version("Gtk", "3.0")
 gi.require_version("GtkSource", "3.0")
 
-from gi.repository import Gtk, GtkSource
+from gi.repository import Gtk, GtkSource, GLib
 from GLHandler import GLHandler
 from NewtonSolver import Polynomial
-from AdvancedColorPalette import AdvancedColorPalette
+from PaletteRegistry import PaletteRegistry
+from AdaptiveIterations import AdaptiveIterations
 
 class FractalGTKApplication(object):
 	def __init__(self):
@@ -35,11 +37,16 @@ class FractalGTKApplication(object):
 		self._builder.add_from_file("gpufractal.glade")
 		self._builder.connect_signals(self)
 		self._palette_filename = "palettes.json"
+		self._palette_registry = PaletteRegistry()
 		self._populate_palette_combobox()
-		self._gl_handler = GLHandler()
+		self._gl_handler = GLHandler(program_binary_cache_directory = os.path.expanduser("~/.cache/pygpufractal/programs"), palette_registry = self._palette_registry)
+		self._interactive = False
+		self._refine_timeout = None
+		self._refine_delay_millis = 250
+		self._auto_iterations = AdaptiveIterations()
 
 	def _populate_palette_combobox(self):
-		schemata = AdvancedColorPalette.get_schema_from_json(self._palette_filename)
+		schemata = self._palette_registry.schemata(self._palette_filename)
 		liststore = self._builder.get_object("color_schemata_liststore")
 		for schema in schemata:
 			liststore.append((schema, ))
@@ -49,8 +56,20 @@ class FractalGTKApplication(object):
 		Gtk.main_quit()
 
 	def on_option_change_value(self, *args):
+		# Render interactively while parameters are changing, then refine to
+		# full resolution once input has been idle for a little while
+		self._interactive = True
+		if self._refine_timeout is not None:
+			GLib.source_remove(self._refine_timeout)
+		self._refine_timeout = GLib.timeout_add(self._refine_delay_millis, self._on_refine_timeout)
 		self._builder.get_object("gl_area").queue_render()
 
+	def _on_refine_timeout(self):
+		self._refine_timeout = None
+		self._interactive = False
+		self._builder.get_object("gl_area").queue_render()
+		return False
+
 	def on_gl_area_resize(self, widget, width, height):
 		self._gl_handler.resize(width, height)
 
@@ -59,6 +78,10 @@ class FractalGTKApplication(object):
 		if error is not None:
 			print("Error realizing GL window: %s" % (error))
 
+	def on_gl_area_unrealize(self, widget):
+		widget.make_current()
+		self._gl_handler.release()
+
 	def on_gl_area_render(self, widget, glctx):
 		liststore = self._builder.get_object("color_schemata_liststore")
 		color_scheme = liststore[self._builder.get_object("color_scheme_combobox").get_active()][0]
@@ -95,7 +118,27 @@ class FractalGTKApplication(object):
 				"julia_coeff":				complex(0.5, 0.25),
 			})
 
-		self._gl_handler.render(glctx, scene_params)
+		self._gl_handler.set_dynamic_resolution(self._builder.get_object("dynamic_resolution_checkbutton").get_active(), frame_time_budget = self._builder.get_object("frame_time_budget_scale").get_value() / 1000)
+		self._gl_handler.set_iteration_histogram(self._builder.get_object("iteration_histogram_checkbutton").get_active())
+		if self._builder.get_object("auto_iterations_checkbutton").get_active():
+			# The slider's value is the cap then
+			self._auto_iterations.max_cap = max(scene_params["properties"]["max_iterations"], self._auto_iterations.min_iterations)
+			self._gl_handler.set_auto_iterations(self._auto_iterations)
+		else:
+			self._gl_handler.set_auto_iterations(None)
+		self._gl_handler.render(glctx, scene_params, interactive = self._interactive)
+		self._update_frame_statistics()
+
+	def _update_frame_statistics(self):
+		if not self._builder.get_object("options_window").get_visible():
+			return
+		text = self._gl_handler.statistics.format()
+		histogram = self._gl_handler.iteration_histogram
+		if histogram is not None:
+			text += "\nNot escaped: %.1f%%" % (histogram["unescaped"] * 100)
+			if histogram["escaped_p95"] is not None:
+				text += "\nEscaped p95: %.0f iterations" % (histogram["escaped_p95"])
+		self._builder.get_object("frame_statistics_label").set_text(text)
 
 	def on_gl_area_drag_motion(self, widget, *args):
 		print(args)
@@ -118,6 +161,9 @@ class FractalGTKApplication(object):
 	def on_cutoff_scale_format_value(self, widget, value):
 		return "10 ^ %.2f" % (value)
 
+	def on_frame_time_budget_scale_format_value(self, widget, value):
+		return "%.0f ms" % (value)
+
 	def run(self):
 		main_window = self._builder.get_object("main_window")
 		main_window.show_all()
@@ -0,0 +1,95 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from geo import Viewport2d
+from AdaptiveIterations import AdaptiveIterations
+from FrameStatistics import iteration_histogram
+from CPUHandler import CPUHandler
+
+class AdaptiveIterationsTests(unittest.TestCase):
+	def _viewport(self, size, center_x = -0.5, center_y = 0):
+		return Viewport2d(device_width = 32, device_height = 24, logical_center_x = center_x, logical_center_y = center_y, logical_width = size, logical_height = size, keep_aspect_ratio = True)
+
+	def test_zoom_depth(self):
+		auto = AdaptiveIterations(max_cap = 1000, base_iterations = 40, per_decade = 100)
+		self.assertEqual(auto.limit(self._viewport(3)), 40)
+		self.assertEqual(auto.limit(self._viewport(10)), 40)
+		self.assertEqual(auto.limit(self._viewport(3e-3)), 340)
+		self.assertEqual(auto.limit(self._viewport(3e-12)), 1000)
+
+	def test_feedback(self):
+		auto = AdaptiveIterations(max_cap = 1000)
+		viewport = self._viewport(3e-3)
+		limit = auto.limit(viewport)
+
+		# Many pixels which escape just below the limit raise it
+		iterations = numpy.full(1000, limit)
+		iterations[:10] = limit - 1
+		self.assertTrue(auto.feedback_iterations(iterations, limit))
+		self.assertGreater(auto.limit(viewport), limit)
+
+		# Escaped pixels far below the limit lower it
+		limit = auto.limit(viewport)
+		iterations = numpy.full(1000, limit)
+		iterations[:500] = 10
+		self.assertTrue(auto.feedback_iterations(iterations, limit))
+		self.assertLess(auto.limit(viewport), limit)
+
+		# In between, the limit stays
+		limit = auto.limit(viewport)
+		iterations[0] = round(limit * 0.85)
+		self.assertFalse(auto.feedback_iterations(iterations, limit))
+
+		# At the cap, the scale is not raised any further
+		auto.reset()
+		iterations = numpy.full(1000, 999)
+		self.assertFalse(auto.feedback_iterations(iterations, 1000))
+
+	def test_late_range(self):
+		# Only pixels in the top 30% count as late here, so a histogram with
+		# the default range would not raise the limit
+		iterations = numpy.full(1000, 100)
+		iterations[:10] = 75
+		auto = AdaptiveIterations(late_range = 0.3)
+		self.assertEqual(auto.late_range, 0.3)
+		self.assertTrue(auto.feedback_histogram(iteration_histogram(iterations, 100, late_range = auto.late_range), 100))
+		self.assertFalse(AdaptiveIterations(late_range = 0.3).feedback_histogram(iteration_histogram(iterations, 100), 100))
+		auto = AdaptiveIterations(late_range = 0.3)
+		self.assertTrue(auto.feedback_iterations(iterations, 100))
+
+	def test_cpu_handler(self):
+		scene_params = {
+			"color_scheme_filename":	"palettes.json",
+			"color_scheme":				"flatui",
+			"type":						"mandelbrot",
+			"properties":				{ "max_iterations": 10 },
+		}
+		handler = CPUHandler(auto_iterations = AdaptiveIterations(max_cap = 2000, per_decade = 0))
+		viewport = self._viewport(0.005, center_x = -0.7436, center_y = 0.1318)
+		limits = [ ]
+		for frame in range(8):
+			handler.render(viewport, scene_params)
+			limits.append(handler.engine.get_property("max_iterations"))
+		self.assertEqual(limits[0], 40)
+		self.assertGreater(limits[-1], limits[0])
+		self.assertEqual(limits, sorted(limits))
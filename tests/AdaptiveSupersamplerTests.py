@@ -0,0 +1,92 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from geo import Viewport2d
+from AdvancedColorPalette import AdvancedColorPalette
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from NewtonCPUEngine import NewtonCPUEngine
+from AdaptiveSupersampler import AdaptiveSupersampler
+from CPUHandler import CPUHandler
+
+class AdaptiveSupersamplerTests(unittest.TestCase):
+	def setUp(self):
+		self._palette = AdvancedColorPalette.load_from_json("palettes.json", "flatui")
+
+	def _viewport(self, width, height):
+		return Viewport2d(device_width = width, device_height = height, logical_center_x = -0.5, logical_width = 3, logical_height = 3, keep_aspect_ratio = True)
+
+	def test_approaches_supersampling(self):
+		for engine in [ MandelbrotJuliaCPUEngine(), NewtonCPUEngine() ]:
+			engine.set_property("max_iterations", 60)
+			base = engine.render(self._viewport(48, 36), self._palette).astype(float)
+			supersampler = AdaptiveSupersampler(samples = 16, budget = 16)
+			image = supersampler.render(engine, self._viewport(48, 36), self._palette).astype(float)
+
+			# Reference: 4x4 supersampling of every pixel
+			reference = engine.render(self._viewport(192, 144), self._palette).astype(float).reshape(36, 4, 48, 4, 3).mean(axis = (1, 3))
+			self.assertLess(numpy.abs(image - reference).mean(), 0.6 * numpy.abs(base - reference).mean())
+			self.assertGreater(supersampler.statistics["supersampled"], 0)
+			self.assertLess(supersampler.statistics["supersampled"], 48 * 36 / 2)
+
+	def test_budget(self):
+		engine = MandelbrotJuliaCPUEngine()
+		supersampler = AdaptiveSupersampler(samples = 8, budget = 0.5)
+		supersampler.render(engine, self._viewport(40, 30), self._palette)
+		self.assertGreater(supersampler.statistics["edge_pixels"], supersampler.statistics["supersampled"])
+		self.assertEqual(supersampler.statistics["supersampled"], (40 * 30 // 2) // 8)
+		self.assertLessEqual(supersampler.statistics["samples"], 0.5 * 40 * 30)
+
+	def test_uniform_image(self):
+		engine = MandelbrotJuliaCPUEngine()
+		viewport = Viewport2d(device_width = 8, device_height = 6, logical_width = 0.01, logical_height = 0.01)
+		image = engine.render(viewport, self._palette)
+		supersampler = AdaptiveSupersampler()
+		self.assertIs(supersampler.refine(engine, viewport, engine.compute(viewport), image, engine.create_lut(self._palette)), image)
+		self.assertEqual(supersampler.statistics["samples"], 0)
+
+	def test_jitter(self):
+		(dx, dy) = AdaptiveSupersampler(samples = 4).jitter(100)
+		self.assertEqual(dx.shape, (100, 4))
+		self.assertTrue(numpy.all((dx >= -0.5) & (dx < 0.5) & (dy >= -0.5) & (dy < 0.5)))
+
+		# Stratified: every sample of a pixel lies in a different quadrant
+		quadrants = (dx >= 0).astype(int) + 2 * (dy >= 0).astype(int)
+		self.assertTrue(all(len(set(row)) == 4 for row in quadrants))
+
+		# With fewer samples than cells, they still lie in distinct cells
+		(dx, dy) = AdaptiveSupersampler(samples = 5).jitter(100)
+		cells = numpy.floor((dx + 0.5) * 3).astype(int) + 3 * numpy.floor((dy + 0.5) * 3).astype(int)
+		self.assertTrue(all(len(set(row)) == 5 for row in cells))
+
+	def test_cpu_handler(self):
+		scene_params = {
+			"color_scheme_filename":	"palettes.json",
+			"color_scheme":				"flatui",
+			"type":						"mandelbrot",
+			"properties":				{ "max_iterations": 30 },
+		}
+		viewport = self._viewport(40, 30)
+		image = CPUHandler(supersampler = AdaptiveSupersampler(samples = 4)).render(viewport, scene_params)
+		engine = MandelbrotJuliaCPUEngine()
+		engine.set_property("max_iterations", 30)
+		self.assertTrue(numpy.array_equal(image, AdaptiveSupersampler(samples = 4).render(engine, viewport, self._palette)))
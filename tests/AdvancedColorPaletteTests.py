@@ -0,0 +1,56 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from AdvancedColorPalette import AdvancedColorPalette
+
+class AdvancedColorPaletteTests(unittest.TestCase):
+	def setUp(self):
+		self._palette = AdvancedColorPalette([ { "rgb": "#000000", "pos": 0 }, { "rgb": "#ff8000", "pos": 1 }, { "rgb": "#20ff40", "pos": 3 }, { "rgb": "#ffffff", "pos": 4 } ])
+
+	def test_sample(self):
+		positions = numpy.concatenate((numpy.linspace(-0.5, 1.5, 1001), [ 0, 0.25, 0.75, 1 ]))
+		colors = self._palette.sample(positions)
+		self.assertEqual(colors.dtype, numpy.uint8)
+		self.assertEqual(colors.shape, (1005, 3))
+		self.assertEqual([ tuple(color) for color in colors ], [ self._palette[pos] for pos in positions ])
+
+	def test_sample_shape(self):
+		positions = numpy.linspace(0, 1, 12).reshape(3, 4)
+		self.assertEqual(self._palette.sample(positions).shape, (3, 4, 3))
+		self.assertEqual(tuple(self._palette.sample(positions)[2, 3]), (255, 255, 255))
+
+	def test_lut(self):
+		lut = self._palette.lut(256)
+		self.assertIs(self._palette.lut(256), lut)
+		with self.assertRaises(ValueError):
+			lut[0] = 0
+		self.assertEqual(lut.shape, (256, 3))
+		self.assertEqual([ tuple(color) for color in lut ], [ self._palette[i / 255] for i in range(256) ])
+		self.assertEqual(self._palette.lut().shape, (4096, 3))
+
+	def test_lookup(self):
+		positions = numpy.linspace(0, 1, 5000)
+		colors = self._palette.lookup(positions, lut_size = 4096)
+		difference = numpy.abs(colors.astype(int) - self._palette.sample(positions).astype(int))
+		self.assertLessEqual(numpy.max(difference), 1)
+		self.assertEqual(tuple(self._palette.lookup(numpy.array([ -1, 2 ]))[1]), (255, 255, 255))
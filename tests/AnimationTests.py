@@ -0,0 +1,114 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import io
+import argparse
+import unittest
+import numpy
+from geo import Viewport2d
+from Animation import Animation, AnimationRenderer, FrameStreamWriter
+from CPUHandler import CPUHandler
+import cpufractal
+
+class AnimationTests(unittest.TestCase):
+	def _scene_params(self, **properties):
+		return {
+			"color_scheme_filename":	"palettes.json",
+			"color_scheme":				"flatui",
+			"type":						"mandelbrot",
+			"properties":				properties,
+		}
+
+	def _zoom(self):
+		animation = Animation()
+		animation.add_keyframe(0, Viewport2d(device_width = 16, device_height = 12, logical_center_x = -0.5, logical_width = 4, logical_height = 3), self._scene_params(max_iterations = 20, cutoff = 10.0))
+		animation.add_keyframe(2, Viewport2d(device_width = 16, device_height = 12, logical_center_x = -0.75, logical_center_y = 0.1, logical_width = 0.04, logical_height = 0.03), self._scene_params(max_iterations = 40, cutoff = 10.0))
+		return animation
+
+	def test_logarithmic_zoom(self):
+		animation = self._zoom()
+		(viewport, scene_params) = animation.at(1)
+		self.assertAlmostEqual(viewport.logical_size.x, 0.4)
+		self.assertAlmostEqual(viewport.logical_size.y, 0.3)
+		self.assertEqual(scene_params["properties"]["max_iterations"], 30)
+		self.assertEqual(scene_params["properties"]["cutoff"], 10.0)
+
+		# The fixed point of the zoom remains at the same device position
+		(first, last) = (animation.at(0)[0], animation.at(2)[0])
+		fixed = first.logical_center + (last.logical_center - first.logical_center) * (first.logical_size.y / (first.logical_size.y - last.logical_size.y))
+		for time in [ 0.3, 1, 1.7 ]:
+			viewport = animation.at(time)[0]
+			device = viewport.logical_to_device(fixed.x, fixed.y)
+			expected = first.logical_to_device(fixed.x, fixed.y)
+			self.assertAlmostEqual(device.x, expected.x)
+			self.assertAlmostEqual(device.y, expected.y)
+
+		# Outside of the keyframes, the closest one is held
+		self.assertEqual(tuple(animation.at(5)[0].logical_center), (-0.75, 0.1))
+
+	def test_frames(self):
+		animation = self._zoom()
+		self.assertEqual(len(list(animation.frame_times(10))), 21)
+		renderer = AnimationRenderer(CPUHandler(), animation, fps = 2)
+		images = list(renderer.frames())
+		self.assertEqual(len(images), renderer.frame_count)
+		self.assertEqual(len(images), 5)
+		self.assertTrue(numpy.array_equal(images[-1], CPUHandler().render(*animation.at(2))))
+
+	def test_animation_from_args(self):
+		# The bookmark's resolution applies to both keyframes, not --resolution
+		args = argparse.Namespace(palette_file = "palettes.json", palette = "flatui", type = "mandelbrot", deep_zoom = False, max_iterations = 20, cutoff = None, smooth = False, bookmark = "0,0,4,3,32x24", center = (0, 0), size = 3, resolution = (16, 16), zoom_to = (-0.5, 0.0, 1.0), duration = 0.2)
+		animation = cpufractal.animation_from_args(args)
+		self.assertEqual(tuple(animation.at(0)[0].device_size), (32, 24))
+		self.assertEqual(tuple(animation.at(0.2)[0].device_size), (32, 24))
+		f = io.BytesIO()
+		AnimationRenderer(CPUHandler(), animation, fps = 10).write(f, video_format = "y4m")
+		self.assertTrue(f.getvalue().startswith(b"YUV4MPEG2 W32 H24 "))
+
+	def test_frames_workers(self):
+		animation = self._zoom()
+		handler = CPUHandler(tile_size = 8, workers = 2)
+		images = list(AnimationRenderer(handler, animation, fps = 2).frames())
+		self.assertTrue(numpy.array_equal(images[-1], CPUHandler().render(*animation.at(2))))
+		# The worker processes end with the animation
+		self.assertIsNone(handler._tiled_renderer)
+
+	def test_y4m(self):
+		f = io.BytesIO()
+		self.assertEqual(AnimationRenderer(CPUHandler(), self._zoom(), fps = 2).write(f), 5)
+		header = b"YUV4MPEG2 W16 H12 F2:1 Ip A1:1 C444\n"
+		self.assertTrue(f.getvalue().startswith(header))
+		self.assertEqual(len(f.getvalue()), len(header) + 5 * (len(b"FRAME\n") + (3 * 16 * 12)))
+
+		(y, u, v) = FrameStreamWriter.rgb_to_yuv444(numpy.array([ [ [ 0, 0, 0 ], [ 255, 255, 255 ] ] ], dtype = numpy.uint8))
+		self.assertEqual(y.tolist(), [ [ 16, 235 ] ])
+		self.assertEqual(u.tolist(), [ [ 128, 128 ] ])
+		self.assertEqual(v.tolist(), [ [ 128, 128 ] ])
+
+	def test_ppm_sequence(self):
+		f = io.BytesIO()
+		writer = FrameStreamWriter(f, 2, 1, video_format = "ppm")
+		image = numpy.zeros((1, 2, 3), dtype = numpy.uint8)
+		writer.write_frame(image)
+		writer.write_frame(image)
+		self.assertEqual(f.getvalue(), 2 * (b"P6\n2 1\n255\n" + bytes(6)))
+		with self.assertRaises(Exception):
+			FrameStreamWriter(f, 2, 1, video_format = "avi")
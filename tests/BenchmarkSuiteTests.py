@@ -0,0 +1,58 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import copy
+import unittest
+from BenchmarkSuite import BenchmarkSuite
+
+class BenchmarkSuiteTests(unittest.TestCase):
+	def test_run(self):
+		suite = BenchmarkSuite(resolutions = [ (16, 12) ], max_iterations = [ 20 ], scenes = [ "mandelbrot-overview", "newton-3" ], repeats = 1)
+		results = suite.run()
+		self.assertEqual(sorted(results["results"]), [ "mandelbrot-overview/mariani-silver/16x12/20", "mandelbrot-overview/numpy/16x12/20", "mandelbrot-overview/perturbation/16x12/20", "newton-3/numpy/16x12/20" ])
+		for result in results["results"].values():
+			self.assertGreater(result["pixels_per_second"], 0)
+			self.assertGreater(result["iterations"], 16 * 12)
+			self.assertLessEqual(result["iterations"], 16 * 12 * 20)
+			self.assertAlmostEqual(result["iterations_per_second"] / result["pixels_per_second"], result["iterations"] / (16 * 12))
+
+		# Identical images must yield identical iteration counts
+		self.assertEqual(results["results"]["mandelbrot-overview/numpy/16x12/20"]["iterations"], results["results"]["mandelbrot-overview/perturbation/16x12/20"]["iterations"])
+
+	def test_compare(self):
+		baseline = { "results": { "a": { "pixels_per_second": 1000, "iterations": 50 }, "b": { "pixels_per_second": 1000, "iterations": 50 } } }
+		results = copy.deepcopy(baseline)
+		self.assertEqual(BenchmarkSuite.compare(results, baseline), [ ])
+
+		results["results"]["a"]["pixels_per_second"] = 950
+		self.assertEqual(BenchmarkSuite.compare(results, baseline), [ ])
+		results["results"]["a"]["pixels_per_second"] = 800
+		results["results"]["b"]["iterations"] = 51
+		self.assertEqual([ key for (key, reason) in BenchmarkSuite.compare(results, baseline) ], [ "a", "b" ])
+		self.assertEqual(BenchmarkSuite.compare(results, baseline, tolerance = 0.25)[0][0], "b")
+
+		# Cases not in the baseline are not compared
+		del results["results"]["b"]
+		self.assertEqual(len(BenchmarkSuite.compare(results, baseline, tolerance = 0.25)), 0)
+
+	def test_unknown_scene(self):
+		with self.assertRaises(Exception):
+			BenchmarkSuite(scenes = [ "nonexistent" ])
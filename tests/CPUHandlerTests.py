@@ -0,0 +1,154 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import decimal
+import numpy
+from geo import Viewport2d
+from CPUHandler import CPUHandler
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from AdaptiveSupersampler import AdaptiveSupersampler
+
+class CPUHandlerTests(unittest.TestCase):
+	def _scene_params(self, fractal_type, **properties):
+		return {
+			"color_scheme_filename":	"palettes.json",
+			"color_scheme":				"flatui",
+			"type":						fractal_type,
+			"properties":				properties,
+		}
+
+	def test_engine_reuse(self):
+		handler = CPUHandler()
+		viewport = Viewport2d(device_width = 16, device_height = 12, logical_width = 3, logical_height = 3)
+		handler.render(viewport, self._scene_params("mandelbrot", max_iterations = 20))
+		engine = handler.engine
+		self.assertIsInstance(engine, MandelbrotJuliaCPUEngine)
+		handler.render(viewport, self._scene_params("mandelbrot", max_iterations = 30))
+		self.assertIs(handler.engine, engine)
+		self.assertEqual(engine.get_property("max_iterations"), 30)
+		handler.render(viewport, self._scene_params("julia", is_mandelbrot = 0, julia_coeff = 0.5j))
+		self.assertIsNot(handler.engine, engine)
+		self.assertEqual(handler.engine.get_property("julia_coeff"), 0.5j)
+
+	def test_render(self):
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_width = 3, logical_height = 3)
+		scene_params = self._scene_params("mandelbrot", max_iterations = 30)
+		image = CPUHandler().render(viewport, scene_params)
+		handler = CPUHandler(tile_size = 16, workers = 2)
+		tiled_image = handler.render(viewport, scene_params)
+		handler.close()
+		self.assertEqual(image.shape, (30, 40, 3))
+		self.assertTrue(numpy.array_equal(image, tiled_image))
+
+	def test_supersampled_workers(self):
+		# Workers return the data, so edges are detected exactly as in-process
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_width = 3, logical_height = 3)
+		for scene_params in (self._scene_params("mandelbrot", max_iterations = 30), self._scene_params("newton", max_iterations = 20)):
+			image = CPUHandler(supersampler = AdaptiveSupersampler(samples = 4)).render(viewport, scene_params)
+			handler = CPUHandler(tile_size = 16, workers = 2, supersampler = AdaptiveSupersampler(samples = 4))
+			tiled_image = handler.render(viewport, scene_params)
+			handler.close()
+			self.assertTrue(numpy.array_equal(image, tiled_image))
+
+	def test_statistics(self):
+		viewport = Viewport2d(device_width = 128, device_height = 96, logical_center_x = -0.5, logical_width = 3, logical_height = 3)
+		handler = CPUHandler(subdivide = True)
+		handler.render(viewport, self._scene_params("mandelbrot", max_iterations = 100))
+		self.assertEqual(handler.statistics["computed"] + handler.statistics["filled"], 128 * 96)
+		self.assertGreater(handler.statistics["filled"], 0)
+
+		# Deep zoom statistics come from the engine
+		handler = CPUHandler()
+		handler.render(viewport, dict(self._scene_params("mandelbrot", max_iterations = 100), deep_zoom = True))
+		self.assertEqual(handler.statistics["references"], 1)
+		self.assertNotIn("filled", handler.statistics)
+
+	def test_worker_pool_reuse(self):
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_width = 3, logical_height = 3)
+		handler = CPUHandler(tile_size = 16, workers = 2)
+		handler.render(viewport, self._scene_params("mandelbrot", max_iterations = 30))
+		tiled_renderer = handler._tiled_renderer
+		viewport.zoom_in(1.5)
+		image = handler.render(viewport, self._scene_params("mandelbrot", max_iterations = 35))
+		self.assertIs(handler._tiled_renderer, tiled_renderer)
+		self.assertTrue(numpy.array_equal(image, CPUHandler().render(viewport, self._scene_params("mandelbrot", max_iterations = 35))))
+
+		# Another engine gets another renderer
+		handler.render(viewport, self._scene_params("newton", max_iterations = 20))
+		self.assertIsNot(handler._tiled_renderer, tiled_renderer)
+		handler.close()
+		self.assertIsNone(handler._tiled_renderer)
+
+	def test_recolor_only(self):
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_width = 3, logical_height = 3)
+		handler = CPUHandler()
+		scene_params = self._scene_params("newton", max_iterations = 30, darken_brighten_shift = 0.75)
+		image = handler.render(viewport, scene_params)
+		data = handler.data
+
+		# Palette and coloring properties only colorize again
+		scene_params = self._scene_params("newton", max_iterations = 30, darken_brighten_shift = 0.25)
+		scene_params["color_scheme"] = "traffic"
+		recolored = handler.render(viewport, scene_params)
+		self.assertIs(handler.data, data)
+		self.assertFalse(numpy.array_equal(image, recolored))
+		self.assertTrue(numpy.array_equal(recolored, CPUHandler().render(viewport, scene_params)))
+
+		handler.render(viewport, self._scene_params("newton", max_iterations = 31))
+		self.assertIsNot(handler.data, data)
+
+	def test_pan_reuse(self):
+		for scene_params in [ self._scene_params("mandelbrot", max_iterations = 30), self._scene_params("newton", max_iterations = 30) ]:
+			viewport = Viewport2d(device_width = 40, device_height = 30, logical_center_x = -0.5, logical_width = 4, logical_height = 3)
+			handler = CPUHandler()
+			handler.render(viewport, scene_params)
+			self.assertEqual(handler.computed_pixels, 40 * 30)
+			for (device_x, device_y) in [ (3, 0), (-5, 2), (0, -7), (-1, -1) ]:
+				viewport.move_relative_device(device_x, device_y)
+				image = handler.render(viewport, scene_params)
+				self.assertTrue(0 < handler.computed_pixels < 40 * 30)
+				self.assertTrue(numpy.array_equal(image, CPUHandler().render(viewport, scene_params)))
+
+			# Fractional pixel offsets require a full recomputation
+			viewport.move_relative_device(0.5, 0)
+			handler.render(viewport, scene_params)
+			self.assertEqual(handler.computed_pixels, 40 * 30)
+
+	def test_high_precision_viewport(self):
+		center = ("-0.74364388703715870475219150611477", "0.13182590420531197049313205638514")
+		size = decimal.Decimal("1E-25")
+		scene_params = self._scene_params("mandelbrot", max_iterations = 300)
+		scene_params["deep_zoom"] = True
+		viewport = Viewport2d(device_width = 16, device_height = 12, logical_center_x = decimal.Decimal(center[0]), logical_center_y = decimal.Decimal(center[1]), logical_width = size, logical_height = size, keep_aspect_ratio = True)
+		handler = CPUHandler()
+		image = handler.render(viewport, scene_params)
+		self.assertEqual(handler.engine.get_property("precise_center"), tuple(decimal.Decimal(value) for value in center))
+
+		# Identical to giving the precise center explicitly
+		float_viewport = Viewport2d(device_width = 16, device_height = 12, logical_center_x = float(center[0]), logical_center_y = float(center[1]), logical_width = float(size), logical_height = float(size), keep_aspect_ratio = True)
+		explicit_params = self._scene_params("mandelbrot", max_iterations = 300, precise_center = center)
+		explicit_params["deep_zoom"] = True
+		self.assertTrue(numpy.array_equal(image, CPUHandler().render(float_viewport, explicit_params)))
+
+		# A following float viewport does not inherit the precise center
+		handler.render(float_viewport, scene_params)
+		self.assertIsNone(handler.engine.get_property("precise_center"))
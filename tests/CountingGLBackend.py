@@ -0,0 +1,88 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+class CountingGLBackend(object):
+	"""Stand-in for PyOpenGL's OpenGL.GL module which does not require a GPU
+	or a context. Every gl* call is recorded, so tests can check how many GL
+	calls a frame causes; GL_* constants evaluate to their own name. Shaders
+	always compile and link, every uniform name gets a distinct location and
+	program binaries are a fixed byte string. Timer queries are available
+	immediately and always report the same elapsed time. Functions named in
+	"unsupported" raise an exception, like they do on drivers which lack
+	them."""
+
+	program_binary = b"linked program"
+	program_binary_format = 0x1234
+	query_elapsed_ns = 2000000
+
+	def __init__(self, unsupported = ()):
+		self.calls = [ ]
+		self._unsupported = frozenset(unsupported)
+		self._next_name = 1
+		self._uniform_locations = { }
+
+	def count(self, function_name = None):
+		if function_name is None:
+			return len(self.calls)
+		return sum(1 for (name, args) in self.calls if name == function_name)
+
+	def reset(self):
+		self.calls = [ ]
+
+	def _create_name(self):
+		name = self._next_name
+		self._next_name += 1
+		return name
+
+	def _result(self, function_name, args):
+		if function_name in [ "glCreateProgram", "glCreateShader", "glGenTextures", "glGenFramebuffers", "glGenQueries" ]:
+			return self._create_name()
+		elif function_name == "glGetProgramiv" and (args[1] == "GL_PROGRAM_BINARY_LENGTH"):
+			return len(self.program_binary)
+		elif function_name in [ "glGetProgramiv", "glGetShaderiv" ]:
+			return 1
+		elif function_name == "glGetProgramBinary":
+			(program, length, actual_length, binary_format, binary) = args
+			actual_length[0] = len(self.program_binary)
+			binary_format[0] = self.program_binary_format
+			binary[:len(self.program_binary)] = list(self.program_binary)
+		elif function_name == "glGetQueryObjectiv":
+			return 1
+		elif function_name == "glGetQueryObjectui64v":
+			return self.query_elapsed_ns
+		elif function_name == "glGetUniformLocation":
+			key = (args[0], args[1])
+			if key not in self._uniform_locations:
+				self._uniform_locations[key] = len(self._uniform_locations)
+			return self._uniform_locations[key]
+		return None
+
+	def __getattr__(self, name):
+		if name.startswith("GL_"):
+			return name
+		elif name.startswith("gl"):
+			def gl_function(*args):
+				self.calls.append((name, args))
+				if name in self._unsupported:
+					raise Exception("%s is not supported" % (name))
+				return self._result(name, args)
+			return gl_function
+		raise AttributeError(name)
@@ -0,0 +1,101 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import random
+import numpy
+from geo import Viewport2d
+from GLFragmentShader import DF64_LIBRARY, split_df64, required_precision
+
+f32 = numpy.float32
+
+def df64_add(a, b):
+	# Transcription of df64_add() of DF64_LIBRARY in float32 arithmetic
+	t1 = a[0] + b[0]
+	e = t1 - a[0]
+	t2 = ((b[0] - e) + (a[0] - (t1 - e))) + a[1] + b[1]
+	hi = t1 + t2
+	return (hi, t2 - (hi - t1))
+
+def df64_mul(a, b):
+	# Transcription of df64_mul() of DF64_LIBRARY in float32 arithmetic
+	cona = a[0] * f32(8193.0)
+	conb = b[0] * f32(8193.0)
+	a1 = cona - (cona - a[0])
+	b1 = conb - (conb - b[0])
+	a2 = a[0] - a1
+	b2 = b[0] - b1
+	c11 = a[0] * b[0]
+	c21 = a2 * b2 + (a2 * b1 + (a1 * b2 + (a1 * b1 - c11)))
+	c2 = a[0] * b[1] + a[1] * b[0]
+	t1 = c11 + c2
+	e = t1 - c11
+	t2 = a[1] * b[1] + ((c2 - e) + (c11 - (t1 - e))) + c21
+	hi = t1 + t2
+	return (hi, t2 - (hi - t1))
+
+class DF64Tests(unittest.TestCase):
+	def _df64(self, value):
+		(hi, lo) = split_df64(value)
+		return (f32(hi), f32(lo))
+
+	@staticmethod
+	def _value(df64):
+		return float(df64[0]) + float(df64[1])
+
+	def test_split(self):
+		rng = random.Random(1)
+		for i in range(1000):
+			value = rng.uniform(-4, 4) * (10 ** rng.randint(-10, 0))
+			(hi, lo) = split_df64(value)
+			self.assertEqual(hi, float(f32(hi)))
+			self.assertEqual(lo, float(f32(lo)))
+			self.assertLessEqual(abs(lo), abs(hi) * (2 ** -23))
+			self.assertLessEqual(abs((hi + lo) - value), abs(value) * (2 ** -46))
+
+	def test_arithmetic(self):
+		rng = random.Random(2)
+		for i in range(1000):
+			(x, y) = (rng.uniform(-2, 2), rng.uniform(-2, 2))
+			(a, b) = (self._df64(x), self._df64(y))
+			(a_value, b_value) = (self._value(a), self._value(b))
+			# Far more accurate than the 1e-7 of single precision
+			self.assertLessEqual(abs(self._value(df64_mul(a, b)) - (a_value * b_value)), abs(a_value * b_value) * 1e-13)
+			self.assertLessEqual(abs(self._value(df64_add(a, b)) - (a_value + b_value)), max(abs(a_value), abs(b_value)) * 1e-13)
+
+	def test_transcription(self):
+		# The emulation above mirrors the GLSL source
+		self.assertIn("float cona = a.x * 8193.0;", DF64_LIBRARY)
+		self.assertIn("float t2 = ((b.x - e) + (a.x - (t1 - e))) + a.y + b.y;", DF64_LIBRARY)
+		self.assertIn("float t2 = a.y * b.y + ((c2 - e) + (c11 - (t1 - e))) + c21;", DF64_LIBRARY)
+
+	def test_required_precision(self):
+		viewport = Viewport2d(device_width = 640, device_height = 480, logical_center_x = -0.5, logical_width = 4, logical_height = 3)
+		self.assertEqual(required_precision(viewport, "mandelbrot"), "single")
+		viewport.zoom_in(1e5)
+		self.assertEqual(required_precision(viewport, "mandelbrot"), "df64")
+		self.assertEqual(required_precision(viewport, "julia"), "df64")
+		self.assertEqual(required_precision(viewport, "newton"), "single")
+		self.assertEqual(required_precision(viewport, "mandelbrot", "single"), "single")
+
+		# Far from the origin, float32 resolution runs out earlier
+		viewport = Viewport2d(device_width = 640, device_height = 480, logical_center_x = 1000, logical_width = 0.4, logical_height = 0.3)
+		self.assertEqual(required_precision(viewport, "julia"), "df64")
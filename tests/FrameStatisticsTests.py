@@ -0,0 +1,96 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2018 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from FrameStatistics import FrameStatistics, GPUTimer, iteration_histogram
+from MandelbrotJuliaFragmentShaderProgram import MandelbrotJuliaFragmentShaderProgram
+from .CountingGLBackend import CountingGLBackend
+
+class FakeClock(object):
+	def __init__(self):
+		self.now = 0
+
+	def __call__(self):
+		return self.now
+
+class FrameStatisticsTests(unittest.TestCase):
+	def test_rolling_percentiles(self):
+		clock = FakeClock()
+		statistics = FrameStatistics(window = 10, clock = clock)
+		self.assertIsNone(statistics.fps)
+		self.assertIsNone(statistics.percentile("compute", 50))
+		for frame in range(20):
+			statistics.begin_frame()
+			with statistics.measure("compute"):
+				clock.now += 0.001 * frame
+			statistics.record("upload", 0.001)
+			statistics.record("upload", 0.002)
+			clock.now += 0.01
+			statistics.end_frame()
+
+		# Only the last 10 frames are kept
+		self.assertEqual(statistics.frame_count, 20)
+		self.assertAlmostEqual(statistics.percentile("compute", 50), 0.0145)
+		self.assertAlmostEqual(statistics.percentile("compute", 0), 0.010)
+		self.assertAlmostEqual(statistics.percentile("upload", 95), 0.003)
+		self.assertAlmostEqual(statistics.fps, 9 / (0.01 * 9 + 0.001 * sum(range(10, 19))))
+		self.assertEqual(statistics.phases, [ "compute", "upload" ])
+		self.assertEqual(list(statistics.summary()), [ "compute", "upload", "fps" ])
+		self.assertIn("compute: 14.50 ms p50", statistics.format())
+
+	def test_uniform_upload(self):
+		statistics = FrameStatistics()
+		program = MandelbrotJuliaFragmentShaderProgram(gl = CountingGLBackend())
+		program.statistics = statistics
+		statistics.begin_frame()
+		program.set_property("max_iterations", 40)
+		program.use()
+		statistics.end_frame()
+		self.assertIsNotNone(statistics.percentile("uniform_upload", 50))
+
+	def test_gpu_timer(self):
+		gl = CountingGLBackend()
+		timer = GPUTimer(gl = gl)
+		statistics = FrameStatistics()
+		for frame in range(3):
+			statistics.begin_frame()
+			timer.collect(statistics)
+			with timer.measure("compute"):
+				# Queries cannot nest, the inner one is ignored
+				with timer.measure("inner"):
+					pass
+			statistics.end_frame()
+		self.assertTrue(timer.supported)
+		self.assertEqual(gl.count("glBeginQuery"), 3)
+		self.assertEqual(gl.count("glGenQueries"), 1)
+		self.assertAlmostEqual(statistics.percentile("gpu_compute", 50), 0.002)
+		self.assertEqual(statistics.phases, [ "gpu_compute" ])
+		timer.release()
+		self.assertEqual(gl.count("glDeleteQueries"), 1)
+
+	def test_iteration_histogram(self):
+		iterations = numpy.array([ [ 0, 10, 20 ], [ 30, 100, 100 ] ])
+		histogram = iteration_histogram(iterations, 100, bins = 10)
+		self.assertEqual(histogram["counts"].tolist(), [ 1, 1, 1, 1, 0, 0, 0, 0, 0, 2 ])
+		self.assertAlmostEqual(histogram["unescaped"], 1 / 3)
+		self.assertAlmostEqual(histogram["escaped_p95"], 28.5)
+		self.assertIsNone(iteration_histogram(numpy.full(4, 50), 50)["escaped_p95"])
@@ -0,0 +1,125 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from NewtonSolver import Polynomial
+from NewtonFragmentShaderProgram import NewtonFragmentShaderProgram, NewtonColorizeFragmentShaderProgram
+from MandelbrotJuliaFragmentShaderProgram import MandelbrotJuliaFragmentShaderProgram, MandelbrotJuliaColorizeFragmentShaderProgram
+from .CountingGLBackend import CountingGLBackend
+
+class GLFragmentShaderTests(unittest.TestCase):
+	def _frame(self, program, center = (0.0, 0.0)):
+		program.set_property("center", center)
+		program.set_property("size", (3.0, 3.0))
+		program.set_property("max_iterations", 40)
+		program.use()
+
+	def test_unchanged_frame(self):
+		gl = CountingGLBackend()
+		program = MandelbrotJuliaFragmentShaderProgram(gl = gl)
+		self._frame(program)
+		self.assertEqual(gl.count("glGetUniformLocation"), 9)
+		self.assertEqual(gl.count("glUseProgram"), 1)
+
+		# Nothing changed: only the program is bound
+		gl.reset()
+		self._frame(program)
+		self.assertEqual(gl.calls, [ ("glUseProgram", (program.program, )) ])
+
+	def test_changed_uniform(self):
+		gl = CountingGLBackend()
+		program = MandelbrotJuliaFragmentShaderProgram(gl = gl)
+		self._frame(program)
+		gl.reset()
+		self._frame(program, center = (-0.5, 0.0))
+		self.assertEqual(gl.count(), 2)
+		self.assertEqual(gl.count("glUniform2f"), 1)
+		self.assertEqual(gl.count("glGetUniformLocation"), 0)
+		self.assertEqual(program.dirty_uniforms, frozenset())
+
+	def test_newton_arrays(self):
+		gl = CountingGLBackend()
+		program = NewtonFragmentShaderProgram(gl = gl)
+		program.use()
+		self.assertEqual(gl.count("glUniform2fv"), 2)
+
+		# Setting the same polynomial again does not re-upload coefficients or
+		# solutions
+		gl.reset()
+		program.set_property("poly", Polynomial(3, 0, 0, 1))
+		program.use()
+		self.assertEqual(gl.count("glUniform2fv"), 0)
+
+		gl.reset()
+		program.set_property("poly", Polynomial(1, 0, 2j, 1))
+		self.assertEqual(program.dirty_uniforms, frozenset([ "poly_coeffs", "solutions" ]))
+		program.use()
+		self.assertEqual(gl.count("glUniform2fv"), 2)
+		self.assertEqual(gl.count("glUniform1i"), 0)
+
+		# The degree is part of the program
+		self.assertRaises(Exception, program.set_property, "poly", Polynomial(1, 0, 0, 0, 1))
+
+	def test_newton_specialization(self):
+		for degree in [ 1, 3, 40 ]:
+			source = NewtonFragmentShaderProgram.generate_source(output = "iterations", degree = degree)
+			self.assertIn("#define POLY_DEGREE			%d\n" % (degree), source)
+			self.assertNotIn("MAX_POLY_DEGREE", source)
+			self.assertEqual(source.count("poly_coeffs[%d]" % (degree)), 1)
+			self.assertEqual(source.count("cplx_mul(result, x)"), degree)
+			self.assertEqual(source.count("min_err = err; closest_index = "), degree - 1)
+			self.assertNotIn("for (int", source)
+		self.assertNotEqual(NewtonFragmentShaderProgram.generate_source(degree = 3), NewtonFragmentShaderProgram.generate_source(degree = 4))
+
+		gl = CountingGLBackend()
+		program = NewtonFragmentShaderProgram(degree = 24, gl = gl)
+		self.assertEqual(program.degree, 24)
+		self.assertEqual(program.poly.degree, 24)
+		program.set_property("poly", Polynomial(*([ -1 ] + ([ 0 ] * 23) + [ 1 ])))
+		program.use()
+		self.assertEqual([ len(args[2]) for (name, args) in gl.calls if name == "glUniform2fv" ], [ 25, 24 ])
+
+	def test_df64_uniforms(self):
+		gl = CountingGLBackend()
+		program = MandelbrotJuliaFragmentShaderProgram(precision = "df64", gl = gl)
+		self._frame(program, center = (0.1, -0.2))
+		self.assertEqual(gl.count("glUniform4f"), 2)
+
+	def test_two_stage_sources(self):
+		for precision in [ "single", "df64" ]:
+			source = MandelbrotJuliaFragmentShaderProgram.generate_source(precision, output = "iterations")
+			self.assertTrue(source.startswith("#define OUTPUT_ITERATIONS\n"))
+			self.assertNotIn("palette_offset", source)
+			self.assertIn("palette_offset", MandelbrotJuliaFragmentShaderProgram.generate_source(precision))
+		self.assertNotIn("darken_brighten_shift", NewtonFragmentShaderProgram.generate_source(output = "iterations"))
+
+	def test_two_stage_properties(self):
+		gl = CountingGLBackend()
+		compute = NewtonFragmentShaderProgram(output = "iterations", gl = gl)
+		self.assertNotIn("darken_brighten_shift", compute.dirty_uniforms)
+		colorize = NewtonColorizeFragmentShaderProgram(gl = gl)
+		colorize.use()
+		colorize.set_property("poly", Polynomial(1, 0, 0, 0, 0, 1))
+		self.assertEqual(colorize.dirty_uniforms, frozenset([ "poly_degree" ]))
+
+		colorize = MandelbrotJuliaColorizeFragmentShaderProgram(gl = gl)
+		self.assertEqual(colorize.dirty_uniforms, frozenset([ "iteration_data", "tex", "max_iterations", "palette_offset" ]))
+		self.assertEqual(MandelbrotJuliaFragmentShaderProgram.colorize_properties & colorize.properties, frozenset([ "palette_offset" ]))
@@ -0,0 +1,107 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import tempfile
+import unittest
+from GLResourceManager import GLResourceManager
+from NewtonFragmentShaderProgram import NewtonFragmentShaderProgram
+from MandelbrotJuliaFragmentShaderProgram import MandelbrotJuliaFragmentShaderProgram
+from .CountingGLBackend import CountingGLBackend
+
+class GLResourceManagerTests(unittest.TestCase):
+	def test_program_pool(self):
+		gl = CountingGLBackend()
+		resources = GLResourceManager(max_programs = 2, gl = gl)
+		newton = resources.get_program(NewtonFragmentShaderProgram)
+		single = resources.get_program(MandelbrotJuliaFragmentShaderProgram, precision = "single")
+		self.assertIs(resources.get_program(NewtonFragmentShaderProgram), newton)
+		self.assertIs(resources.get_program(MandelbrotJuliaFragmentShaderProgram), single)
+		self.assertEqual(gl.count("glLinkProgram"), 2)
+
+		# The least recently used program, Newton, is evicted and deleted
+		resources.get_program(MandelbrotJuliaFragmentShaderProgram, precision = "df64")
+		self.assertEqual(resources.program_count, 2)
+		self.assertEqual(gl.calls[-1][0], "glDeleteProgram")
+		self.assertIsNot(resources.get_program(NewtonFragmentShaderProgram), newton)
+
+		resources.release()
+		self.assertEqual(resources.program_count, 0)
+		self.assertEqual(gl.count("glDeleteProgram"), 4)
+
+	def test_newton_degree_programs(self):
+		gl = CountingGLBackend()
+		resources = GLResourceManager(gl = gl)
+		cubic = resources.get_program(NewtonFragmentShaderProgram, output = "iterations", degree = 3)
+		quintic = resources.get_program(NewtonFragmentShaderProgram, output = "iterations", degree = 5)
+		self.assertIsNot(cubic, quintic)
+		self.assertIs(resources.get_program(NewtonFragmentShaderProgram, output = "iterations", degree = 3), cubic)
+		self.assertIs(resources.get_program(NewtonFragmentShaderProgram, output = "iterations"), cubic)
+		self.assertEqual(gl.count("glCompileShader"), 2)
+
+	def test_texture_pool(self):
+		gl = CountingGLBackend()
+		resources = GLResourceManager(max_textures = 2, gl = gl)
+		created = [ ]
+		def create(name):
+			created.append(name)
+			return len(created)
+		self.assertEqual(resources.get_texture("a", lambda: create("a")), 1)
+		self.assertEqual(resources.get_texture("b", lambda: create("b")), 2)
+		self.assertEqual(resources.get_texture("a", lambda: create("a")), 1)
+		self.assertEqual(resources.get_texture("c", lambda: create("c")), 3)
+		self.assertEqual(created, [ "a", "b", "c" ])
+		self.assertEqual(gl.calls, [ ("glDeleteTextures", ([ 2 ], )) ])
+		resources.release()
+		self.assertEqual(gl.calls[-1], ("glDeleteTextures", ([ 1, 3 ], )))
+
+	def test_binary_cache(self):
+		with tempfile.TemporaryDirectory() as directory:
+			gl = CountingGLBackend()
+			GLResourceManager(binary_cache_directory = directory, gl = gl).get_program(NewtonFragmentShaderProgram)
+			self.assertEqual(gl.count("glCompileShader"), 1)
+			self.assertEqual(len(os.listdir(directory)), 1)
+
+			# A later session links from the cached binary
+			gl = CountingGLBackend()
+			GLResourceManager(binary_cache_directory = directory, gl = gl).get_program(NewtonFragmentShaderProgram)
+			self.assertEqual(gl.count("glCompileShader"), 0)
+			self.assertEqual([ args[1:] for (name, args) in gl.calls if name == "glProgramBinary" ], [ (CountingGLBackend.program_binary_format, CountingGLBackend.program_binary, len(CountingGLBackend.program_binary)) ])
+
+			# Other shader sources are not affected
+			GLResourceManager(binary_cache_directory = directory, gl = gl).get_program(MandelbrotJuliaFragmentShaderProgram)
+			self.assertEqual(gl.count("glCompileShader"), 1)
+
+	def test_binary_cache_unsupported(self):
+		with tempfile.TemporaryDirectory() as directory:
+			gl = CountingGLBackend(unsupported = [ "glProgramParameteri", "glGetProgramBinary", "glProgramBinary" ])
+			resources = GLResourceManager(binary_cache_directory = directory, gl = gl)
+			# The program is compiled and linked as usual
+			newton = resources.get_program(NewtonFragmentShaderProgram)
+			self.assertIsInstance(newton, NewtonFragmentShaderProgram)
+			self.assertEqual(gl.count("glLinkProgram"), 1)
+			self.assertFalse(resources.binary_cache.supported)
+			self.assertEqual(os.listdir(directory), [ ])
+
+			# Further programs do not try again
+			resources.get_program(MandelbrotJuliaFragmentShaderProgram)
+			self.assertEqual(gl.count("glProgramParameteri"), 1)
+			self.assertEqual(gl.count("glCompileShader"), 2)
@@ -0,0 +1,55 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import zlib
+import struct
+import unittest
+import numpy
+from ImageWriter import ImageWriter
+
+class ImageWriterTests(unittest.TestCase):
+	def setUp(self):
+		self._image = numpy.arange(4 * 3 * 3, dtype = numpy.uint8).reshape(3, 4, 3)
+
+	def test_ppm(self):
+		data = ImageWriter.encode(self._image, "ppm")
+		self.assertTrue(data.startswith(b"P6\n4 3\n255\n"))
+		self.assertEqual(data[len(b"P6\n4 3\n255\n"):], self._image.tobytes())
+
+	def test_png(self):
+		data = ImageWriter.encode(self._image, "png")
+		self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+		(length, ) = struct.unpack(">L", data[8 : 12])
+		self.assertEqual(data[12 : 16], b"IHDR")
+		(width, height) = struct.unpack(">LL", data[16 : 24])
+		self.assertEqual((width, height), (4, 3))
+
+		idat_offset = 8 + 12 + length
+		(idat_length, ) = struct.unpack(">L", data[idat_offset : idat_offset + 4])
+		self.assertEqual(data[idat_offset + 4 : idat_offset + 8], b"IDAT")
+		raw = zlib.decompress(data[idat_offset + 8 : idat_offset + 8 + idat_length])
+		scanlines = numpy.frombuffer(raw, dtype = numpy.uint8).reshape(3, 1 + 4 * 3)
+		self.assertTrue(numpy.all(scanlines[:, 0] == 0))
+		self.assertEqual(scanlines[:, 1:].tobytes(), self._image.tobytes())
+
+	def test_unknown_format(self):
+		with self.assertRaises(Exception):
+			ImageWriter.encode(self._image, "gif")
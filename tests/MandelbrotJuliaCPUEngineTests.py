@@ -0,0 +1,126 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from geo import Viewport2d
+from AdvancedColorPalette import AdvancedColorPalette
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+
+class MandelbrotJuliaCPUEngineTests(unittest.TestCase):
+	@staticmethod
+	def _shader_iterations(c, max_iterations, cutoff, is_mandelbrot, julia_coeff):
+		# Straight transcription of the GLSL main loop
+		cur = c
+		for iteration in range(max_iterations):
+			cur = cur * cur + (c if (iteration == 0) else (is_mandelbrot * c)) + julia_coeff
+			if abs(cur) > cutoff:
+				break
+		else:
+			iteration = max_iterations
+		return iteration
+
+	def test_pixel_grid(self):
+		v = Viewport2d(device_width = 4, device_height = 2, logical_center_x = 1, logical_center_y = 2, logical_width = 4, logical_height = 2)
+		grid = MandelbrotJuliaCPUEngine.pixel_grid(v)
+		self.assertEqual(grid.shape, (2, 4))
+		self.assertAlmostEqual(grid[0, 0], complex(-0.5, 2.5))
+		self.assertAlmostEqual(grid[1, 3], complex(2.5, 1.5))
+
+	def test_mandelbrot_matches_shader(self):
+		engine = MandelbrotJuliaCPUEngine()
+		v = Viewport2d(device_width = 32, device_height = 24, logical_center_x = -0.5, logical_width = 3, logical_height = 2.5)
+		iterations = engine.compute(v)
+		grid = engine.pixel_grid(v)
+		for (c, iteration) in zip(grid.flat, iterations.flat):
+			self.assertEqual(iteration, self._shader_iterations(c, 40, 10.0, 1, 0))
+		self.assertEqual(iterations[12, 16], 40)
+
+	def test_julia_matches_shader(self):
+		engine = MandelbrotJuliaCPUEngine()
+		engine.use_julia(complex(0.5, 0.25))
+		engine.set_property("max_iterations", 25)
+		v = Viewport2d(device_width = 16, device_height = 16, logical_width = 3, logical_height = 3)
+		iterations = engine.compute(v)
+		grid = engine.pixel_grid(v)
+		for (c, iteration) in zip(grid.flat, iterations.flat):
+			self.assertEqual(iteration, self._shader_iterations(c, 25, 10.0, 0, complex(0.5, 0.25)))
+
+	def test_cardioid_bulb(self):
+		c = numpy.array([ 0, -0.1 + 0.2j, 0.25, -1, -1.2j, 0.3, -2, 1j ])
+		self.assertEqual(list(MandelbrotJuliaCPUEngine.in_main_cardioid_or_bulb(c)), [ True, True, True, True, False, False, False, False ])
+		self.assertEqual(list(MandelbrotJuliaCPUEngine.in_main_cardioid_or_bulb(c, margin = 1e-12)), [ True, True, False, True, False, False, False, False ])
+
+	def test_interior_early_out_unchanged(self):
+		engine = MandelbrotJuliaCPUEngine()
+		engine.set_property("max_iterations", 300)
+		v = Viewport2d(device_width = 24, device_height = 16, logical_center_x = -0.75, logical_width = 2.5, logical_height = 2)
+		iterations = engine.compute(v)
+		grid = engine.pixel_grid(v)
+		for (c, iteration) in zip(grid.flat, iterations.flat):
+			self.assertEqual(iteration, self._shader_iterations(c, 300, 10.0, 1, 0))
+
+	def test_periodicity_julia(self):
+		engine = MandelbrotJuliaCPUEngine()
+		engine.use_julia(complex(-0.4, 0.6))
+		engine.set_property("max_iterations", 500)
+		v = Viewport2d(device_width = 40, device_height = 30, logical_width = 3, logical_height = 2.5)
+		with_check = engine.compute(v)
+		engine.set_property("periodicity_tolerance", 0)
+		without_check = engine.compute(v)
+		self.assertTrue(numpy.array_equal(with_check, without_check))
+
+	def test_texture_lookup(self):
+		lut = numpy.array([ [ 0, 0, 0 ], [ 1, 1, 1 ] ], dtype = float)
+		color = MandelbrotJuliaCPUEngine.texture1d(lut, numpy.array([ 0.25, 0.5, 0.75, 1.0 ]))
+		self.assertTrue(numpy.allclose(color[:, 0], [ 0, 0.5, 1, 0.5 ]))
+
+	def test_render(self):
+		palette = AdvancedColorPalette.load_from_json("palettes.json", "flatui")
+		engine = MandelbrotJuliaCPUEngine()
+		image = engine.render(Viewport2d(device_width = 20, device_height = 10, logical_width = 3, logical_height = 2), palette)
+		self.assertEqual(image.shape, (10, 20, 3))
+		self.assertEqual(image.dtype, numpy.uint8)
+
+	def test_smooth_coloring(self):
+		engine = MandelbrotJuliaCPUEngine()
+		v = Viewport2d(device_width = 16, device_height = 12, logical_center_x = -0.5, logical_width = 3, logical_height = 2.5)
+		iterations = engine.compute(v)
+		engine.set_property("smooth_coloring", 1)
+		smooth = engine.compute(v)
+		grid = engine.pixel_grid(v)
+		for (c, iteration, value) in zip(grid.flat, iterations.flat, smooth.flat):
+			if iteration == 40:
+				self.assertEqual(value, 40)
+				continue
+			cur = c
+			for i in range(iteration + 1):
+				cur = cur * cur + c
+			self.assertAlmostEqual(value, iteration + 1 - numpy.log2(numpy.log(abs(cur)) / numpy.log(10)))
+
+	def test_palette_offset(self):
+		lut = numpy.linspace(0, 1, 256)[:, numpy.newaxis].repeat(3, axis = 1)
+		engine = MandelbrotJuliaCPUEngine()
+		engine.set_property("max_iterations", 11)
+		iterations = numpy.array([ 0, 5, 10 ])
+		self.assertTrue(numpy.array_equal(engine.colorize(iterations, lut)[:, 0], [ 0, 128, 128 ]))
+		engine.set_property("palette_offset", 0.5)
+		self.assertTrue(numpy.array_equal(engine.colorize(iterations, lut)[:, 0], [ 128, 0, 128 ]))
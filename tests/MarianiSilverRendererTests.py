@@ -0,0 +1,70 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from geo import Viewport2d
+from AdvancedColorPalette import AdvancedColorPalette
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from MarianiSilverRenderer import MarianiSilverRenderer
+from TiledRenderer import TiledRenderer
+
+class MarianiSilverRendererTests(unittest.TestCase):
+	def setUp(self):
+		self._palette = AdvancedColorPalette.load_from_json("palettes.json", "flatui")
+		self._viewport = Viewport2d(device_width = 120, device_height = 90, logical_center_x = -0.5, logical_center_y = 0, logical_width = 4, logical_height = 3)
+
+	def test_interior_skipped(self):
+		engine = MandelbrotJuliaCPUEngine()
+		engine.set_property("max_iterations", 100)
+		renderer = MarianiSilverRenderer(engine, min_size = 8)
+		data = renderer.compute(self._viewport)
+		self.assertTrue(numpy.array_equal(data, engine.compute(self._viewport)))
+		statistics = renderer.statistics
+		self.assertEqual(statistics["computed"] + statistics["filled"], 120 * 90)
+		self.assertGreater(statistics["skipped_fraction"], 0.2)
+		self.assertAlmostEqual(statistics["skipped_fraction"], statistics["filled"] / (120 * 90))
+
+	def test_uniform(self):
+		# Entirely outside of the set: the border alone determines everything
+		engine = MandelbrotJuliaCPUEngine()
+		viewport = Viewport2d(device_width = 50, device_height = 40, logical_center_x = 100, logical_center_y = 100, logical_width = 1, logical_height = 1)
+		renderer = MarianiSilverRenderer(engine)
+		computed = [ ]
+		compute_at = engine.compute_at
+		engine.compute_at = lambda viewport, x, y: computed.append(numpy.size(x)) or compute_at(viewport, x, y)
+		data = renderer.compute(viewport)
+		self.assertTrue(numpy.all(data == 0))
+		# Every pixel the engine computed is accounted for
+		self.assertEqual(sum(computed), renderer.statistics["computed"])
+		self.assertEqual(renderer.statistics["computed"], 2 * (50 + 40) - 4)
+		self.assertEqual(renderer.statistics["filled"], 48 * 38)
+
+	def test_region(self):
+		engine = MandelbrotJuliaCPUEngine()
+		region = (30, 20, 50, 41)
+		data = MarianiSilverRenderer(engine).compute(self._viewport, region = region)
+		self.assertTrue(numpy.array_equal(data, engine.compute(self._viewport, region = region)))
+
+	def test_tiled(self):
+		engine = MandelbrotJuliaCPUEngine()
+		image = TiledRenderer(MarianiSilverRenderer(engine), tile_size = 32, workers = 1).render(self._viewport, self._palette)
+		self.assertTrue(numpy.array_equal(image, engine.render(self._viewport, self._palette)))
@@ -0,0 +1,97 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from geo import Viewport2d
+from AdvancedColorPalette import AdvancedColorPalette
+from NewtonSolver import Polynomial
+from NewtonCPUEngine import NewtonCPUEngine
+
+class NewtonCPUEngineTests(unittest.TestCase):
+	@staticmethod
+	def _shader_pixel(engine, c):
+		# Straight transcription of the GLSL main function, without the
+		# texture lookup
+		poly = engine.poly
+		poly_dx = poly.dx()
+		max_iterations = engine.get_property("max_iterations")
+		for iterations in range(max_iterations):
+			new_c = c - (poly(c) / poly_dx(c))
+			err = abs(new_c - c)
+			c = new_c
+			if err < engine.get_property("cutoff"):
+				break
+		else:
+			iterations = max_iterations
+		roots = engine.roots
+		closest_index = 0
+		min_err = abs(roots[0] - c)
+		for i in range(1, poly.degree):
+			err = abs(roots[i] - c)
+			if err < min_err:
+				min_err = err
+				closest_index = i
+		return (iterations, closest_index)
+
+	def test_roots(self):
+		engine = NewtonCPUEngine()
+		engine.set_property("poly", Polynomial(-1, 0, 0, 1))
+		roots = engine.roots
+		self.assertEqual(len(roots), 3)
+		for root in roots:
+			self.assertAlmostEqual(abs(root ** 3 - 1), 0, places = 4)
+
+	def test_matches_shader(self):
+		engine = NewtonCPUEngine()
+		engine.set_property("poly", Polynomial(3, 0, -3j, 3j))
+		v = Viewport2d(device_width = 24, device_height = 16, logical_width = 4, logical_height = 3)
+		(iterations, closest_index) = engine.compute(v)
+		grid = engine.pixel_grid(v)
+		for (c, iteration, index) in zip(grid.flat, iterations.flat, closest_index.flat):
+			self.assertEqual((iteration, index), self._shader_pixel(engine, c))
+		self.assertEqual(set(closest_index.flat), { 0, 1, 2 })
+
+	def test_degree_one(self):
+		palette = AdvancedColorPalette.load_from_json("palettes.json", "flatui")
+		engine = NewtonCPUEngine()
+		engine.set_property("poly", Polynomial(-1, 1))
+		v = Viewport2d(device_width = 8, device_height = 6, logical_width = 4, logical_height = 3)
+		(iterations, closest_index) = engine.compute(v)
+		self.assertEqual(set(closest_index.flat), { 0 })
+		lut = engine.create_lut(palette)
+		image = engine.colorize((iterations, closest_index), lut)
+		# Every pixel gets the color of the start of the palette
+		expected = engine.to_rgb8(engine.texture1d(lut, numpy.zeros(iterations.shape)) + engine.shading(iterations)[..., numpy.newaxis])
+		self.assertTrue(numpy.array_equal(image, expected))
+
+	def test_shading(self):
+		engine = NewtonCPUEngine()
+		shading = engine.shading(numpy.array([ 0, 50 ]))
+		self.assertAlmostEqual(shading[0], -(0.25 * 0.5) ** 0.6)
+		self.assertAlmostEqual(shading[1], 0.5 ** 0.6)
+
+	def test_render(self):
+		palette = AdvancedColorPalette.load_from_json("palettes.json", "flatui")
+		engine = NewtonCPUEngine()
+		image = engine.render(Viewport2d(device_width = 20, device_height = 10, logical_width = 4, logical_height = 2), palette)
+		self.assertEqual(image.shape, (10, 20, 3))
+		self.assertEqual(image.dtype, numpy.uint8)
@@ -0,0 +1,73 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from NewtonSolver import Polynomial, NewtonSolver
+
+class NewtonSolverTests(unittest.TestCase):
+	def test_poly_eval(self):
+		poly = Polynomial(3, 0, -3j, 3j)
+		self.assertAlmostEqual(poly(2), 3 - 12j + 24j)
+		values = numpy.array([ 0, 1, 2, 1j ])
+		result = poly(values)
+		self.assertEqual(result.shape, (4, ))
+		for (value, expected) in zip(values, result):
+			self.assertAlmostEqual(poly(complex(value)), expected)
+
+	def test_poly_dx(self):
+		poly = Polynomial(3, 2, -3j, 3j)
+		self.assertEqual(poly.dx(), Polynomial(2, -6j, 9j))
+		self.assertEqual(Polynomial(5).dx(), Polynomial(0))
+		self.assertTrue(numpy.allclose(poly.dx()(numpy.array([ 0, 1 ])), [ 2, 2 + 3j ]))
+
+	def test_poly_eval_with_dx(self):
+		poly = Polynomial(3, 2, -3j, 3j)
+		for value in [ 0, 2, 1.5 - 0.5j ]:
+			(result, result_dx) = poly.eval_with_dx(value)
+			self.assertAlmostEqual(result, poly(value))
+			self.assertAlmostEqual(result_dx, poly.dx()(value))
+		values = numpy.array([ 0, 1, 2, 1j, -0.5 + 2j ])
+		(result, result_dx) = poly.eval_with_dx(values)
+		self.assertEqual(result.shape, (5, ))
+		self.assertEqual(result_dx.shape, (5, ))
+		self.assertTrue(numpy.allclose(result, poly(values)))
+		self.assertTrue(numpy.allclose(result_dx, poly.dx()(values)))
+		self.assertEqual(Polynomial(5).eval_with_dx(2), (5, 0))
+
+	def test_solve_scalar(self):
+		solver = NewtonSolver(Polynomial(-1, 0, 0, 1))
+		self.assertAlmostEqual(solver(-99.4), 1)
+
+	def test_solve_array(self):
+		solver = NewtonSolver(Polynomial(-1, 0, 0, 1))
+		seeds = numpy.array([ [ -99.4, 2 ], [ -1 + 1j, -1 - 1j ] ])
+		zeros = solver(seeds)
+		self.assertEqual(zeros.shape, (2, 2))
+		for (seed, zero) in zip(seeds.flat, zeros.flat):
+			self.assertAlmostEqual(zero, solver(complex(seed)))
+
+	def test_find_all(self):
+		solver = NewtonSolver(Polynomial(3, 0, -3j, 3j))
+		solutions = solver.find_all(field_size = 5, step_size = 0.1)
+		self.assertEqual(len(solutions), 3)
+		for solution in solutions:
+			self.assertAlmostEqual(abs(solver.poly(solution)), 0, places = 4)
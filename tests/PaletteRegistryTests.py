@@ -0,0 +1,71 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import json
+import tempfile
+import unittest
+from PaletteRegistry import PaletteRegistry
+
+class PaletteRegistryTests(unittest.TestCase):
+	def setUp(self):
+		self._directory = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self._directory.cleanup()
+
+	def _write(self, basename, palettes, mtime):
+		filename = os.path.join(self._directory.name, basename)
+		with open(filename, "w") as f:
+			json.dump(palettes, f)
+		os.utime(filename, (mtime, mtime))
+		return filename
+
+	def test_cached(self):
+		registry = PaletteRegistry()
+		filename = self._write("a.json", { "gray": [ { "rgb": "000000" }, { "rgb": "ffffff" } ], "red": [ { "rgb": "000000" }, { "rgb": "ff0000" } ] }, 1000)
+		self.assertEqual(registry.schemata(filename), [ "gray", "red" ])
+		palette = registry.get(filename, "gray")
+		self.assertIs(registry.get(filename, "gray"), palette)
+		self.assertIs(registry.lut(filename, "gray", 16), palette.lut(16))
+		self.assertEqual(registry.get(filename, "red")[1], (255, 0, 0))
+		with self.assertRaises(KeyError):
+			registry.get(filename, "blue")
+
+	def test_invalidation(self):
+		registry = PaletteRegistry()
+		filename = self._write("a.json", { "p": [ { "rgb": "000000" }, { "rgb": "ffffff" } ] }, 1000)
+		palette = registry.get(filename, "p")
+		filename = self._write("a.json", { "p": [ { "rgb": "000000" }, { "rgb": "00ff00" } ], "q": [ { "rgb": "000000" }, { "rgb": "0000ff" } ] }, 2000)
+		self.assertIsNot(registry.get(filename, "p"), palette)
+		self.assertEqual(registry.get(filename, "p")[1], (0, 255, 0))
+		self.assertEqual(registry.schemata(filename), [ "p", "q" ])
+
+	def test_multiple_files(self):
+		registry = PaletteRegistry()
+		filename1 = self._write("a.json", { "p": [ { "rgb": "000000" }, { "rgb": "ffffff" } ] }, 1000)
+		filename2 = self._write("b.json", { "p": [ { "rgb": "000000" }, { "rgb": "ff0000" } ] }, 1000)
+		self.assertEqual(registry.get(filename1, "p")[1], (255, 255, 255))
+		self.assertEqual(registry.get(filename2, "p")[1], (255, 0, 0))
+		palette = registry.get(filename2, "p")
+		registry.forget(filename2)
+		self.assertIsNot(registry.get(filename2, "p"), palette)
+		self.assertIs(registry.get(filename1, "p"), registry.get(filename1, "p"))
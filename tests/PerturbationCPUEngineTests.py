@@ -0,0 +1,106 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import decimal
+import unittest
+import numpy
+from geo import Viewport2d
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from PerturbationCPUEngine import PerturbationCPUEngine
+
+class PerturbationCPUEngineTests(unittest.TestCase):
+	@staticmethod
+	def _exact_iterations(center, offset, max_iterations, precision = 60):
+		with decimal.localcontext() as ctx:
+			ctx.prec = precision
+			cx = decimal.Decimal(center[0]) + decimal.Decimal(offset.real)
+			cy = decimal.Decimal(center[1]) + decimal.Decimal(offset.imag)
+			(x, y) = (cx, cy)
+			for iteration in range(max_iterations):
+				(x, y) = ((x * x) - (y * y) + cx, (2 * x * y) + cy)
+				if (x * x) + (y * y) > 100:
+					return iteration
+			return max_iterations
+
+	def test_shallow_matches_direct(self):
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_center_x = -0.75, logical_center_y = 0.1, logical_width = 0.4, logical_height = 0.3)
+		direct = MandelbrotJuliaCPUEngine()
+		direct.set_property("max_iterations", 100)
+		engine = PerturbationCPUEngine()
+		engine.set_property("max_iterations", 100)
+		mismatches = numpy.sum(direct.compute(viewport) != engine.compute(viewport))
+		self.assertLessEqual(mismatches, 5)
+
+	def test_wide_view_matches_direct(self):
+		# Offsets of the order of the whole set, where higher order terms of
+		# the series approximation dominate
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_center_x = -0.5, logical_width = 4, logical_height = 3)
+		direct = MandelbrotJuliaCPUEngine()
+		direct.set_property("max_iterations", 100)
+		engine = PerturbationCPUEngine()
+		engine.set_property("max_iterations", 100)
+		mismatches = numpy.sum(direct.compute(viewport) != engine.compute(viewport))
+		self.assertLessEqual(mismatches, 5)
+
+	def test_julia_matches_direct(self):
+		viewport = Viewport2d(device_width = 40, device_height = 30, logical_width = 3, logical_height = 2)
+		direct = MandelbrotJuliaCPUEngine()
+		direct.use_julia(complex(-0.4, 0.6))
+		direct.set_property("max_iterations", 60)
+		engine = PerturbationCPUEngine()
+		engine.use_julia(complex(-0.4, 0.6))
+		engine.set_property("max_iterations", 60)
+		mismatches = numpy.sum(direct.compute(viewport) != engine.compute(viewport))
+		self.assertLessEqual(mismatches, 5)
+
+	def test_deep_zoom(self):
+		center = ("-0.743643887037158704752191506114774", "0.131825904205311970493132056385139")
+		viewport = Viewport2d(device_width = 16, device_height = 12, logical_width = 4e-13, logical_height = 3e-13)
+		engine = PerturbationCPUEngine()
+		engine.set_property("max_iterations", 3000)
+		engine.set_property("precise_center", center)
+		iterations = engine.compute(viewport)
+		self.assertGreater(engine.statistics["series_skip"], 0)
+		self.assertEqual(engine.statistics["glitched"], 0)
+
+		# Structure is resolved, unlike with double precision coordinates
+		self.assertGreater(len(numpy.unique(iterations)), 20)
+		offsets = engine.pixel_offsets(viewport)
+		for (y, x) in [ (0, 0), (5, 7), (11, 15), (3, 12) ]:
+			self.assertEqual(iterations[y, x], self._exact_iterations(center, offsets[y, x], 3000))
+
+	def test_interior(self):
+		# Entirely within the main cardioid: no reference orbit is needed
+		viewport = Viewport2d(device_width = 16, device_height = 12, logical_width = 4e-20, logical_height = 3e-20)
+		engine = PerturbationCPUEngine()
+		engine.set_property("max_iterations", 1000)
+		engine.set_property("precise_center", ("-0.1", "0.2"))
+		self.assertTrue(numpy.all(engine.compute(viewport) == 1000))
+		self.assertEqual(engine.statistics["references"], 0)
+
+		# Pixels in and around the period-3 bulb are only stopped when they
+		# are periodic
+		viewport = Viewport2d(device_width = 32, device_height = 24, logical_width = 0.1, logical_height = 0.075)
+		engine.set_property("precise_center", ("-0.1225611668766536", "0.7448617666197442"))
+		with_check = engine.compute(viewport)
+		self.assertGreater(numpy.sum(with_check == 1000), 0)
+		engine.set_property("periodicity_tolerance", 0)
+		self.assertTrue(numpy.array_equal(with_check, engine.compute(viewport)))
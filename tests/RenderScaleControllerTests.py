@@ -0,0 +1,60 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from RenderScaleController import RenderScaleController
+
+class RenderScaleControllerTests(unittest.TestCase):
+	def test_adapts_to_budget(self):
+		controller = RenderScaleController(frame_time_budget = 0.02)
+		# Four times over budget: half the resolution
+		self.assertTrue(controller.update(0.08))
+		self.assertEqual(controller.scale, 0.5)
+		self.assertEqual(controller.size(640, 480), (320, 240))
+		# Within budget now
+		self.assertFalse(controller.update(0.02))
+		self.assertEqual(controller.scale, 0.5)
+		# Much faster than needed: back up, but never beyond 1
+		self.assertTrue(controller.update(0.001))
+		self.assertEqual(controller.scale, 1)
+
+	def test_quantized(self):
+		# Frames whose cost at full resolution varies
+		controller = RenderScaleController(frame_time_budget = 0.02)
+		for full_frame_time in [ 0.05, 0.051, 0.049, 0.052, 0.03, 0.031, 0.029, 0.06 ]:
+			controller.update(full_frame_time * controller.scale ** 2)
+			self.assertEqual((controller.scale * 8) % 1, 0)
+
+		# Frame times jittering around the budget do not change the size
+		controller = RenderScaleController(frame_time_budget = 0.02)
+		controller.update(0.08)
+		for frame_time in [ 0.022, 0.018, 0.024, 0.017, 0.021 ]:
+			self.assertFalse(controller.update(frame_time))
+
+	def test_limits(self):
+		controller = RenderScaleController(frame_time_budget = 0.02, min_scale = 0.25)
+		controller.update(100)
+		self.assertEqual(controller.scale, 0.25)
+		self.assertEqual(controller.size(2, 2), (1, 1))
+		controller.min_scale = 0.5
+		self.assertEqual(controller.scale, 0.5)
+		controller.reset()
+		self.assertEqual(controller.scale, 1)
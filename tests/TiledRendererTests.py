@@ -0,0 +1,97 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import numpy
+from geo import Viewport2d
+from AdvancedColorPalette import AdvancedColorPalette
+from MandelbrotJuliaCPUEngine import MandelbrotJuliaCPUEngine
+from NewtonCPUEngine import NewtonCPUEngine
+from TiledRenderer import TiledRenderer
+
+class TiledRendererTests(unittest.TestCase):
+	def setUp(self):
+		self._palette = AdvancedColorPalette.load_from_json("palettes.json", "flatui")
+		self._viewport = Viewport2d(device_width = 50, device_height = 30, logical_center_x = -0.5, logical_center_y = 0.1, logical_width = 3, logical_height = 2)
+
+	def test_tiles(self):
+		renderer = TiledRenderer(MandelbrotJuliaCPUEngine(), tile_size = (16, 8))
+		tiles = list(renderer.tiles(self._viewport))
+		self.assertEqual(len(tiles), 4 * 4)
+		self.assertEqual(sum(tile.width * tile.height for tile in tiles), 50 * 30)
+		grid = renderer.engine.pixel_grid(self._viewport)
+		for tile in tiles:
+			sub_grid = renderer.engine.pixel_grid(self._viewport, region = tile)
+			self.assertTrue(numpy.allclose(sub_grid, grid[tile.y : tile.y + tile.height, tile.x : tile.x + tile.width]))
+
+	def test_render_inprocess(self):
+		engine = MandelbrotJuliaCPUEngine()
+		image = TiledRenderer(engine, tile_size = 16, workers = 1).render(self._viewport, self._palette)
+		self.assertTrue(numpy.array_equal(image, engine.render(self._viewport, self._palette)))
+
+	def test_render_pool(self):
+		engine = MandelbrotJuliaCPUEngine()
+		with TiledRenderer(engine, tile_size = 16, workers = 2) as renderer:
+			image = renderer.render(self._viewport, self._palette)
+			self.assertTrue(numpy.array_equal(image, engine.render(self._viewport, self._palette)))
+
+	def test_persistent_pool(self):
+		engine = MandelbrotJuliaCPUEngine()
+		renderer = TiledRenderer(engine, tile_size = 16, workers = 2)
+		renderer.render(self._viewport, self._palette)
+		(pool, shm) = (renderer._pool, renderer._shm)
+
+		# Later frames reuse pool and segment, but see changed properties and
+		# viewports
+		engine.set_property("max_iterations", 17)
+		self._viewport.move_relative_device(7, 3)
+		image = renderer.render(self._viewport, self._palette)
+		self.assertIs(renderer._pool, pool)
+		self.assertIs(renderer._shm, shm)
+		self.assertTrue(numpy.array_equal(image, engine.render(self._viewport, self._palette)))
+
+		# A new size reallocates the segment only
+		self._viewport.set_device_size(20, 10)
+		image = renderer.render(self._viewport, self._palette)
+		self.assertIs(renderer._pool, pool)
+		self.assertIsNot(renderer._shm, shm)
+		self.assertTrue(numpy.array_equal(image, engine.render(self._viewport, self._palette)))
+
+		renderer.close()
+		self.assertIsNone(renderer._pool)
+		self.assertIsNone(renderer._shm)
+		self.assertTrue(numpy.array_equal(renderer.render(self._viewport, self._palette), image))
+		renderer.close()
+
+	def test_render_with_data(self):
+		smooth = MandelbrotJuliaCPUEngine()
+		smooth.set_property("smooth_coloring", 1)
+		for engine in (MandelbrotJuliaCPUEngine(), smooth, NewtonCPUEngine()):
+			expected = engine.split_data(engine.compute(self._viewport))
+			for workers in (1, 2):
+				with TiledRenderer(engine, tile_size = 16, workers = workers) as renderer:
+					(data, image) = renderer.render_with_data(self._viewport, self._palette)
+					self.assertTrue(numpy.array_equal(image, renderer.render(self._viewport, self._palette)))
+				planes = engine.split_data(data)
+				self.assertEqual(len(planes), engine.data_plane_count)
+				for (plane, expected_plane) in zip(planes, expected):
+					self.assertEqual(plane.dtype, expected_plane.dtype)
+					self.assertTrue(numpy.array_equal(plane, expected_plane))
@@ -0,0 +1,40 @@
+#       pygpufractal - Fractal computation on GPU using GLSL.
+#       Copyright (C) 2017-2017 Johannes Bauer
+#
+#       This file is part of pygpufractal.
+#
+#       pygpufractal is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; this program is ONLY licensed under
+#       version 3 of the License, later versions are explicitly excluded.
+#
+#       pygpufractal is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with pygpufractal; if not, write to the Free Software
+#       Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#       Johannes Bauer <JohannesBauer@gmx.de>
+
+from .MandelbrotJuliaCPUEngineTests import MandelbrotJuliaCPUEngineTests
+from .NewtonCPUEngineTests import NewtonCPUEngineTests
+from .NewtonSolverTests import NewtonSolverTests
+from .TiledRendererTests import TiledRendererTests
+from .ImageWriterTests import ImageWriterTests
+from .CPUHandlerTests import CPUHandlerTests
+from .PerturbationCPUEngineTests import PerturbationCPUEngineTests
+from .MarianiSilverRendererTests import MarianiSilverRendererTests
+from .GLFragmentShaderTests import GLFragmentShaderTests
+from .GLResourceManagerTests import GLResourceManagerTests
+from .DF64Tests import DF64Tests
+from .RenderScaleControllerTests import RenderScaleControllerTests
+from .AdvancedColorPaletteTests import AdvancedColorPaletteTests
+from .PaletteRegistryTests import PaletteRegistryTests
+from .AnimationTests import AnimationTests
+from .BenchmarkSuiteTests import BenchmarkSuiteTests
+from .FrameStatisticsTests import FrameStatisticsTests
+from .AdaptiveIterationsTests import AdaptiveIterationsTests
+from .AdaptiveSupersamplerTests import AdaptiveSupersamplerTests